@@ -0,0 +1,383 @@
+"""Local stand-in for the BOE open data endpoints used by the scraper.
+
+Serves ``/datosabiertos/api/boe/sumario/{YYYYMMDD}`` and
+``/diario_boe/xml.php?id={id}`` either from a fixtures directory
+(``sumario/{YYYYMMDD}.xml`` and ``articles/{id}.xml``) or from deterministic
+generated documents, plus generated PDFs under ``/boe/dias/.../pdfs/`` with
+``Range`` support. Latency, slow-response stragglers, 429/5xx injection
+and ``Retry-After`` headers are configurable so the scraper can be load and
+soak tested offline.
+
+Run standalone with::
+
+    python -m bench.boe_server --port 8088 --latency-ms 40 --throttle-rate 0.02
+"""
+
+import argparse
+import gzip
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+_SUMARIO_RE = re.compile(r"^/datosabiertos/api/boe/sumario/(\d{8})$")
+_ID_RE = re.compile(r"^BOE-[A-Z]-(\d{4})-(\d{5})$")
+_PDF_RE = re.compile(r"^/boe/dias/\d{4}/\d{2}/\d{2}/pdfs/(BOE-[A-Z]-\d{4}-\d{5})\.pdf$")
+_RANGE_RE = re.compile(r"^bytes=(\d+)-$")
+
+_DEPARTMENTS = [
+    "JEFATURA DEL ESTADO",
+    "MINISTERIO DE HACIENDA",
+    "MINISTERIO DE TRABAJO Y ECONOMÍA SOCIAL",
+    "MINISTERIO DE SANIDAD",
+    "COMUNIDAD AUTÓNOMA DE ANDALUCÍA",
+]
+_RANKS = ["Ley", "Real Decreto", "Orden", "Resolución", "Anuncio"]
+_RELATIONS = [("270", "MODIFICA"), ("407", "DEROGA"), ("440", "CITA"), ("210", "AÑADE")]
+_MATERIAS = ["Impuestos", "Sanidad", "Funcionarios públicos", "Subvenciones", "Contratos"]
+_WORDS = (
+    "el la de que y a en los del se las por un para con no una su al lo como "
+    "artículo disposición ley real decreto orden resolución ministerio plazo "
+    "procedimiento administración boletín oficial estado presente vigor"
+).split()
+
+
+@dataclass
+class ServerConfig:
+    """Behaviour knobs for :class:`BOEStandInServer`."""
+
+    articles_per_day: int = 50
+    paragraphs: int = 20
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    slow_rate: float = 0.0
+    slow_ms: float = 500.0
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: int = 1
+    pdf_kb: int = 64
+    truncate_rate: float = 0.0
+    fixtures_dir: str | None = None
+    compress: bool = True
+    seed: int = 0
+    stats: Counter = field(default_factory=Counter)
+
+
+def article_ids_for(day: date, count: int) -> list[str]:
+    """Return the deterministic article ids generated for ``day``."""
+    count = min(count, 200)
+    base = day.timetuple().tm_yday * 200
+    return [f"BOE-A-{day.year}-{base + i:05d}" for i in range(count)]
+
+
+def pdf_size(boe_id: str, kb: int) -> int:
+    """Size of the generated PDF of ``boe_id``: ``kb`` KiB give or take half."""
+    return max(16, int(kb * 1024 * random.Random(boe_id).uniform(0.5, 1.5)))
+
+
+def render_pdf(boe_id: str, kb: int) -> bytes:
+    """Deterministic PDF-looking body of :func:`pdf_size` bytes."""
+    return b"%PDF-1.4\n" + random.Random(f"{boe_id}/pdf").randbytes(pdf_size(boe_id, kb) - 9)
+
+
+def render_sumario(day: date, count: int, base_url: str, pdf_kb: int = 64) -> str:
+    ids = article_ids_for(day, count)
+    stamp = day.strftime("%Y%m%d")
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        "<response><status><code>200</code><text>ok</text></status>",
+        "<data><sumario><metadatos><publicacion>BOE</publicacion>",
+        f"<fecha_publicacion>{stamp}</fecha_publicacion></metadatos>",
+        f'<diario numero="{day.timetuple().tm_yday}">',
+        f"<sumario_diario><identificador>BOE-S-{day.year}-{day.timetuple().tm_yday}"
+        "</identificador></sumario_diario>",
+        '<seccion codigo="1" nombre="I. Disposiciones generales">',
+    ]
+    for dept_idx, dept in enumerate(_DEPARTMENTS):
+        dept_ids = ids[dept_idx :: len(_DEPARTMENTS)]
+        if not dept_ids:
+            continue
+        parts.append(f'<departamento codigo="{dept_idx}" nombre="{escape(dept)}">')
+        parts.append('<epigrafe nombre="General">')
+        for boe_id in dept_ids:
+            path = f"/boe/dias/{day:%Y/%m/%d}/pdfs/{boe_id}.pdf"
+            parts.append(
+                f"<item><identificador>{boe_id}</identificador>"
+                f"<titulo>{escape(_title_for(boe_id))}</titulo>"
+                f'<url_pdf szBytes="{pdf_size(boe_id, pdf_kb)}">{base_url}{path}</url_pdf>'
+                f"<url_xml>{base_url}/diario_boe/xml.php?id={boe_id}</url_xml></item>"
+            )
+        parts.append("</epigrafe></departamento>")
+    parts.append("</seccion></diario></sumario></data></response>")
+    return "".join(parts)
+
+
+def _title_for(boe_id: str) -> str:
+    rng = random.Random(boe_id)
+    return f"{rng.choice(_RANKS)} {rng.randint(1, 999)}/{boe_id[6:10]}, " + " ".join(
+        rng.choice(_WORDS) for _ in range(12)
+    )
+
+
+def _render_references(rng: random.Random, year: int, number: int) -> str:
+    """Link to up to three earlier articles with <anterior> references."""
+    links = []
+    day_of_year = number // 200
+    if day_of_year < 2:
+        return "<referencias/>"
+    for _ in range(rng.randint(0, 3)):
+        # Early ids of an earlier day exist for any articles_per_day >= 20
+        target = rng.randint(1, day_of_year - 1) * 200 + rng.randint(0, 19)
+        code, word = rng.choice(_RELATIONS)
+        links.append(
+            f'<anterior referencia="BOE-A-{year}-{target:05d}" orden="{len(links)}">'
+            f'<palabra codigo="{code}">{escape(word)}</palabra>'
+            f"<texto>{escape(word.lower())} lo indicado</texto></anterior>"
+        )
+    return f"<referencias><anteriores>{''.join(links)}</anteriores><posteriores/></referencias>"
+
+
+def render_article(boe_id: str, paragraphs: int, base_url: str) -> str:
+    rng = random.Random(boe_id)
+    year, number = _ID_RE.match(boe_id).groups()
+    day = date.fromordinal(date(int(year), 1, 1).toordinal() + int(number) // 200 - 1)
+    stamp = day.strftime("%Y%m%d")
+    text = "\n\n".join(
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 80)))
+        for _ in range(paragraphs)
+    )
+    materias = "".join(
+        f"<materia>{escape(m)}</materia>" for m in rng.sample(_MATERIAS, 2)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        "<documento><metadatos>"
+        f"<identificador>{boe_id}</identificador>"
+        f"<titulo>{escape(_title_for(boe_id))}</titulo>"
+        "<diario>Boletín Oficial del Estado</diario>"
+        f"<fecha_disposicion>{stamp}</fecha_disposicion>"
+        f"<fecha_publicacion>{stamp}</fecha_publicacion>"
+        f"<departamento>{escape(rng.choice(_DEPARTMENTS))}</departamento>"
+        f"<rango>{rng.choice(_RANKS)}</rango>"
+        f"<pagina_inicial>{rng.randint(1, 900)}</pagina_inicial>"
+        f"<pagina_final>{rng.randint(900, 999)}</pagina_final>"
+        f"<url_pdf>{base_url}/boe/dias/{day:%Y/%m/%d}/pdfs/{boe_id}.pdf</url_pdf>"
+        "</metadatos><analisis>"
+        f"<materias>{materias}</materias><notas/>"
+        f"{_render_references(rng, int(year), int(number))}<alertas/>"
+        f"</analisis><texto>{escape(text)}</texto></documento>"
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "BOEStandInServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # keep load runs quiet
+        pass
+
+    def do_GET(self):
+        cfg = self.server.config
+        rng = self.server.rng
+        started = time.perf_counter()
+        delay = cfg.latency_ms + (rng.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0)
+        if cfg.slow_rate and rng.random() < cfg.slow_rate:
+            delay += cfg.slow_ms
+        if delay:
+            time.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < cfg.throttle_rate:
+            self._send(429, b"Too Many Requests", "text/plain", retry_after=True)
+        elif roll < cfg.throttle_rate + cfg.error_rate:
+            status = rng.choice((500, 502, 503))
+            self._send(status, b"Server Error", "text/plain", retry_after=status == 503)
+        elif _PDF_RE.match(urlsplit(self.path).path):
+            self._send_pdf(_PDF_RE.match(urlsplit(self.path).path).group(1))
+        else:
+            body, status = self._route()
+            self._send(status, body, "application/xml" if status == 200 else "text/plain")
+        self.server.record(time.perf_counter() - started)
+
+    def _route(self) -> tuple[bytes, int]:
+        cfg = self.server.config
+        parts = urlsplit(self.path)
+        base_url = f"http://{self.headers.get('Host', 'localhost')}"
+
+        match = _SUMARIO_RE.match(parts.path)
+        if match:
+            stamp = match.group(1)
+            fixture = self._fixture("sumario", stamp)
+            if fixture is not None:
+                return fixture, 200
+            try:
+                day = date(int(stamp[:4]), int(stamp[4:6]), int(stamp[6:]))
+            except ValueError:
+                return b"Bad date", 400
+            if day.weekday() == 6 or cfg.articles_per_day <= 0:
+                return b"Not Found", 404
+            return render_sumario(day, cfg.articles_per_day, base_url, cfg.pdf_kb).encode(), 200
+
+        if parts.path == "/diario_boe/xml.php":
+            boe_id = parse_qs(parts.query).get("id", [""])[0]
+            fixture = self._fixture("articles", boe_id)
+            if fixture is not None:
+                return fixture, 200
+            if not _ID_RE.match(boe_id):
+                return b"Not Found", 404
+            return render_article(boe_id, cfg.paragraphs, base_url).encode(), 200
+
+        return b"Not Found", 404
+
+    def _send_pdf(self, boe_id: str) -> None:
+        """Serve a generated PDF, honouring ``Range: bytes=N-`` and ``If-Range``."""
+        cfg = self.server.config
+        body = render_pdf(boe_id, cfg.pdf_kb)
+        etag = f'"{boe_id}-{len(body)}"'
+        start = 0
+        match = _RANGE_RE.match(self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                cfg.stats[416] += 1
+                return
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        payload = body[start:]
+        if cfg.truncate_rate and self.server.rng.random() < cfg.truncate_rate:
+            # Drop the connection halfway through the body
+            cfg.stats["truncated"] += 1
+            self.close_connection = True
+            self.wfile.write(payload[: len(payload) // 2])
+            return
+        # Count before the body goes out: the client may check stats as soon
+        # as it has read the last byte
+        cfg.stats[206 if start else 200] += 1
+        self.wfile.write(payload)
+
+    def _fixture(self, kind: str, name: str) -> bytes | None:
+        fixtures = self.server.config.fixtures_dir
+        if not fixtures or not name:
+            return None
+        path = Path(fixtures) / kind / f"{name}.xml"
+        return path.read_bytes() if path.is_file() else None
+
+    def _send(self, status: int, body: bytes, content_type: str, retry_after: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        accepted = self.headers.get("Accept-Encoding", "")
+        if status == 200 and self.server.config.compress and "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after:
+            self.send_header("Retry-After", str(self.server.config.retry_after))
+        self.end_headers()
+        self.server.config.stats[status] += 1
+        self.wfile.write(body)
+
+
+class BOEStandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering like boe.es, with fault injection."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int] = ("127.0.0.1", 0), config: ServerConfig | None = None):
+        super().__init__(address, _Handler)
+        self.config = config or ServerConfig()
+        self.rng = random.Random(self.config.seed)
+        self.latencies: list[float] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def start(self) -> "BOEStandInServer":
+        """Serve in a background thread and return ``self``."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local BOE stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--articles-per-day", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of slow responses")
+    parser.add_argument("--slow-ms", type=float, default=500.0, help="Extra delay of slow responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of 429 responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 5xx responses")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--pdf-kb", type=int, default=64, help="Mean size of generated PDFs")
+    parser.add_argument(
+        "--truncate-rate", type=float, default=0.0, help="Share of PDF bodies cut short"
+    )
+    parser.add_argument("--fixtures-dir")
+    parser.add_argument("--no-compress", action="store_true", help="Ignore Accept-Encoding")
+    args = parser.parse_args()
+
+    config = ServerConfig(
+        articles_per_day=args.articles_per_day,
+        paragraphs=args.paragraphs,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        pdf_kb=args.pdf_kb,
+        truncate_rate=args.truncate_rate,
+        fixtures_dir=args.fixtures_dir,
+        compress=not args.no_compress,
+    )
+    server = BOEStandInServer((args.host, args.port), config)
+    print(f"BOE stand-in listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Bandwidth and CPU cost of the article fetch path, str vs bytes.
+
+Downloads one day of articles from the BOE stand-in twice, once with
+``Accept-Encoding: identity`` and once with gzip, then times the two client
+paths on the same bodies:
+
+* ``text``: identity transfer, ``Response.text`` (charset detection and
+  decode to ``str``) followed by ``ET.fromstring(str)``.
+* ``bytes``: gzip transfer, decompression and ``ET.fromstring(bytes)``.
+
+    python -m bench.compression --articles 150 --repeat 5
+
+Generated articles use a small vocabulary and compress better than real BOE
+texts, so treat the bandwidth ratio as an upper bound.
+"""
+
+import argparse
+import gzip
+import time
+import xml.etree.ElementTree as ET
+from datetime import date
+
+import requests
+
+from bench.boe_server import BOEStandInServer, ServerConfig, article_ids_for
+
+
+def _download(base_url: str, ids: list[str], encoding: str) -> list[bytes]:
+    bodies = []
+    with requests.Session() as s:
+        for boe_id in ids:
+            r = s.get(
+                f"{base_url}/diario_boe/xml.php",
+                params={"id": boe_id},
+                headers={"Accept-Encoding": encoding},
+                stream=True,
+            )
+            bodies.append(r.raw.read(decode_content=False))
+            r.close()
+    return bodies
+
+
+def _text_path(bodies: list[bytes], content_type: str) -> None:
+    for body in bodies:
+        r = requests.Response()
+        r._content = body
+        r.headers["Content-Type"] = content_type
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        ET.fromstring(r.text)
+
+
+def _bytes_path(bodies: list[bytes]) -> None:
+    for body in bodies:
+        ET.fromstring(gzip.decompress(body))
+
+
+def _cpu(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare str and bytes fetch paths")
+    parser.add_argument("--articles", type=int, default=150, help="Articles per day")
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ids = article_ids_for(date(2025, 7, 3), args.articles)
+    config = ServerConfig(articles_per_day=args.articles, paragraphs=args.paragraphs)
+    with BOEStandInServer(config=config) as server:
+        plain = _download(server.base_url, ids, "identity")
+        packed = _download(server.base_url, ids, "gzip")
+
+    plain_bytes = sum(map(len, plain))
+    packed_bytes = sum(map(len, packed))
+    detect = _cpu(lambda: _text_path(plain, "application/xml"), args.repeat)
+    declared = _cpu(lambda: _text_path(plain, "application/xml; charset=utf-8"), args.repeat)
+    fast = _cpu(lambda: _bytes_path(packed), args.repeat)
+
+    print(f"Articles per day:        {len(ids)}")
+    print(f"Wire bytes identity:     {plain_bytes / 1024:.1f} KiB")
+    print(f"Wire bytes gzip:         {packed_bytes / 1024:.1f} KiB "
+          f"({100 * (1 - packed_bytes / plain_bytes):.1f}% saved)")
+    print(f"CPU text (detect):       {detect * 1000:.1f} ms")
+    print(f"CPU text (charset hdr):  {declared * 1000:.1f} ms")
+    print(f"CPU bytes (gunzip+parse): {fast * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Scaling benchmark for the multi-process encoding pool.
+
+Encodes the same generated BOE paragraphs with 1..N worker processes and
+prints segments per second and the speed-up over the in-process encoder.
+Use ``--synthetic`` to exercise the pool with a CPU-bound numpy stand-in
+when sentence-transformers is not installed.
+
+    python -m bench.encoding_pool --segments 20000 --max-workers 16 --threads-per-worker 1
+"""
+
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from bench.boe_server import render_article
+from tasks.encoding import EncodingPool, chunks_of, load_sentence_transformer
+from tasks.indexing import EMBEDDING_MODEL
+from tasks.processing import segment_text
+
+
+class _SyntheticModel:
+    """Roughly MiniLM-sized dense work per token, without PyTorch."""
+
+    def __init__(self, dim: int = 384, layers: int = 6):
+        rng = np.random.default_rng(0)
+        self.weights = [rng.standard_normal((dim, dim), dtype=np.float32) for _ in range(layers)]
+        self.dim = dim
+
+    def encode(self, segments, batch_size: int = 32):
+        out = np.empty((len(segments), self.dim), dtype=np.float32)
+        for i, segment in enumerate(segments):
+            tokens = len(segment.split()) + 2
+            x = np.full((tokens, self.dim), (hash(segment) % 97) / 97, dtype=np.float32)
+            for w in self.weights:
+                x = np.tanh(x @ w)
+            out[i] = x.mean(axis=0)
+        return out
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+
+def synthetic_model(model_name: str) -> _SyntheticModel:
+    return _SyntheticModel()
+
+
+def _segments(count: int) -> list[str]:
+    segments: list[str] = []
+    i = 0
+    while len(segments) < count:
+        xml = render_article(f"BOE-A-2025-{36000 + i % 200:05d}", 20, "")
+        text = ET.fromstring(xml).findtext("texto")
+        segments.extend(f"{i} {p}" for p in segment_text(text))
+        i += 1
+    return segments[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the encoding pool")
+    parser.add_argument("--segments", type=int, default=5000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--synthetic", action="store_true", help="Use a numpy stand-in model")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    factory = synthetic_model if args.synthetic else load_sentence_transformer
+    segments = _segments(args.segments)
+    print(f"Segments: {len(segments)}  cores: {os.cpu_count()}  model: "
+          f"{'synthetic' if args.synthetic else args.model}")
+
+    model = factory(args.model)
+    start = time.perf_counter()
+    for chunk in chunks_of(segments, args.chunk_size):
+        model.encode(chunk)
+    baseline = time.perf_counter() - start
+    print(f"in-process:  {len(segments) / baseline:8.1f} segments/s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with EncodingPool(
+            args.model,
+            workers,
+            args.threads_per_worker,
+            args.chunk_size,
+            model_factory=factory,
+        ) as pool:
+            pool.get_sentence_embedding_dimension()  # wait for the models to load
+            start = time.perf_counter()
+            pool.encode(segments)
+            elapsed = time.perf_counter() - start
+        print(
+            f"{workers:2d} workers:  {len(segments) / elapsed:8.1f} segments/s "
+            f"({baseline / elapsed:.2f}x)"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare the text extraction engines of :mod:`tasks.scraping`.
+
+Parses generated BOE article XML and an HTML rendering of it with
+BeautifulSoup's ``html.parser`` and with the streaming lxml engine (fed in
+64 KiB chunks), checks that both return the same text (libxml2 drops the
+whitespace before the root element, so leading whitespace is ignored) and prints
+the per-document timings. With ``--pages`` it also fetches that many
+articles from :mod:`bench.boe_server` one by one and with ``scrape_pages``.
+
+    BOE_RATE_LIMIT=0 python -m bench.html_extract --paragraphs 2000 --pages 40 --latency-ms 30
+"""
+
+import argparse
+import statistics
+import time
+from datetime import date
+
+from bench.boe_server import BOEStandInServer, ServerConfig, article_ids_for, render_article
+from tasks.scraping import CHUNK_SIZE, extract_text, fetch_page_text, scrape_pages
+
+
+def _html_page(article_xml: str) -> str:
+    body = article_xml.rsplit("<texto>", 1)[1].split("</texto>", 1)[0]
+    paragraphs = "".join(f"<p class=\"parrafo\">{p}</p>\n" for p in body.split("\n\n"))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"es\"><head><meta charset=\"utf-8\">"
+        "<title>BOE-A-2025-13297</title><script>window.dataLayer = [];</script>"
+        "<style>.parrafo { margin: 0 }</style></head>\n<body><div id=\"textoxslt\">"
+        f"<h3>Disposición</h3>\n{paragraphs}</div><!-- pie --></body></html>"
+    )
+
+
+def _chunks(body: bytes):
+    return (body[i : i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def compare_engines(paragraphs: int, repeat: int) -> None:
+    xml = render_article("BOE-A-2025-13297", paragraphs, "https://www.boe.es")
+    for name, doc in (("article xml", xml), ("article html", _html_page(xml))):
+        body = doc.encode("utf-8")
+        reference = extract_text(body, "html.parser")
+        fast = extract_text(_chunks(body), "lxml")
+        if fast.lstrip() != reference.lstrip():
+            raise SystemExit(f"{name}: lxml text differs from html.parser")
+        slow_s = _time(lambda: extract_text(body, "html.parser"), repeat)
+        fast_s = _time(lambda: extract_text(_chunks(body), "lxml"), repeat)
+        print(
+            f"{name:<13} {len(body) / 1e6:6.2f} MB  html.parser {slow_s * 1000:8.1f}ms  "
+            f"lxml {fast_s * 1000:7.1f}ms  x{slow_s / fast_s:5.1f}  identical text ({len(fast)} chars)"
+        )
+
+
+def compare_bulk(pages: int, latency_ms: float, workers: int) -> None:
+    config = ServerConfig(paragraphs=200, latency_ms=latency_ms, compress=True)
+    with BOEStandInServer(config=config) as server:
+        ids = article_ids_for(date(2025, 7, 1), pages)
+        urls = [f"{server.base_url}/diario_boe/xml.php?id={boe_id}" for boe_id in ids]
+        started = time.perf_counter()
+        one_by_one = [fetch_page_text(url) for url in urls]
+        sequential = time.perf_counter() - started
+        started = time.perf_counter()
+        bulk = scrape_pages.fn(urls, max_workers=workers)
+        parallel = time.perf_counter() - started
+    assert bulk == one_by_one
+    print(
+        f"{len(urls)} pages at {latency_ms:g}ms latency: one by one {sequential:.2f}s, "
+        f"scrape_pages(max_workers={workers}) {parallel:.2f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Paragraphs per document")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=0, help="Also time a bulk fetch of N pages")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    compare_engines(args.paragraphs, args.repeat)
+    if args.pages:
+        compare_bulk(args.pages, args.latency_ms, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Start-up time of the command line entry point.
+
+Each case runs in a fresh interpreter so that nothing is already imported:
+
+* ``import``: the module the old ``main.py`` imported eagerly, and the
+  slowest imports it makes (from ``python -X importtime``);
+* ``--help``: the lazy CLI, which only imports ``argparse``;
+* ``scrape`` and ``--direct scrape``: one small day scraped from
+  :mod:`bench.boe_server`, through the Prefect engine and directly.
+
+    python -m bench.import_time --repeat 3 --articles-per-day 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.boe_server import BOEStandInServer, ServerConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+
+def _timed(cmd: list[str], env: dict, cwd: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(cmd, env=env, cwd=cwd, check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def _slowest_imports(module: str, env: dict, top: int) -> list[tuple[float, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        # Keep the modules imported directly by ``module`` (one indent level)
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--articles-per-day", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="boe-import-")
+    server = BOEStandInServer(
+        config=ServerConfig(articles_per_day=args.articles_per_day)
+    ).start()
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "BOE_BASE": server.base_url,
+        "BOE_CACHE_DIR": os.path.join(workdir, "cache"),
+    }
+    cases = {
+        "import flows.scrape_boe_day_metadata": [
+            sys.executable,
+            "-c",
+            "import flows.scrape_boe_day_metadata",
+        ],
+        "main.py --help": [sys.executable, MAIN, "--help"],
+        "main.py scrape": [sys.executable, MAIN, "scrape", "--date", "2024/01/02"],
+        "main.py --direct scrape": [
+            sys.executable,
+            MAIN,
+            "--direct",
+            "scrape",
+            "--date",
+            "2024/01/03",
+        ],
+    }
+    try:
+        for label, cmd in cases.items():
+            times = []
+            for _ in range(args.repeat):
+                # A fresh database each run so scrapes do the same work
+                run_dir = tempfile.mkdtemp(dir=workdir)
+                times.append(_timed(cmd, env, run_dir))
+            print(f"{label:<40} best={min(times):.2f}s mean={sum(times) / len(times):.2f}s")
+    finally:
+        server.stop()
+
+    print("\nSlowest imports made directly by flows.scrape_boe_day_metadata:")
+    for seconds, name in _slowest_imports("flows.scrape_boe_day_metadata", env, args.top):
+        print(f"  {seconds:6.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Load and soak test ``scrape_boe_day_metadata`` against the BOE stand-in.
+
+Starts :mod:`bench.boe_server` in-process (unless ``--base-url`` points at a
+running instance), redirects ``tasks.boe.BOE_BASE`` to it and runs the flow
+for consecutive days inside a scratch directory so ``data/boe.db`` is
+throwaway. Prints throughput and client/server tail latencies.
+
+    python -m bench.load_test --days 5 --articles-per-day 100 --latency-ms 30
+    python -m bench.load_test --duration 600 --throttle-rate 0.05   # soak
+    python -m bench.load_test --slow-rate 0.03 --hedge              # hedging
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from bench.boe_server import BOEStandInServer, ServerConfig
+
+
+def _percentiles(samples: list[float]) -> str:
+    if not samples:
+        return "n/a"
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return f"p50={pick(0.50):.1f}ms p95={pick(0.95):.1f}ms p99={pick(0.99):.1f}ms"
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="boe-load-")
+    # Keep cached task results out of the repository and out of later runs
+    os.environ["BOE_CACHE_DIR"] = os.path.join(workdir, "cache")
+    from tasks import boe
+    from tasks.metrics import METRICS
+    from flows.scrape_boe_day_metadata import scrape_boe_day_metadata
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = BOEStandInServer(
+            config=ServerConfig(
+                articles_per_day=args.articles_per_day,
+                paragraphs=args.paragraphs,
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                slow_rate=args.slow_rate,
+                slow_ms=args.slow_ms,
+                throttle_rate=args.throttle_rate,
+                error_rate=args.error_rate,
+                retry_after=args.retry_after,
+            )
+        ).start()
+        base_url = server.base_url
+
+    boe.BOE_BASE = base_url
+    boe.HEDGE_ENABLED = args.hedge
+    METRICS.enabled = True
+    METRICS.reset()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    day = date.fromisoformat(args.start)
+    days_run = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            if args.duration:
+                if time.perf_counter() - started >= args.duration:
+                    break
+            elif days_run >= args.days:
+                break
+            scrape_boe_day_metadata(
+                day.strftime("%Y/%m/%d"),
+                batch_size=args.batch_size,
+                concurrent=args.concurrent,
+            )
+            days_run += 1
+            day += timedelta(days=1)
+        elapsed = time.perf_counter() - started
+        conn = sqlite3.connect("data/boe.db")
+        stored = conn.execute("SELECT count(*) FROM articles").fetchone()[0]
+        conn.close()
+    finally:
+        os.chdir(cwd)
+        if server is not None:
+            server.stop()
+
+    snap = METRICS.snapshot()
+    fetch = METRICS.quantile
+    report = {
+        "days": days_run,
+        "articles": stored,
+        "seconds": elapsed,
+        "articles_per_second": stored / elapsed if elapsed else 0.0,
+        "article_fetch_p50": fetch("boe_stage_seconds", 0.5, stage="article_fetch"),
+        "article_fetch_p99": fetch("boe_stage_seconds", 0.99, stage="article_fetch"),
+        "retries": sum(v for (n, _), v in snap["counters"].items() if n == "boe_http_retries_total"),
+        "hedges": sum(v for (n, _), v in snap["counters"].items() if n == "boe_http_hedges_total"),
+        "workdir": workdir,
+    }
+    print(f"Days: {days_run}  articles: {stored}  wall: {elapsed:.1f}s")
+    print(f"Throughput: {report['articles_per_second']:.2f} articles/s")
+    print(f"HTTP retries: {report['retries']:g}  hedges: {report['hedges']:g}")
+    for stage in ("sumario_fetch", "article_fetch", "parse", "db_write"):
+        samples = [
+            v
+            for (n, labels), v in snap["timings"].items()
+            if n == "boe_stage_seconds" and labels == (("stage", stage),)
+        ]
+        if samples:
+            s = samples[0]
+            print(
+                f"  {stage:<14} n={s['count']:<6} p50={s['p50'] * 1000:.1f}ms "
+                f"p95={s['p95'] * 1000:.1f}ms p99={s['p99'] * 1000:.1f}ms"
+            )
+    if server is not None:
+        print(f"Server statuses: {dict(server.config.stats)}")
+        print(f"Server latency: {_percentiles(server.latencies)}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the BOE scraper")
+    parser.add_argument("--base-url", help="Use an already running stand-in")
+    parser.add_argument("--start", default="2025-07-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=0, help="Soak for N seconds instead")
+    parser.add_argument("--articles-per-day", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of slow responses")
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=0, help="Articles per task run")
+    parser.add_argument("--concurrent", action="store_true", help="Submit batches concurrently")
+    parser.add_argument("--hedge", action="store_true", help="Hedge slow article fetches")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
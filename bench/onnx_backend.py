@@ -0,0 +1,93 @@
+"""Accuracy and throughput of the ONNX backends against PyTorch.
+
+Encodes generated BOE paragraphs with the ``torch``, ``onnx`` and
+``onnx-int8`` backends and reports, for each ONNX variant, the cosine
+similarity of its embeddings to the PyTorch ones, the overlap of top-k
+neighbours returned by a FAISS search over the corpus, and segments per
+second with ``--threads`` intra-op threads.
+
+    python -m bench.onnx_backend --segments 5000 --queries 200 --k 10 --threads 4
+
+``--model`` takes any sentence-transformers name or local directory.
+"""
+
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from bench.boe_server import render_article
+from tasks.indexing import EMBEDDING_MODEL
+from tasks.processing import segment_text
+
+
+def _segments(count: int) -> list[str]:
+    segments: list[str] = []
+    i = 0
+    while len(segments) < count:
+        xml = render_article(f"BOE-A-2025-{36000 + i:05d}", 20, "")
+        segments.extend(segment_text(ET.fromstring(xml).findtext("texto")))
+        i += 1
+    return segments[:count]
+
+
+def _encode(
+    backend: str, segments: list[str], threads: int, model_name: str = EMBEDDING_MODEL
+) -> tuple[np.ndarray, float]:
+    from tasks.encoding import load_encoder
+
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+    model = load_encoder(model_name, backend)
+    model.encode(segments[:64])  # warm up
+    start = time.perf_counter()
+    vectors = np.asarray(model.encode(segments, batch_size=32), dtype=np.float32)
+    return vectors, time.perf_counter() - start
+
+
+def _topk(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    import faiss
+
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index.search(queries, k)[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--segments", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    segments = _segments(args.segments)
+    queries = segments[:: max(1, len(segments) // args.queries)][: args.queries]
+    reference, elapsed = _encode("torch", segments, args.threads, args.model)
+    print(f"Segments: {len(segments)}  queries: {len(queries)}  threads: {args.threads}")
+    print(f"torch      {len(segments) / elapsed:8.1f} segments/s")
+    reference_q = reference[[segments.index(q) for q in queries]]
+    expected = _topk(reference, reference_q, args.k)
+
+    for backend in ("onnx", "onnx-int8"):
+        vectors, elapsed = _encode(backend, segments, args.threads, args.model)
+        cosine = (reference * vectors).sum(axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+        )
+        got = _topk(vectors, vectors[[segments.index(q) for q in queries]], args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(expected, got)])
+        print(
+            f"{backend:<10} {len(segments) / elapsed:8.1f} segments/s  "
+            f"cosine mean={cosine.mean():.4f} min={cosine.min():.4f}  "
+            f"top-{args.k} overlap={overlap:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
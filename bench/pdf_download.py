@@ -0,0 +1,104 @@
+"""Throughput, resume and memory of :func:`tasks.pdfs.download_pdfs`.
+
+Serves generated PDFs of about ``--pdf-kb`` KiB from :mod:`bench.boe_server`
+in a separate process, so its buffers do not count towards the client's
+memory. It cuts ``--truncate-rate`` of the bodies short halfway. Downloads ``--files``
+of them for each ``--workers`` setting into a scratch directory. Prints
+MB/s, how many transfers were resumed with a Range request, and the peak
+Python heap (``tracemalloc``) compared to the largest file. Every file is
+checked against the served bytes.
+
+    BOE_RATE_LIMIT=0 python -m bench.pdf_download --files 40 --pdf-kb 4096 --workers 1,4,8
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+
+from bench.boe_server import article_ids_for, pdf_size, render_pdf
+from tasks.metrics import METRICS
+from tasks.pdfs import download_pdfs
+
+
+@contextmanager
+def _server_process(args: argparse.Namespace):
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "bench.boe_server", "--port", "0",
+            "--pdf-kb", str(args.pdf_kb), "--latency-ms", str(args.latency_ms),
+            "--truncate-rate", str(args.truncate_rate),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # "BOE stand-in listening on http://127.0.0.1:PORT"
+        yield proc.stdout.readline().split()[-1]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(args: argparse.Namespace, workers: int) -> dict:
+    ids = article_ids_for(date(2025, 7, 1), args.files)
+    root = tempfile.mkdtemp(prefix="boe-pdfs-")
+    METRICS.enabled = True
+    METRICS.reset()
+    with _server_process(args) as base_url:
+        records = [
+            {
+                "id": boe_id,
+                "date": "2025-07-01",
+                "url_pdf": f"{base_url}/boe/dias/2025/07/01/pdfs/{boe_id}.pdf",
+                "pdf_bytes": pdf_size(boe_id, args.pdf_kb),
+            }
+            for boe_id in ids
+        ]
+        tracemalloc.start()
+        started = time.perf_counter()
+        results = download_pdfs.fn(records, root, max_workers=workers)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    for result in results:
+        boe_id = result["path"].rsplit("/", 1)[1][:-4]
+        with open(result["path"], "rb") as f:
+            if f.read() != render_pdf(boe_id, args.pdf_kb):
+                raise SystemExit(f"{boe_id}: downloaded file differs from the served PDF")
+    total = sum(r["bytes"] for r in results)
+    snap = METRICS.snapshot()["counters"]
+    return {
+        "workers": workers,
+        "files": len(results),
+        "mb_per_second": total / elapsed / 1e6,
+        "resumed": sum(v for (n, _), v in snap.items() if n == "boe_pdf_resumed_total"),
+        "peak_heap_mb": peak / 1e6,
+        "largest_mb": max(r["bytes"] for r in results) / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark streaming PDF downloads")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--pdf-kb", type=int, default=4096, help="Mean PDF size")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.1)
+    parser.add_argument("--workers", default="1,4,8", help="Concurrency settings to compare")
+    args = parser.parse_args()
+
+    for workers in (int(n) for n in args.workers.split(",")):
+        r = run(args, workers)
+        print(
+            f"workers={r['workers']:>2}  files={r['files']}  {r['mb_per_second']:7.1f} MB/s  "
+            f"resumed={r['resumed']:g}  "
+            f"peak heap {r['peak_heap_mb']:.1f} MB (largest file {r['largest_mb']:.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
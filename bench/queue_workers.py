@@ -0,0 +1,96 @@
+"""Scale ``queue_worker`` across processes against the BOE stand-in.
+
+Starts :mod:`bench.boe_server` in-process, then for each ``--workers``
+setting runs that many worker processes. The processes share one scratch
+database and ingest the same range of days from the work queue. Prints
+articles/s and how many requests the server answered beyond one per
+sumario and article. That excess is duplicated work and should be 0.
+
+    python -m bench.queue_workers --days 4 --articles-per-day 100 --workers 1,2,4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from bench.boe_server import BOEStandInServer, ServerConfig
+
+
+def _worker(workdir: str, base_url: str, start: str, end: str, batch_size: int) -> None:
+    os.chdir(workdir)
+    os.environ.update(
+        BOE_BASE=base_url,
+        BOE_CACHE_DIR=os.path.join(workdir, "cache"),
+        BOE_RATE_LIMIT=os.environ.get("BOE_RATE_LIMIT", "0"),
+    )
+    from flows.direct import run_flow
+    from flows.queue_worker import queue_worker
+
+    run_flow(queue_worker, "data/boe.db", start, end, batch_size, direct=True)
+
+
+def run(args: argparse.Namespace, workers: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="boe-queue-")
+    start = date.fromisoformat(args.start)
+    end = start + timedelta(days=args.days - 1)
+    config = ServerConfig(
+        articles_per_day=args.articles_per_day,
+        paragraphs=args.paragraphs,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+    )
+    ctx = multiprocessing.get_context("spawn")
+    with BOEStandInServer(config=config) as server:
+        started = time.perf_counter()
+        procs = [
+            ctx.Process(
+                target=_worker,
+                args=(workdir, server.base_url, start.isoformat(), end.isoformat(), args.batch_size),
+            )
+            for _ in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+        requests = sum(server.config.stats.values())
+    conn = sqlite3.connect(os.path.join(workdir, "data/boe.db"))
+    articles = conn.execute("SELECT count(*) FROM articles").fetchone()[0]
+    sumarios = conn.execute("SELECT count(*) FROM work_items WHERE kind = 'day'").fetchone()[0]
+    conn.close()
+    return {
+        "workers": workers,
+        "articles": articles,
+        "seconds": elapsed,
+        "articles_per_second": articles / elapsed,
+        "duplicate_requests": requests - articles - sumarios,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scale queue workers horizontally")
+    parser.add_argument("--start", default="2025-07-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=4)
+    parser.add_argument("--articles-per-day", type=int, default=100)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", default="1,2,4", help="Worker process counts to compare")
+    args = parser.parse_args()
+
+    for workers in (int(n) for n in args.workers.split(",")):
+        r = run(args, workers)
+        print(
+            f"workers={r['workers']:>2}  articles={r['articles']}  wall={r['seconds']:6.1f}s  "
+            f"{r['articles_per_second']:6.1f} articles/s  duplicate requests={r['duplicate_requests']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
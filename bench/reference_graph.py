@@ -0,0 +1,106 @@
+"""Benchmark reference graph loading and multi-hop traversal.
+
+Writes a synthetic ``reference_edges`` table (each article links to a few
+earlier ones, with a handful of heavily amended laws) into a scratch SQLite
+database, then times :meth:`ReferenceGraph.load` and ``modified_by`` queries
+at increasing depths.
+
+    python -m bench.reference_graph --articles 500000 --edges-per-article 3
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from tasks.database import init_db
+from tasks.references import ReferenceGraph, modified_by
+
+_RELATIONS = ["MODIFICA", "DEROGA", "CITA", "AÑADE", "DE CONFORMIDAD CON"]
+
+
+def _populate(db_path: str, articles: int, per_article: int, seed: int) -> int:
+    rng = random.Random(seed)
+    hubs = max(1, articles // 1000)
+    conn = sqlite3.connect(db_path)
+    edges = 0
+    batch = []
+    for n in range(1, articles):
+        source = f"BOE-A-{n:07d}"
+        for _ in range(rng.randint(0, 2 * per_article)):
+            # A third of the links point at a few long-lived, much amended laws
+            target = rng.randrange(hubs) if rng.random() < 0.33 else rng.randrange(n)
+            batch.append((source, f"BOE-A-{target:07d}", rng.choice(_RELATIONS), source))
+        if len(batch) >= 50000:
+            conn.executemany(
+                "INSERT OR IGNORE INTO reference_edges (source, target, relation, origin) "
+                "VALUES (?, ?, ?, ?)",
+                batch,
+            )
+            edges += len(batch)
+            batch = []
+    conn.executemany(
+        "INSERT OR IGNORE INTO reference_edges (source, target, relation, origin) "
+        "VALUES (?, ?, ?, ?)",
+        batch,
+    )
+    edges += len(batch)
+    conn.commit()
+    conn.close()
+    return edges
+
+
+def _percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return f"p50={pick(0.50):.2f}ms p95={pick(0.95):.2f}ms p99={pick(0.99):.2f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the reference graph")
+    parser.add_argument("--articles", type=int, default=200000)
+    parser.add_argument("--edges-per-article", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="boe-graph-"), "boe.db")
+    init_db.fn(db_path)
+    edges = _populate(db_path, args.articles, args.edges_per_article, args.seed)
+
+    start = time.perf_counter()
+    graph = ReferenceGraph.load(db_path)
+    print(
+        f"Graph: {len(graph.nodes)} nodes, {graph.edge_count} edges "
+        f"({edges} rows), load {time.perf_counter() - start:.2f}s"
+    )
+
+    rng = random.Random(args.seed)
+    targets = [f"BOE-A-{rng.randrange(args.articles):07d}" for _ in range(args.queries)]
+    hubs = [f"BOE-A-{i:07d}" for i in range(max(1, args.articles // 1000))]
+    modified_by.fn(targets[0], db_path=db_path)  # warm the cached graph
+    for depth in (1, 2, 3):
+        samples, found = [], 0
+        for target in targets:
+            t0 = time.perf_counter()
+            found += len(modified_by.fn(target, max_depth=depth, db_path=db_path))
+            samples.append(time.perf_counter() - t0)
+        print(
+            f"modified_by depth={depth}: {_percentiles(samples)} "
+            f"avg results {found / len(targets):.1f}"
+        )
+    samples = []
+    for hub in hubs[:100]:
+        t0 = time.perf_counter()
+        modified_by.fn(hub, max_depth=1, db_path=db_path)
+        samples.append(time.perf_counter() - t0)
+    print(f"modified_by on hub laws depth=1: {_percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Load generator for the micro-batching search service.
+
+Starts :class:`tasks.search_service.SearchHTTPServer` in-process for each
+``--batch-sizes`` setting and fires ``--requests`` queries from
+``--concurrency`` client threads over keep-alive connections. Prints QPS,
+client-side p50/p99 latency and the mean batch size the service formed.
+A batch size of 1 is the unbatched baseline.
+
+Without ``--snapshot-dir`` a random Flat index of ``--vectors`` rows is
+published to a scratch snapshot directory. ``--synthetic`` replaces the sentence-transformers model
+with a batched numpy stand-in of similar shape.
+
+    python -m bench.search_service --synthetic --concurrency 32 --batch-sizes 1,8,32
+"""
+
+import argparse
+import http.client
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+from tasks.encoding import load_sentence_transformer
+from tasks.indexing import EMBEDDING_MODEL
+from tasks.search_service import SearchHTTPServer, SearchService
+
+
+class _BatchedSyntheticModel:
+    """MiniLM-shaped feed-forward stack (384 -> 1536 -> 384, six layers)
+    over padded token matrices, batched like a transformer."""
+
+    def __init__(self, dim: int = 384, layers: int = 6):
+        rng = np.random.default_rng(0)
+        self.layers = [
+            (
+                rng.standard_normal((dim, 4 * dim), dtype=np.float32) / np.sqrt(dim),
+                rng.standard_normal((4 * dim, dim), dtype=np.float32) / np.sqrt(4 * dim),
+            )
+            for _ in range(layers)
+        ]
+        self.dim = dim
+
+    def encode(self, sentences, batch_size: int = 32):
+        tokens = max(len(s.split()) for s in sentences) + 2
+        x = np.empty((len(sentences) * tokens, self.dim), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            x[i * tokens : (i + 1) * tokens] = (hash(sentence) % 97) / 97
+        for up, down in self.layers:
+            x = np.tanh(np.maximum(x @ up, 0) @ down)
+        return x.reshape(len(sentences), tokens, self.dim).mean(axis=1)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+
+def _synthetic_snapshot(directory: Path, vectors: int, dim: int) -> str:
+    import faiss
+
+    from tasks.snapshots import publish_snapshot, stage_snapshot
+
+    staging = stage_snapshot(str(directory))
+    index = faiss.IndexFlatL2(dim)
+    rng = np.random.default_rng(1)
+    index.add(rng.standard_normal((vectors, dim), dtype=np.float32))
+    faiss.write_index(index, str(staging / "index.faiss"))
+    (staging / "index_meta.jsonl").write_text(
+        "\n".join(json.dumps({"id": f"BOE-A-{i // 10:07d}", "seq": i % 10}) for i in range(vectors)),
+        encoding="utf-8",
+    )
+    publish_snapshot(str(directory), staging)
+    return str(directory)
+
+
+def _client(base_url: str, queries: list[str], k: int, latencies: list[float]) -> None:
+    host = base_url.split("//", 1)[1]
+    conn = http.client.HTTPConnection(host, timeout=60)
+    for query in queries:
+        started = time.perf_counter()
+        conn.request("GET", f"/search?q={quote(query)}&k={k}")
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"search returned {response.status}")
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def run(model, snapshot_dir: str, args: argparse.Namespace, max_batch_size: int) -> dict:
+    service = SearchService(
+        model,
+        snapshot_dir=snapshot_dir,
+        max_batch_size=max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    words = "real decreto orden ayudas vivienda empleo tributos sanidad educacion energia".split()
+    rng = np.random.default_rng(2)
+    queries = [" ".join(rng.choice(words, size=6)) for _ in range(args.requests)]
+    per_client = [queries[i :: args.concurrency] for i in range(args.concurrency)]
+    latencies: list[float] = []
+    with SearchHTTPServer(service, ("127.0.0.1", 0)) as server:
+        threads = [
+            threading.Thread(target=_client, args=(server.base_url, chunk, args.k, latencies))
+            for chunk in per_client
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    stats = service.stats()
+    service.close()
+    return {
+        "max_batch_size": max_batch_size,
+        "qps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_batch": stats["mean_batch_size"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the search service")
+    parser.add_argument("--snapshot-dir", help="Published index snapshots to search")
+    parser.add_argument("--vectors", type=int, default=20_000, help="Synthetic index size")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-sizes", default="1,8,32", help="max_batch_size values to compare")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--synthetic", action="store_true", help="Use a numpy stand-in model")
+    args = parser.parse_args()
+
+    model = _BatchedSyntheticModel() if args.synthetic else load_sentence_transformer(EMBEDDING_MODEL)
+    snapshot_dir = args.snapshot_dir or _synthetic_snapshot(
+        Path(tempfile.mkdtemp(prefix="boe-search-")),
+        args.vectors,
+        model.get_sentence_embedding_dimension(),
+    )
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} k={args.k} "
+        f"max_wait={args.max_wait_ms}ms model={'synthetic' if args.synthetic else EMBEDDING_MODEL}"
+    )
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        r = run(model, snapshot_dir, args, size)
+        print(
+            f"max_batch_size={r['max_batch_size']:>3}  qps={r['qps']:8.1f}  "
+            f"p50={r['p50_ms']:7.1f}ms  p99={r['p99_ms']:7.1f}ms  mean batch={r['mean_batch']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Passage lookup: segment store versus re-splitting the article text.
+
+Stores ``--articles`` generated BOE articles in a scratch SQLite database
+and their paragraphs in a :class:`tasks.segments.SegmentStore`, then
+resolves ``--lookups`` random ``(id, seq)`` hits with ``--context``
+neighbours both ways: loading ``articles.text`` and running
+``segment_text`` again, and one range query on the segment store.
+
+    python -m bench.segment_store --articles 5000 --paragraphs 40 --context 1
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+from bench.boe_server import render_article
+from tasks.processing import segment_text
+from tasks.segments import SegmentStore
+
+
+def _percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+
+    return f"p50={pick(0.50):7.1f}us  p99={pick(0.99):7.1f}us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark passage lookups")
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--context", type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="boe-segments-")
+    db_path = os.path.join(workdir, "boe.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE articles (id TEXT PRIMARY KEY, text TEXT)")
+    store = SegmentStore(os.path.join(workdir, "segments.db"))
+    counts = {}
+    for n in range(args.articles):
+        boe_id = f"BOE-A-2025-{n:05d}"
+        text = ET.fromstring(render_article(boe_id, args.paragraphs, "")).findtext("texto")
+        segments = segment_text(text)
+        conn.execute("INSERT INTO articles VALUES (?, ?)", (boe_id, "\n".join(segments)))
+        store.put(boe_id, segments)
+        counts[boe_id] = len(segments)
+    conn.commit()
+    store.commit()
+
+    rng = random.Random(0)
+    ids = list(counts)
+    hits = [(boe_id, rng.randrange(counts[boe_id])) for boe_id in rng.choices(ids, k=args.lookups)]
+    ctx = args.context
+
+    resplit = []
+    for boe_id, seq in hits:
+        started = time.perf_counter()
+        (text,) = conn.execute("SELECT text FROM articles WHERE id = ?", (boe_id,)).fetchone()
+        segments = segment_text(text)
+        segments[max(0, seq - ctx) : seq + ctx + 1]
+        resplit.append(time.perf_counter() - started)
+
+    lookup = []
+    for boe_id, seq in hits:
+        started = time.perf_counter()
+        store.passage(boe_id, seq, ctx)
+        lookup.append(time.perf_counter() - started)
+
+    print(f"articles={args.articles} paragraphs={args.paragraphs} context={ctx}")
+    print(f"re-split article text:  {_percentiles(resplit)}")
+    print(f"segment store lookup:   {_percentiles(lookup)}")
+    store.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
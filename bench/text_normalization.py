@@ -0,0 +1,63 @@
+"""Microbenchmark for the batch text normalization API.
+
+Compares the per-document ``clean_boe_text`` + ``split_into_paragraphs``
+pair against :func:`tasks.processing.segment_texts`, serially and over a
+process pool, on generated BOE-like article texts.
+
+    python -m bench.text_normalization --documents 20000 --processes 4
+"""
+
+import argparse
+import time
+import xml.etree.ElementTree as ET
+
+from bench.boe_server import render_article
+from tasks.processing import clean_boe_text, segment_texts, split_into_paragraphs
+
+
+def _documents(count: int, paragraphs: int) -> list[str]:
+    texts = []
+    for i in range(count):
+        xml = render_article(f"BOE-A-2025-{36000 + i % 200:05d}", paragraphs, "")
+        raw = ET.fromstring(xml).findtext("texto")
+        # Real BOE bodies carry CRLFs, tabs and runs of spaces
+        texts.append(raw.replace("\n\n", "\r\n  \t\n").replace(" de ", "  de\t"))
+    return texts
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark text normalization")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = _documents(args.documents, args.paragraphs)
+    expected = [split_into_paragraphs(clean_boe_text(t)) for t in texts]
+    assert segment_texts(texts) == expected
+    assert segment_texts(texts, processes=args.processes) == expected
+
+    legacy = _best(
+        lambda: [split_into_paragraphs(clean_boe_text(t)) for t in texts], args.repeat
+    )
+    batch = _best(lambda: segment_texts(texts), args.repeat)
+    pooled = _best(lambda: segment_texts(texts, processes=args.processes), args.repeat)
+    mb = sum(map(len, texts)) / 1e6
+    print(f"Documents: {len(texts)} ({mb:.1f} MB), outputs identical")
+    print(f"clean+split per document: {legacy:.3f}s ({mb / legacy:.0f} MB/s)")
+    print(f"segment_texts serial:     {batch:.3f}s ({legacy / batch:.2f}x)")
+    print(f"segment_texts {args.processes} procs:    {pooled:.3f}s ({legacy / pooled:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
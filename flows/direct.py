@@ -0,0 +1,61 @@
+"""Run flows as plain Python functions, without the Prefect engine.
+
+Calling a flow starts the Prefect engine (and, without ``PREFECT_API_URL``,
+a temporary API server), which costs seconds before the first task runs.
+Inside :func:`direct_execution` every flow and task referenced from the
+``flows`` and ``tasks`` modules is swapped for a shim that calls its
+``.fn`` directly; ``.submit`` runs on a thread pool, like Prefect's default
+task runner. Retries, result caching, task run states and artifacts are
+skipped in this mode.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+import sys
+
+from prefect import Flow, Task
+
+_PACKAGES = ("flows.", "tasks.")
+
+
+class _DirectCall:
+    """Stand-in for a Prefect task or flow that runs its function directly."""
+
+    def __init__(self, wrapped, executor: ThreadPoolExecutor):
+        self.fn = wrapped.fn
+        self.name = wrapped.name
+        self._executor = executor
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def submit(self, *args, **kwargs):
+        return self._executor.submit(self.fn, *args, **kwargs)
+
+
+@contextmanager
+def direct_execution(max_workers: int | None = None) -> Iterator[None]:
+    """Swap loaded flows and tasks for direct calls until the block exits."""
+    swapped = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for name, module in list(sys.modules.items()):
+            if module is None or not name.startswith(_PACKAGES):
+                continue
+            for attr, value in list(vars(module).items()):
+                if isinstance(value, (Flow, Task)):
+                    setattr(module, attr, _DirectCall(value, executor))
+                    swapped.append((module, attr, value))
+        try:
+            yield
+        finally:
+            for module, attr, value in swapped:
+                setattr(module, attr, value)
+
+
+def run_flow(flow: Flow, *args, direct: bool = False, **kwargs):
+    """Call ``flow`` through the Prefect engine, or directly with ``direct``."""
+    if not direct:
+        return flow(*args, **kwargs)
+    with direct_execution():
+        return flow.fn(*args, **kwargs)
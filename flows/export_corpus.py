@@ -0,0 +1,30 @@
+from prefect import flow
+
+from tasks.database import init_db
+from tasks.export import export_corpus_to_parquet
+
+
+@flow
+def export_corpus(
+    db_path: str = "data/boe.db",
+    out_dir: str = "data/parquet",
+    include_embeddings: bool = False,
+    full: bool = False,
+    snapshot_dir: str | None = None,
+):
+    print("Inicio del flow export_corpus")
+    print(
+        f"Par\u00e1metros -> db_path: {db_path}, out_dir: {out_dir}, "
+        f"include_embeddings: {include_embeddings}, full: {full}, snapshot_dir: {snapshot_dir}"
+    )
+
+    init_db(db_path)
+    days = export_corpus_to_parquet(
+        db_path,
+        out_dir,
+        include_embeddings=include_embeddings,
+        full=full,
+        snapshot_dir=snapshot_dir,
+    )
+    print(f"Fin del flow export_corpus -> d\u00edas exportados: {len(days)}")
+    return days
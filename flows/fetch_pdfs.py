@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from prefect import flow
+
+from tasks import budget
+from tasks.database import (
+    forget_pdf_files,
+    init_db,
+    pending_pdfs,
+    record_pdf_files,
+    stored_pdf_files,
+)
+from tasks.metrics import METRICS
+from tasks.pdfs import PDF_CONCURRENCY, PDF_DIR, download_pdfs, file_sha256
+
+
+def _damaged(rows: list[dict]) -> list[str]:
+    damaged = []
+    for row in rows:
+        path = Path(row["path"])
+        if not path.exists() or file_sha256(path) != row["sha256"]:
+            path.unlink(missing_ok=True)
+            damaged.append(row["id"])
+    return damaged
+
+
+@flow
+def fetch_pdfs(
+    db_path: str = "data/boe.db",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    limit: int | None = None,
+    root: str | None = None,
+    max_workers: int | None = None,
+    verify: bool = False,
+):
+    """Download the PDFs of stored articles that do not have one yet.
+
+    ``verify`` first re-hashes the PDFs already recorded for the date range.
+    Missing or changed files are deleted and downloaded again. ``root``
+    and ``max_workers`` default to ``BOE_PDF_DIR`` and ``BOE_PDF_CONCURRENCY``.
+    """
+    root = root or PDF_DIR
+    max_workers = max_workers or PDF_CONCURRENCY
+    print("Inicio del flow fetch_pdfs")
+    print(
+        f"Par\u00e1metros -> db_path: {db_path}, date_from: {date_from}, "
+        f"date_to: {date_to}, limit: {limit}, root: {root}, verify: {verify}"
+    )
+    with METRICS.collect("fetch-pdfs"):
+        budget.reset()
+        init_db(db_path)
+        damaged = []
+        if verify:
+            damaged = _damaged(stored_pdf_files(db_path, date_from, date_to))
+            forget_pdf_files(damaged, db_path)
+            print(f"PDF da\u00f1ados: {len(damaged)}")
+
+        pending = pending_pdfs(db_path, date_from, date_to, limit)
+        print(f"PDF pendientes: {len(pending)}")
+        results = download_pdfs(pending, root, max_workers)
+        record_pdf_files(results, db_path)
+
+        stored = sum(not r["skipped"] for r in results)
+        print(
+            f"Fin del flow fetch_pdfs -> descargados: {stored}, "
+            f"ya presentes: {len(results) - stored}, fallidos: {len(pending) - len(results)}"
+        )
+        return {
+            "downloaded": stored,
+            "present": len(results) - stored,
+            "failed": len(pending) - len(results),
+            "damaged": len(damaged),
+        }
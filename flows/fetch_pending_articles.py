@@ -0,0 +1,41 @@
+from itertools import groupby
+
+from prefect import flow
+
+from tasks import budget
+from tasks.database import init_db, pending_articles
+from tasks.ingest import chunked, ingest_article_batch
+
+
+@flow
+def fetch_pending_articles(
+    db_path: str = "data/boe.db",
+    limit: int | None = None,
+    batch_size: int = 20,
+    concurrent: bool = False,
+):
+    """Download full texts for metadata rows stored without their article."""
+    print("Inicio del flow fetch_pending_articles")
+    print(f"Par\u00e1metros -> db_path: {db_path}, limit: {limit}")
+
+    budget.reset()
+    init_db(db_path)
+    pending = pending_articles(db_path, limit)
+    print(f"Art\u00edculos pendientes: {len(pending)}")
+
+    jobs = []
+    for date_iso, rows in groupby(pending, key=lambda row: row[1]):
+        ids = [boe_id for boe_id, _ in rows]
+        jobs.extend((chunk, date_iso) for chunk in chunked(ids, batch_size))
+
+    if concurrent:
+        futures = [ingest_article_batch.submit(ids, d, db_path) for ids, d in jobs]
+        processed = sum(f.result() for f in futures)
+    else:
+        processed = sum(ingest_article_batch(ids, d, db_path) for ids, d in jobs)
+
+    print(
+        "Fin del flow fetch_pending_articles -> art\u00edculos almacenados: "
+        f"{processed}"
+    )
+    return processed
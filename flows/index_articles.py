@@ -1,19 +1,42 @@
 from prefect import flow
 
+from flows.fetch_pending_articles import fetch_pending_articles
 from tasks.database import init_db, fetch_all_articles
 from tasks.indexing import create_or_update_index
+from tasks.metrics import METRICS
 
 
 @flow
-def index_articles(db_path: str = "data/boe.db"):
+def index_articles(
+    db_path: str = "data/boe.db",
+    fetch_pending: bool = False,
+    workers: int = 0,
+    threads_per_worker: int = 1,
+    snapshot_dir: str | None = None,
+):
     print("Inicio del flow index_articles")
-    print(f"Par\u00e1metros -> db_path: {db_path}")
-
-    init_db(db_path)
-    records = fetch_all_articles(db_path)
-    print(f"Art\u00edculos recuperados: {len(records)}")
-    create_or_update_index(records)
     print(
-        "Fin del flow index_articles -> art\u00edculos indexados: "
-        f"{len(records)}"
+        f"Par\u00e1metros -> db_path: {db_path}, fetch_pending: {fetch_pending}, "
+        f"workers: {workers}, threads_per_worker: {threads_per_worker}, "
+        f"snapshot_dir: {snapshot_dir}"
     )
+
+    with METRICS.collect("index-articles"):
+        init_db(db_path)
+        if fetch_pending:
+            # Articles ingested in metadata-only mode need their text first
+            fetch_pending_articles(db_path)
+        with METRICS.timer("boe_stage_seconds", stage="db_read"):
+            records = fetch_all_articles(db_path)
+        print(f"Art\u00edculos recuperados: {len(records)}")
+        with METRICS.timer("boe_stage_seconds", stage="index"):
+            create_or_update_index(
+                records,
+                workers=workers,
+                threads_per_worker=threads_per_worker,
+                snapshot_dir=snapshot_dir,
+            )
+        print(
+            "Fin del flow index_articles -> art\u00edculos indexados: "
+            f"{len(records)}"
+        )
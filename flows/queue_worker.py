@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+from prefect import flow
+
+from tasks import budget
+from tasks.boe import SumarioNotFound, fetch_index_xml, parse_sumario_items
+from tasks.database import init_db, insert_metadata_records
+from tasks.ingest import ingest_article_batch
+from tasks.metrics import METRICS
+from tasks.work_queue import LEASE_SECONDS, WorkQueue, worker_name
+
+
+def _days(start_date: str, end_date: str | None) -> list[tuple[str, str]]:
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date) if end_date else start
+    return [
+        ((start + timedelta(days=n)).isoformat(),) * 2
+        for n in range((end - start).days + 1)
+    ]
+
+
+@flow
+def queue_worker(
+    db_path: str = "data/boe.db",
+    start_date: str | None = None,
+    end_date: str | None = None,
+    batch_size: int = 20,
+    lease_seconds: float | None = None,
+    max_batches: int | None = None,
+    worker: str | None = None,
+):
+    """Ingest days and articles claimed from the shared work queue.
+
+    Any number of workers can run this flow against the same ``db_path``.
+    ``start_date``/``end_date`` (``YYYY-MM-DD``) enqueue those days first;
+    days already queued keep their state, so every worker may pass the same
+    range. A claimed day has its sumario fetched and its metadata stored,
+    and its articles are queued. Articles are then claimed ``batch_size`` at
+    a time and ingested under a heartbeated lease. A day or batch that
+    raises is returned to the queue (or parked once out of attempts) and the
+    worker moves on. It stops when nothing is left to claim or after
+    ``max_batches`` article batches.
+    """
+    worker = worker or worker_name()
+    print("Inicio del flow queue_worker")
+    print(
+        f"Par\u00e1metros -> db_path: {db_path}, start_date: {start_date}, "
+        f"end_date: {end_date}, batch_size: {batch_size}, worker: {worker}"
+    )
+    with METRICS.collect("queue-worker"):
+        budget.reset()
+        init_db(db_path)
+        queue = WorkQueue(db_path, lease_seconds or LEASE_SECONDS)
+        if start_date:
+            added = queue.enqueue("day", _days(start_date, end_date))
+            print(f"D\u00edas encolados: {added}")
+
+        days = batches = stored = errors = 0
+        while max_batches is None or batches < max_batches:
+            claimed = []
+            try:
+                with queue.lease("day", worker) as claimed:
+                    for date_iso, _ in claimed:
+                        with METRICS.timer("boe_stage_seconds", stage="sumario_fetch"):
+                            # Bypass the sumario result cache, as sync_boe does
+                            index_xml = fetch_index_xml.fn(*date_iso.split("-"))
+                        if not index_xml:
+                            # Fail the lease so the day is retried, then parked
+                            raise SumarioNotFound(date_iso)
+                        items = parse_sumario_items(index_xml, date_iso)
+                        with METRICS.timer("boe_stage_seconds", stage="db_write"):
+                            insert_metadata_records(items, db_path)
+                        queue.enqueue("article", [(item["id"], date_iso) for item in items])
+                        days += 1
+            except Exception as exc:
+                if not claimed:
+                    raise
+                # The lease already returned the day to the queue
+                errors += 1
+                print(f"Error en el d\u00eda {claimed[0][0]}: {exc}")
+            if claimed:
+                continue
+            try:
+                with queue.lease("article", worker, batch_size) as claimed:
+                    # A batch can span days; ingest each day's ids together
+                    by_day: dict[str, list[str]] = {}
+                    for boe_id, date_iso in claimed:
+                        by_day.setdefault(date_iso, []).append(boe_id)
+                    for date_iso, ids in by_day.items():
+                        stored += ingest_article_batch(ids, date_iso, db_path)
+            except Exception as exc:
+                if not claimed:
+                    raise
+                errors += 1
+                print(f"Error en un lote de {len(claimed)} art\u00edculos: {exc}")
+            if not claimed:
+                break
+            batches += 1
+
+        counts = queue.counts()
+        queue.close()
+        print(
+            f"Fin del flow queue_worker -> d\u00edas: {days}, lotes: {batches}, "
+            f"art\u00edculos almacenados: {stored}, errores: {errors}, cola: {counts}"
+        )
+        return {"days": days, "batches": batches, "articles": stored}
@@ -1,17 +1,35 @@
 from prefect import flow
-from tasks.scraping import scrape_example_page
+from tasks.scraping import scrape_example_page, scrape_pages
 from tasks.storage import storage_text
 
 
 @flow
-def scrape_and_store(url: str, filename: str):
+def scrape_and_store(
+    url: str | list[str],
+    filename: str | list[str],
+    engine: str | None = None,
+    max_workers: int = 8,
+):
+    """Store the text of ``url`` in ``data/raw/<filename>``.
+
+    Lists of URLs and matching file names are fetched together by
+    ``scrape_pages`` on ``max_workers`` threads. ``engine`` selects the text
+    extractor (see :mod:`tasks.scraping`).
+    """
     print("Inicio del flow scrape_and_store")
     print(f"Par\u00e1metros -> url: {url}, filename: {filename}")
 
-    text = scrape_example_page(url)
-    storage_text(text, filename)
+    if isinstance(url, str):
+        texts, filenames = [scrape_example_page(url, engine)], [filename]
+    else:
+        filenames = [filename] if isinstance(filename, str) else list(filename)
+        if len(filenames) != len(url):
+            raise ValueError("url and filename must have the same number of entries")
+        texts = scrape_pages(list(url), engine, max_workers)
+    for text, name in zip(texts, filenames):
+        storage_text(text, name)
 
     print(
-        "Fin del flow scrape_and_store -> art\u00edculos procesados: 1, "
-        f"caracteres guardados: {len(text)}"
+        f"Fin del flow scrape_and_store -> art\u00edculos procesados: {len(texts)}, "
+        f"caracteres guardados: {sum(len(text) for text in texts)}"
     )
@@ -1,57 +1,140 @@
+import time
+
 from prefect import flow
 from tasks.boe import (
+    SumarioNotFound,
     fetch_index_xml,
     extract_article_ids,
     get_article_metadata,
     fetch_article_xml,
     parse_article_xml,
+    parse_sumario_items,
+)
+from tasks.database import (
+    init_db,
+    insert_article,
+    insert_metadata_records,
+    article_exists,
 )
-from tasks.database import init_db, insert_article, article_exists
+from tasks.dedup import link_near_duplicate_articles
+from tasks.ingest import chunked, ingest_article_batch
+from tasks import budget
+from tasks.metrics import METRICS
+from tasks.storage import append_metadata_buffered, get_metadata_writer
 
 
 @flow
-def scrape_boe_day_metadata(url_date_str: str = "2025/07/03"):
-    print("Inicio del flow scrape_boe_day_metadata")
-    print(f"Par\u00e1metros -> url_date_str: {url_date_str}")
-
-    # Parse year, month, day from url_date_str (e.g., "2025/07/03")
-    parts = url_date_str.split("/")
-    if len(parts) != 3:
-        raise ValueError("url_date_str must be in YYYY/MM/DD format")
-    year, month, day = parts[0], parts[1], parts[2]
-
-    # Ensure database is initialized
-    init_db()
-
-    index_boes = fetch_index_xml(year, month, day)
-    if not index_boes:
-        print("No existe \u00edndice para la fecha indicada.")
-        return
-    boe_ids = extract_article_ids(index_boes)
-    print(f"Art\u00edculos encontrados: {len(boe_ids)}")
-
-    # Reconstruct the date in YYYY-MM-DD format for get_article_metadata
-    date_iso = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-
-    processed = 0
-    for boe_id in boe_ids:
-        # Skip if already stored
-        if article_exists(boe_id):
-            continue
-
-        metadata = get_article_metadata(boe_id, date_iso)
-        xml_text = fetch_article_xml(boe_id)
-        article_data = parse_article_xml(xml_text)
-        record = {
-            **metadata,
-            "title": article_data.get("title"),
-            "department": article_data.get("department"),
-            "rank": article_data.get("rank"),
-        }
-        insert_article(record, "\n".join(article_data.get("segments", [])))
-        processed += 1
+def scrape_boe_day_metadata(
+    url_date_str: str = "2025/07/03",
+    batch_size: int = 0,
+    concurrent: bool = False,
+    metadata_only: bool = False,
+    metadata_archive: str | None = None,
+):
+    """Store every article published on ``url_date_str``.
 
+    With ``batch_size`` > 0 the articles are handled in chunks, one
+    ``ingest_article_batch`` task run per chunk, instead of several task runs
+    per article. ``concurrent`` submits the chunks to the flow's task runner.
+    ``metadata_only`` fills the ``metadata`` table from the sumario alone and
+    leaves the full texts to ``fetch_pending_articles``. With
+    ``metadata_archive`` the sumario metadata is also appended to the
+    compressed daily JSONL files in that directory (see
+    :class:`tasks.storage.MetadataWriter`).
+    """
+    print("Inicio del flow scrape_boe_day_metadata")
     print(
-        "Fin del flow scrape_boe_day_metadata -> art\u00edculos almacenados: "
-        f"{processed}"
+        f"Par\u00e1metros -> url_date_str: {url_date_str}, "
+        f"batch_size: {batch_size}, concurrent: {concurrent}, "
+        f"metadata_only: {metadata_only}, metadata_archive: {metadata_archive}"
     )
+    with METRICS.collect("scrape-boe-day-metadata"):
+        started = time.perf_counter()
+        budget.reset()
+
+        # Parse year, month, day from url_date_str (e.g., "2025/07/03")
+        parts = url_date_str.split("/")
+        if len(parts) != 3:
+            raise ValueError("url_date_str must be in YYYY/MM/DD format")
+        year, month, day = parts[0], parts[1], parts[2]
+
+        # Reconstruct the date in YYYY-MM-DD format for get_article_metadata
+        date_iso = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+        # Ensure database is initialized
+        init_db()
+
+        with METRICS.timer("boe_stage_seconds", stage="sumario_fetch"):
+            try:
+                index_boes = fetch_index_xml(year, month, day)
+            except SumarioNotFound:
+                index_boes = b""
+        if not index_boes:
+            print("No existe \u00edndice para la fecha indicada.")
+            return
+
+        records = (
+            parse_sumario_items(index_boes, date_iso) if metadata_only or metadata_archive else []
+        )
+        if metadata_archive:
+            archived = append_metadata_buffered(records, metadata_archive)
+            # Durable when the flow ends, not only at interpreter exit
+            get_metadata_writer(metadata_archive).flush()
+            print(f"Registros archivados en {metadata_archive}: {archived}")
+
+        if metadata_only:
+            with METRICS.timer("boe_stage_seconds", stage="db_write"):
+                stored = insert_metadata_records(records)
+            METRICS.inc("boe_metadata_records_total", stored)
+            print(
+                "Fin del flow scrape_boe_day_metadata -> registros de metadata: "
+                f"{stored}"
+            )
+            return
+
+        boe_ids = extract_article_ids(index_boes)
+        print(f"Art\u00edculos encontrados: {len(boe_ids)}")
+
+        processed = 0
+        if batch_size > 0:
+            chunks = chunked(boe_ids, batch_size)
+            if concurrent:
+                futures = [ingest_article_batch.submit(c, date_iso) for c in chunks]
+                processed = sum(f.result() for f in futures)
+            else:
+                processed = sum(ingest_article_batch(c, date_iso) for c in chunks)
+        else:
+            for boe_id in boe_ids:
+                # Skip if already stored
+                with METRICS.timer("boe_stage_seconds", stage="exists_check"):
+                    exists = article_exists(boe_id)
+                if exists:
+                    METRICS.inc("boe_articles_skipped_total")
+                    continue
+
+                metadata = get_article_metadata(boe_id, date_iso)
+                with METRICS.timer("boe_stage_seconds", stage="article_fetch"):
+                    xml_text = fetch_article_xml(boe_id)
+                with METRICS.timer("boe_stage_seconds", stage="parse"):
+                    article_data = parse_article_xml(xml_text)
+                record = {
+                    **metadata,
+                    "title": article_data.get("title"),
+                    "department": article_data.get("department"),
+                    "rank": article_data.get("rank"),
+                }
+                text = "\n".join(article_data.get("segments", []))
+                with METRICS.timer("boe_stage_seconds", stage="db_write"):
+                    insert_article(record, text, details=article_data)
+                with METRICS.timer("boe_stage_seconds", stage="dedup"):
+                    link_near_duplicate_articles([(record, text)])
+                processed += 1
+
+        elapsed = time.perf_counter() - started
+        METRICS.inc("boe_articles_total", processed)
+        METRICS.set_gauge("boe_articles_per_second", processed / elapsed if elapsed else 0.0)
+
+        print(
+            "Fin del flow scrape_boe_day_metadata -> art\u00edculos almacenados: "
+            f"{processed}"
+        )
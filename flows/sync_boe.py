@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from prefect import flow
+
+from tasks import budget
+from tasks.boe import SumarioNotFound, fetch_index_xml, parse_sumario_items, sumario_hash
+from tasks.database import (
+    init_db,
+    insert_metadata_records,
+    record_pdf_files,
+    record_sync_state,
+    sync_hashes,
+    sync_watermark,
+)
+from tasks.ingest import chunked, ingest_article_batch
+from tasks.metrics import METRICS
+from tasks.pdfs import download_pdfs
+
+
+@flow
+def sync_boe(
+    db_path: str = "data/boe.db",
+    start_date: str | None = None,
+    end_date: str | None = None,
+    lookback_days: int = 3,
+    batch_size: int = 20,
+    metadata_only: bool = False,
+    pdfs: bool = False,
+):
+    """Bring the database up to date from the last synced day.
+
+    Days after the watermark (the latest day in ``sync_state``) are synced,
+    plus the ``lookback_days`` before it to pick up late corrections. A day
+    whose sumario hashes the same as when it was last synced is skipped
+    without touching its articles. Without a watermark the sync starts at
+    ``start_date`` (``YYYY-MM-DD``), by default ``end_date``, which in
+    turn defaults to today. A day is only recorded once all its articles are
+    stored, so a failed day is retried by the next run. ``pdfs`` also
+    downloads the PDFs of synced days (see :mod:`tasks.pdfs`).
+    """
+    print("Inicio del flow sync_boe")
+    print(
+        f"Par\u00e1metros -> db_path: {db_path}, start_date: {start_date}, "
+        f"end_date: {end_date}, lookback_days: {lookback_days}, "
+        f"metadata_only: {metadata_only}, pdfs: {pdfs}"
+    )
+
+    with METRICS.collect("sync-boe"):
+        budget.reset()
+        init_db(db_path)
+        end = date.fromisoformat(end_date) if end_date else date.today()
+        watermark = sync_watermark(db_path)
+        if watermark:
+            start = date.fromisoformat(watermark) - timedelta(days=lookback_days)
+        else:
+            start = date.fromisoformat(start_date) if start_date else end
+        known = sync_hashes(start.isoformat(), end.isoformat(), db_path)
+
+        synced = unchanged = stored = 0
+        day = start
+        while day <= end:
+            date_iso = day.isoformat()
+            day += timedelta(days=1)
+            with METRICS.timer("boe_stage_seconds", stage="sumario_fetch"):
+                # Bypass the sumario result cache: a cached copy would hide changes
+                try:
+                    index_xml = fetch_index_xml.fn(*date_iso.split("-"))
+                except SumarioNotFound:
+                    index_xml = b""
+            if not index_xml:
+                print(f"{date_iso}: sin sumario")
+                continue
+            items = parse_sumario_items(index_xml, date_iso)
+            digest = sumario_hash(items)
+            if known.get(date_iso) == digest:
+                unchanged += 1
+                continue
+
+            with METRICS.timer("boe_stage_seconds", stage="db_write"):
+                insert_metadata_records(items, db_path)
+            if not metadata_only:
+                ids = [item["id"] for item in items]
+                stored += sum(
+                    ingest_article_batch(chunk, date_iso, db_path)
+                    for chunk in chunked(ids, batch_size)
+                )
+            if pdfs:
+                # Sizes come from the sumario; failed PDFs are left to fetch_pdfs
+                record_pdf_files(download_pdfs(items), db_path)
+            record_sync_state(date_iso, digest, len(items), db_path)
+            synced += 1
+            print(f"{date_iso}: {len(items)} elementos sincronizados")
+
+        METRICS.inc("boe_sync_days_total", synced, result="synced")
+        METRICS.inc("boe_sync_days_total", unchanged, result="unchanged")
+        print(
+            f"Fin del flow sync_boe -> d\u00edas sincronizados: {synced}, "
+            f"sin cambios: {unchanged}, art\u00edculos almacenados: {stored}"
+        )
+        return {"synced": synced, "unchanged": unchanged, "articles": stored}
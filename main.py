@@ -1,20 +1,287 @@
+"""Command line entry point for the BOE flows.
+
+Only ``argparse`` is imported at start-up; each subcommand imports the flow
+it runs, so ``--help`` or a bad argument returns immediately. ``--direct``
+calls the flow and task functions without the Prefect engine (see
+:mod:`flows.direct`).
+"""
+
 import argparse
-from flows.scrape_boe_day_metadata import scrape_boe_day_metadata
+from datetime import date, timedelta
 
 DEFAULT_DATE = "2025/06/28"
 
 
-def main() -> None:
+def _parse_day(value: str) -> date:
+    try:
+        year, month, day = (int(part) for part in value.split("/"))
+        return date(year, month, day)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a YYYY/MM/DD date")
+
+
+def cmd_scrape(args) -> None:
+    from flows.direct import run_flow
+    from flows.scrape_boe_day_metadata import scrape_boe_day_metadata
+
+    run_flow(
+        scrape_boe_day_metadata,
+        args.date,
+        batch_size=args.batch_size,
+        concurrent=args.concurrent,
+        metadata_only=args.metadata_only,
+        metadata_archive=args.metadata_archive,
+        direct=args.direct,
+    )
+
+
+def cmd_backfill(args) -> None:
+    from flows.direct import run_flow
+    from flows.scrape_boe_day_metadata import scrape_boe_day_metadata
+
+    day = args.start
+    while day <= args.end:
+        run_flow(
+            scrape_boe_day_metadata,
+            day.strftime("%Y/%m/%d"),
+            batch_size=args.batch_size,
+            concurrent=args.concurrent,
+            metadata_only=args.metadata_only,
+            metadata_archive=args.metadata_archive,
+            direct=args.direct,
+        )
+        day += timedelta(days=1)
+
+
+def cmd_sync(args) -> None:
+    from flows.direct import run_flow
+    from flows.sync_boe import sync_boe
+
+    run_flow(
+        sync_boe,
+        args.db_path,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        lookback_days=args.lookback_days,
+        batch_size=args.batch_size,
+        metadata_only=args.metadata_only,
+        pdfs=args.pdfs,
+        direct=args.direct,
+    )
+
+
+def cmd_pdfs(args) -> None:
+    from flows.direct import run_flow
+    from flows.fetch_pdfs import fetch_pdfs
+
+    run_flow(
+        fetch_pdfs,
+        args.db_path,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        limit=args.limit,
+        root=args.root,
+        max_workers=args.max_workers,
+        verify=args.verify,
+        direct=args.direct,
+    )
+
+
+def cmd_work(args) -> None:
+    from flows.direct import run_flow
+    from flows.queue_worker import queue_worker
+
+    run_flow(
+        queue_worker,
+        args.db_path,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        batch_size=args.batch_size,
+        lease_seconds=args.lease_seconds,
+        max_batches=args.max_batches,
+        direct=args.direct,
+    )
+
+
+def cmd_index(args) -> None:
+    from flows.direct import run_flow
+    from flows.index_articles import index_articles
+
+    run_flow(
+        index_articles,
+        args.db_path,
+        fetch_pending=args.fetch_pending,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        snapshot_dir=args.snapshot_dir,
+        direct=args.direct,
+    )
+
+
+def cmd_search(args) -> None:
+    from tasks.search import search_index
+
+    # A single lookup never needs the engine
+    hits = search_index.fn(
+        args.query,
+        k=args.k,
+        index_path=args.index_path,
+        meta_path=args.meta_path,
+        db_path=None if args.no_collapse else args.db_path,
+        snapshot_dir=args.snapshot_dir,
+        context=args.context,
+    )
+    for rank, hit in enumerate(hits, 1):
+        line = f"{rank:>3}. {hit['distance']:.4f} {hit['id']}#{hit.get('seq')} {hit.get('title')}"
+        if hit.get("duplicates"):
+            line += f" (+{len(hit['duplicates'])} duplicados)"
+        print(line)
+        for passage in hit.get("context") or ([{"text": hit["text"]}] if "text" in hit else []):
+            print(f"       {passage['text'][:200]}")
+
+
+def cmd_serve(args) -> None:
+    from tasks.encoding import load_encoder
+    from tasks.indexing import EMBEDDING_MODEL
+    from tasks.search_service import SearchHTTPServer, SearchService
+
+    service = SearchService(
+        load_encoder(EMBEDDING_MODEL),
+        index_path=args.index_path,
+        meta_path=args.meta_path,
+        snapshot_dir=args.snapshot_dir,
+        db_path=None if args.no_collapse else args.db_path,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    server = SearchHTTPServer(service, (args.host, args.port))
+    print(f"Servicio de b\u00fasqueda en {server.base_url}/search?q=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Run BOE scraping flows")
     parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="Call flow and task functions directly, without the Prefect engine",
+    )
+    # Kept so that `python main.py --date ...` still scrapes one day
+    parser.add_argument("--date", default=DEFAULT_DATE, help=argparse.SUPPRESS)
+    parser.set_defaults(
+        handler=cmd_scrape,
+        batch_size=0,
+        concurrent=False,
+        metadata_only=False,
+        metadata_archive=None,
+    )
+    commands = parser.add_subparsers(title="commands")
+
+    def add_ingest_options(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--batch-size", type=int, default=0, help="Articles per task run")
+        sub.add_argument("--concurrent", action="store_true", help="Submit batches concurrently")
+        sub.add_argument(
+            "--metadata-only", action="store_true", help="Store sumario metadata only"
+        )
+        sub.add_argument(
+            "--metadata-archive", help="Also append the metadata to compressed JSONL files here"
+        )
+
+    scrape = commands.add_parser("scrape", help="Scrape the articles of one day")
+    scrape.add_argument(
         "--date",
         default=DEFAULT_DATE,
         help="Date in YYYY/MM/DD format for scrape_boe_day_metadata",
     )
-    args = parser.parse_args()
+    add_ingest_options(scrape)
+    scrape.set_defaults(handler=cmd_scrape)
+
+    backfill = commands.add_parser("backfill", help="Scrape every day of a date range")
+    backfill.add_argument("start", type=_parse_day, help="First day, YYYY/MM/DD")
+    backfill.add_argument("end", type=_parse_day, help="Last day (inclusive), YYYY/MM/DD")
+    add_ingest_options(backfill)
+    backfill.set_defaults(handler=cmd_backfill)
+
+    sync = commands.add_parser("sync", help="Sync new and changed days since the last sync")
+    sync.add_argument("--db-path", default="data/boe.db")
+    sync.add_argument("--start-date", help="First day (YYYY-MM-DD) when nothing is synced yet")
+    sync.add_argument("--end-date", help="Last day (YYYY-MM-DD), today by default")
+    sync.add_argument("--lookback-days", type=int, default=3, help="Synced days to re-check")
+    sync.add_argument("--batch-size", type=int, default=20, help="Articles per task run")
+    sync.add_argument("--metadata-only", action="store_true", help="Store sumario metadata only")
+    sync.add_argument("--pdfs", action="store_true", help="Also download the synced PDFs")
+    sync.set_defaults(handler=cmd_sync)
+
+    pdfs = commands.add_parser("pdfs", help="Download article PDFs not stored yet")
+    pdfs.add_argument("--db-path", default="data/boe.db")
+    pdfs.add_argument("--date-from", help="First publication day (YYYY-MM-DD)")
+    pdfs.add_argument("--date-to", help="Last publication day (YYYY-MM-DD)")
+    pdfs.add_argument("--limit", type=int, help="Download at most this many PDFs")
+    pdfs.add_argument("--root", help="Directory for the PDFs, BOE_PDF_DIR by default")
+    pdfs.add_argument("--max-workers", type=int, help="Concurrent downloads, BOE_PDF_CONCURRENCY by default")
+    pdfs.add_argument("--verify", action="store_true", help="Re-hash stored PDFs first")
+    pdfs.set_defaults(handler=cmd_pdfs)
+
+    work = commands.add_parser("work", help="Ingest days and articles from the shared work queue")
+    work.add_argument("--db-path", default="data/boe.db")
+    work.add_argument("--start-date", help="Enqueue days from this one (YYYY-MM-DD)")
+    work.add_argument("--end-date", help="Last day to enqueue (inclusive), start date by default")
+    work.add_argument("--batch-size", type=int, default=20, help="Articles claimed per lease")
+    work.add_argument("--lease-seconds", type=float, help="Lease length before others take over")
+    work.add_argument("--max-batches", type=int, help="Stop after this many article batches")
+    work.set_defaults(handler=cmd_work)
+
+    index = commands.add_parser("index", help="Embed stored articles into the FAISS index")
+    index.add_argument("--db-path", default="data/boe.db")
+    index.add_argument("--fetch-pending", action="store_true", help="Download missing texts first")
+    index.add_argument("--workers", type=int, default=0, help="Encoder processes")
+    index.add_argument("--threads-per-worker", type=int, default=1)
+    index.add_argument("--snapshot-dir", help="Publish a versioned snapshot here")
+    index.set_defaults(handler=cmd_index)
+
+    search = commands.add_parser("search", help="Query the FAISS index")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=10, help="Number of hits")
+    search.add_argument("--index-path", default="data/index.faiss")
+    search.add_argument("--meta-path", default="data/index_meta.jsonl")
+    search.add_argument("--db-path", default="data/boe.db")
+    search.add_argument("--snapshot-dir", help="Search the current snapshot in this directory")
+    search.add_argument(
+        "--context", type=int, default=0, help="Neighbouring passages to show around each hit"
+    )
+    search.add_argument(
+        "--no-collapse", action="store_true", help="Keep near-duplicate articles"
+    )
+    search.set_defaults(handler=cmd_search)
+
+    serve = commands.add_parser("serve", help="Serve searches over HTTP with micro-batching")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8090)
+    serve.add_argument("--index-path", default="data/index.faiss")
+    serve.add_argument("--meta-path", default="data/index_meta.jsonl")
+    serve.add_argument("--snapshot-dir", help="Serve and hot-reload snapshots from this directory")
+    serve.add_argument("--db-path", default="data/boe.db")
+    serve.add_argument("--no-collapse", action="store_true", help="Keep near-duplicate articles")
+    serve.add_argument("--max-batch-size", type=int, default=32, help="Queries per batch")
+    serve.add_argument(
+        "--max-wait-ms", type=float, default=2.0, help="Longest wait to fill a batch"
+    )
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
 
-    # Test run for scape and process a day articles
-    scrape_boe_day_metadata(args.date)
+def main(argv: list[str] | None = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.handler is cmd_backfill and args.start > args.end:
+        parser.error("backfill start is after end")
+    args.handler(args)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,79 @@
+from urllib.parse import urlsplit
+import logging
+
 from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+from tasks.metrics import METRICS
+from tasks.ratelimit import LimitedRetry, RateLimitedAdapter, limiter_from_env
+from tasks.retry import HTTP_RETRIES, Hedger, RetryBudget
+
+logger = logging.getLogger(__name__)
+
+# Bodies larger than this are expected to arrive with a Content-Encoding
+UNCOMPRESSED_WARN_BYTES = 4096
+_uncompressed_hosts: set[str] = set()
+
+
+def _record_response(response, *args, **kwargs):
+    """Response hook feeding HTTP status, size, latency and retries to METRICS."""
+    if not METRICS.enabled:
+        return
+    host = urlsplit(response.url).hostname or ""
+    history = getattr(getattr(response.raw, "retries", None), "history", ()) or ()
+    for attempt in history:
+        METRICS.inc(
+            "boe_http_requests_total", host=host, status=attempt.status or "error"
+        )
+    METRICS.inc("boe_http_retries_total", len(history), host=host)
+    METRICS.inc("boe_http_requests_total", host=host, status=response.status_code)
+    METRICS.observe(
+        "boe_http_request_seconds", response.elapsed.total_seconds(), host=host
+    )
+    if kwargs.get("stream"):
+        size = int(response.headers.get("Content-Length") or 0)
+    else:
+        size = len(response.content)
+        wire = getattr(response.raw, "tell", None)
+        if callable(wire):
+            METRICS.inc("boe_http_wire_bytes_total", wire(), host=host)
+    METRICS.inc("boe_http_response_bytes_total", size, host=host)
+    METRICS.inc(
+        "boe_http_content_encoding_total",
+        host=host,
+        encoding=response.headers.get("Content-Encoding", "identity"),
+    )
+
+
+def _check_compression(response, *args, **kwargs):
+    """Warn once per host when a large body arrives without transfer compression."""
+    if response.headers.get("Content-Encoding"):
+        return
+    size = int(response.headers.get("Content-Length") or 0)
+    host = urlsplit(response.url).hostname or ""
+    if size > UNCOMPRESSED_WARN_BYTES and host not in _uncompressed_hosts:
+        _uncompressed_hosts.add(host)
+        logger.warning(
+            "_check_compression -> %s sent %s bytes without Content-Encoding",
+            host,
+            size,
+        )
+
 
-# Shared HTTP session with retries
+# Shared HTTP session with budgeted retries and an adaptive rate limit
 session = Session()
-retries = Retry(
-    total=3,
+limiter = limiter_from_env()
+budget = RetryBudget.from_env()
+retries = LimitedRetry(
+    total=HTTP_RETRIES,
     backoff_factor=1,
     status_forcelist=[429, 500, 502, 503, 504],
+    limiter=limiter,
+    budget=budget,
 )
-adapter = HTTPAdapter(max_retries=retries)
+adapter = RateLimitedAdapter(limiter=limiter, budget=budget, max_retries=retries)
 session.mount("http://", adapter)
 session.mount("https://", adapter)
+session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+session.hooks["response"].extend([_check_compression, _record_response])
+hedger = Hedger(session, budget)
@@ -1,13 +1,29 @@
 from prefect import task
-from tasks import session
+from tasks import hedger, session
+from tasks.cache import (
+    ARTICLE_CACHE_EXPIRATION,
+    SUMARIO_CACHE_EXPIRATION,
+    article_xml_cache_key,
+    parsed_article_cache_key,
+    result_storage,
+    sumario_cache_key,
+)
+import hashlib
+import json
+import os
 import re
 import xml.etree.ElementTree as ET
-from tasks.processing import clean_boe_text, split_into_paragraphs
+from tasks.processing import segment_text
+from tasks.retry import HEDGE_ENABLED
 import logging
 
 logger = logging.getLogger(__name__)
 
-BOE_BASE = "https://www.boe.es"
+BOE_BASE = os.environ.get("BOE_BASE", "https://www.boe.es")
+
+
+class SumarioNotFound(LookupError):
+    """The BOE has no sumario for the day (HTTP 404)."""
 
 
 def _parse_date_to_ymd(date_str: str) -> tuple[str, str, str]:
@@ -54,7 +70,7 @@ def fetch_boes_from_data(year: str, month: str, day: str) -> str:
     )
     month_padded = month.zfill(2)
     day_padded = day.zfill(2)
-    url = f"https://www.boe.es/boe/dias/{year}/{month_padded}/{day_padded}/"
+    url = f"{BOE_BASE}/boe/dias/{year}/{month_padded}/{day_padded}/"
     logger.debug("fetch_boes_from_data -> url: %s", url)
     r = session.get(url, timeout=10)
     r.raise_for_status()
@@ -62,9 +78,22 @@ def fetch_boes_from_data(year: str, month: str, day: str) -> str:
     return r.text
 
 
-@task(retries=2, retry_delay_seconds=5)
-def fetch_index_xml(year: str, month: str, day: str) -> str:
-    """Get the daily XML index given year, month and day."""
+# Retries happen in the session transport, within the run's retry budget
+@task(
+    cache_key_fn=sumario_cache_key,
+    cache_expiration=SUMARIO_CACHE_EXPIRATION,
+    persist_result=True,
+    result_storage=result_storage,
+)
+def fetch_index_xml(year: str, month: str, day: str) -> bytes:
+    """Get the daily XML index given year, month and day.
+
+    The raw (transfer-decoded) bytes are returned so the XML parser can
+    honour the document's own encoding declaration. A missing sumario raises
+    :class:`SumarioNotFound` rather than returning ``b""``: failed runs are
+    not cached, so a day published later is fetched again instead of staying
+    empty for the cache lifetime.
+    """
     logger.info(
         "fetch_index_xml -> params: year=%s month=%s day=%s",
         year,
@@ -76,24 +105,27 @@ def fetch_index_xml(year: str, month: str, day: str) -> str:
     r = session.get(url, headers={"Accept": "application/xml"}, timeout=10)
     if r.status_code == 404:
         logger.warning("fetch_index_xml -> index not found (404)")
-        return ""
+        raise SumarioNotFound(url)
     r.raise_for_status()
     if "xml" not in r.headers.get("Content-Type", ""):
         raise ValueError("Response is not XML")
-    logger.debug("fetch_index_xml -> response size: %s", len(r.text))
-    return r.text
+    logger.debug("fetch_index_xml -> response size: %s", len(r.content))
+    return r.content
 
 
 @task
-def fetch_index_xml_by_date(date_str: str) -> str:
-    """Download the XML index for a given date."""
+def fetch_index_xml_by_date(date_str: str) -> bytes:
+    """Download the XML index for a given date (``b""`` if there is none)."""
     logger.info("fetch_index_xml_by_date -> date_str: %s", date_str)
     year, month, day = _parse_date_to_ymd(date_str)
-    return fetch_index_xml.fn(year, month, day)
+    try:
+        return fetch_index_xml.fn(year, month, day)
+    except SumarioNotFound:
+        return b""
 
 
 @task
-def extract_article_ids(index_xml: str) -> list[str]:
+def extract_article_ids(index_xml: str | bytes) -> list[str]:
     """Return unique article IDs from the daily index XML."""
 
     root = ET.fromstring(index_xml)
@@ -114,6 +146,52 @@ def extract_article_ids(index_xml: str) -> list[str]:
     return id_list
 
 
+@task
+def parse_sumario_items(index_xml: str | bytes, date_str: str) -> list[dict]:
+    """Build metadata records for every item listed in a daily sumario.
+
+    Title, department and document URLs come straight from the sumario, so
+    no per-article request is needed. ``rank`` is not part of the sumario
+    and stays ``None`` until the article XML is fetched.
+    """
+    root = ET.fromstring(index_xml)
+    records: dict[str, dict] = {}
+    for section in root.iter("seccion"):
+        for department in section.iter("departamento"):
+            for item in department.iter("item"):
+                boe_id = (item.findtext("identificador") or "").strip()
+                if not boe_id:
+                    continue
+                pdf = item.find("url_pdf")
+                records[boe_id] = {
+                    "id": boe_id,
+                    "date": date_str,
+                    "title": (item.findtext("titulo") or "").strip(),
+                    "department": department.get("nombre"),
+                    "rank": None,
+                    "section": section.get("nombre"),
+                    "url_xml": (item.findtext("url_xml") or "").strip()
+                    or f"{BOE_BASE}/diario_boe/xml.php?id={boe_id}",
+                    "url_pdf": (pdf.text or "").strip() if pdf is not None else "",
+                    "pdf_bytes": int(pdf.get("szBytes") or 0) if pdf is not None else 0,
+                }
+    logger.info("parse_sumario_items -> found %s items", len(records))
+    return list(records.values())
+
+
+def sumario_hash(items: list[dict]) -> str:
+    """Content hash of the records from :func:`parse_sumario_items`.
+
+    Only the listed items count, so a sumario served again with different
+    formatting or headers hashes the same.
+    """
+    fields = ("id", "title", "department", "section", "url_xml", "url_pdf", "pdf_bytes")
+    canonical = json.dumps(
+        sorted([item.get(f) for f in fields] for item in items), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 @task
 def get_article_metadata(boe_id: str, date_str: str) -> dict:
     # date_str is expected in YYYY-MM-DD format
@@ -135,8 +213,8 @@ def get_article_metadata(boe_id: str, date_str: str) -> dict:
         boe_id,
         date_str,
     )
-    url_xml = f"https://www.boe.es/diario_boe/xml.php?id={boe_id}"
-    url_pdf = f"https://www.boe.es/boe/dias/{year}/{month.zfill(2)}/{day.zfill(2)}/pdfs/{boe_id}.pdf"
+    url_xml = f"{BOE_BASE}/diario_boe/xml.php?id={boe_id}"
+    url_pdf = f"{BOE_BASE}/boe/dias/{year}/{month.zfill(2)}/{day.zfill(2)}/pdfs/{boe_id}.pdf"
     metadata = {
         "id": boe_id,
         "date": date_str,  # Keep original date for metadata record
@@ -147,16 +225,21 @@ def get_article_metadata(boe_id: str, date_str: str) -> dict:
     return metadata
 
 
-@task(retries=2, retry_delay_seconds=5)
-def fetch_article_xml(boe_id: str) -> str:
-    """Download the XML for a specific article."""
+@task(
+    cache_key_fn=article_xml_cache_key,
+    cache_expiration=ARTICLE_CACHE_EXPIRATION,
+    persist_result=True,
+    result_storage=result_storage,
+)
+def fetch_article_xml(boe_id: str) -> bytes:
+    """Download the XML for a specific article as raw bytes."""
     logger.info("fetch_article_xml -> boe_id: %s", boe_id)
-    url = f"https://www.boe.es/diario_boe/xml.php?id={boe_id}"
+    url = f"{BOE_BASE}/diario_boe/xml.php?id={boe_id}"
     logger.debug("fetch_article_xml -> url: %s", url)
-    r = session.get(url, timeout=10)
+    r = hedger.get(url, timeout=10) if HEDGE_ENABLED else session.get(url, timeout=10)
     r.raise_for_status()
-    logger.debug("fetch_article_xml -> response size: %s", len(r.text))
-    return r.text
+    logger.debug("fetch_article_xml -> response size: %s", len(r.content))
+    return r.content
 
 
 def _parse_additional_fields(root: ET.Element) -> dict:
@@ -172,6 +255,8 @@ def _parse_additional_fields(root: ET.Element) -> dict:
         "notas": [],
         "referencias": [],
         "alertas": [],
+        "anteriores": [],
+        "posteriores": [],
     }
 
     meta = root.find(".//metadatos")
@@ -196,20 +281,42 @@ def _parse_additional_fields(root: ET.Element) -> dict:
         data["notas"] = notas
         data["referencias"] = referencias
         data["alertas"] = alertas
+        data["anteriores"] = _parse_relations(analysis, "anteriores/anterior")
+        data["posteriores"] = _parse_relations(analysis, "posteriores/posterior")
 
     return data
 
 
-@task
-def parse_article_xml(xml_text: str) -> dict:
-    """Extract main fields and processed segments from an article XML."""
-    root = ET.fromstring(xml_text)
+def _parse_relations(analysis: ET.Element, path: str) -> list[dict]:
+    """Read ``<anterior>``/``<posterior>`` links as ``{id, relation, code, text}``."""
+    relations = []
+    for ref in analysis.findall(f".//referencias/{path}"):
+        target = (ref.get("referencia") or "").strip()
+        if not target:
+            continue
+        palabra = ref.find("palabra")
+        relations.append(
+            {
+                "id": target,
+                "relation": (palabra.text or "").strip() if palabra is not None else "",
+                "code": palabra.get("codigo") if palabra is not None else None,
+                "text": (ref.findtext("texto") or "").strip(),
+            }
+        )
+    return relations
+
+
+def _parse_article_root(root: ET.Element) -> dict:
+    """Extract main fields and processed segments from a parsed article."""
     title = root.findtext(".//titulo")
     department = root.findtext(".//departamento")
     rank = root.findtext(".//rango")
-    raw_text = root.findtext(".//texto") or ""
-    cleaned = clean_boe_text(raw_text)
-    segments = split_into_paragraphs(cleaned)
+    # Prefer the body: <analisis> references carry their own <texto> too
+    body = root.find("texto")
+    if body is None:
+        body = root.find(".//texto")
+    raw_text = (body.text or "") if body is not None else ""
+    segments = segment_text(raw_text)
     data = {
         "title": title,
         "department": department,
@@ -227,19 +334,12 @@ def parse_article_xml(xml_text: str) -> dict:
     return data
 
 
-@task
-def fetch_article_text(url_xml: str) -> tuple[dict, list[str]]:
-    """Download an article XML and return metadata and cleaned segments."""
-    logger.info("fetch_article_text -> url: %s", url_xml)
-    r = session.get(url_xml, timeout=10)
-    r.raise_for_status()
-    xml_text = r.text
-    logger.debug("fetch_article_text -> downloaded %s chars", len(xml_text))
-    article_data = parse_article_xml.fn(xml_text)
-    metadata = {
-        "title": article_data.get("title"),
-        "department": article_data.get("department"),
-        "rank": article_data.get("rank"),
-    }
-    logger.debug("fetch_article_text -> metadata: %s", metadata)
-    return metadata, article_data.get("segments")
+@task(
+    cache_key_fn=parsed_article_cache_key,
+    cache_expiration=ARTICLE_CACHE_EXPIRATION,
+    persist_result=True,
+    result_storage=result_storage,
+)
+def parse_article_xml(xml_text: str | bytes) -> dict:
+    """Extract main fields and processed segments from an article XML."""
+    return _parse_article_root(ET.fromstring(xml_text))
@@ -0,0 +1,62 @@
+"""Result caching for the deterministic BOE fetch and parse tasks.
+
+Results are persisted under ``BOE_CACHE_DIR`` (``data/cache`` by default) and
+keyed on the date or BOE id plus :data:`PARSER_VERSION`, so a retried or
+re-run flow reuses finished downloads and parses. Bump ``PARSER_VERSION``
+whenever ``parse_article_xml`` changes its output.
+"""
+
+import hashlib
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+import logging
+
+from prefect import task
+
+logger = logging.getLogger(__name__)
+
+PARSER_VERSION = "2"
+CACHE_DIR = os.environ.get("BOE_CACHE_DIR", "data/cache")
+ARTICLE_CACHE_EXPIRATION = timedelta(days=float(os.environ.get("BOE_CACHE_DAYS", "7")))
+# A day's sumario can still be missing or corrected shortly after publication
+SUMARIO_CACHE_EXPIRATION = timedelta(hours=float(os.environ.get("BOE_SUMARIO_CACHE_HOURS", "6")))
+
+# Prefect stores results for a Path in a local file system at that location
+result_storage = Path(CACHE_DIR).resolve()
+
+
+def sumario_cache_key(context, parameters: dict) -> str:
+    day = f"{parameters['year']}{parameters['month'].zfill(2)}{parameters['day'].zfill(2)}"
+    return f"boe-sumario-{day}"
+
+
+def article_xml_cache_key(context, parameters: dict) -> str:
+    return f"boe-article-xml-{parameters['boe_id']}"
+
+
+def parsed_article_cache_key(context, parameters: dict) -> str:
+    xml = parameters["xml_text"]
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    digest = hashlib.sha256(xml).hexdigest()
+    return f"boe-parsed-v{PARSER_VERSION}-{digest}"
+
+
+@task
+def purge_result_cache(
+    max_age: timedelta = ARTICLE_CACHE_EXPIRATION, cache_dir: str = CACHE_DIR
+) -> int:
+    """Delete cached results older than ``max_age`` and return how many."""
+    root = Path(cache_dir)
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_age.total_seconds()
+    removed = 0
+    for path in root.rglob("*"):
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink()
+            removed += 1
+    logger.info("purge_result_cache -> removed %s cached results", removed)
+    return removed
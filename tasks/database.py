@@ -5,6 +5,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# ``<metadatos>`` fields kept one row per article in ``article_details``
+DETAIL_FIELDS = (
+    "identificador",
+    "fecha_disposicion",
+    "diario",
+    "fecha_publicacion",
+    "pagina_inicial",
+    "pagina_final",
+)
+# ``<analisis>`` lists from ``parse_article_xml`` -> ``article_terms.kind``
+TERM_KINDS = {
+    "materias": "materia",
+    "notas": "nota",
+    "referencias": "referencia",
+    "alertas": "alerta",
+}
+
 
 @task
 def init_db(db_path: str = "data/boe.db"):
@@ -40,17 +57,133 @@ def init_db(db_path: str = "data/boe.db"):
         )
         """
     )
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS article_details (
+            id TEXT PRIMARY KEY,
+            {", ".join(f"{field} TEXT" for field in DETAIL_FIELDS)}
+        )
+        """
+    )
+    # One row per (article, analysis term). The primary key serves "articles
+    # with materia X between two dates"; idx_article_terms_facet covers
+    # faceted counts over a date range without touching the table.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_terms (
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            date TEXT,
+            id TEXT NOT NULL,
+            PRIMARY KEY (kind, value, date, id)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_article_terms_facet "
+        "ON article_terms (kind, date, value)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_article_terms_id ON article_terms (id)")
+    # Directed legal references (source MODIFICA target). ``origin`` is the
+    # article whose <analisis> stated the edge, so re-ingesting it can
+    # replace exactly its own edges. AUTOINCREMENT keeps edge ids growing,
+    # which lets readers detect changes from count and max id.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reference_edges (
+            edge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            relation TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            UNIQUE (source, target, relation, origin)
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reference_edges_target "
+        "ON reference_edges (target, relation)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reference_edges_origin ON reference_edges (origin)"
+    )
+    # One row per synced day: the content hash of its sumario tells the next
+    # sync whether the day changed, and max(date) is the sync watermark
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            date TEXT PRIMARY KEY,
+            sumario_hash TEXT NOT NULL,
+            items INTEGER NOT NULL,
+            synced_at TEXT NOT NULL
+        )
+        """
+    )
+    # Downloaded PDFs: size and SHA-256 as verified when the file was stored
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pdf_files (
+            id TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            bytes INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            downloaded_at TEXT NOT NULL
+        )
+        """
+    )
     conn.commit()
     conn.close()
     logger.info("Ruta de base de datos utilizada: %s", path)
     logger.info("Base de datos inicializada.")
 
 
-@task
-def insert_article(record: dict, text: str, db_path: str = "data/boe.db"):
-    """Insert or replace article metadata and text into the database."""
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+def _write_details(cur: sqlite3.Cursor, boe_id: str, date: str | None, details: dict) -> None:
+    """Replace the stored ``<metadatos>`` and ``<analisis>`` data of one article."""
+    cur.execute(
+        f"""
+        INSERT OR REPLACE INTO article_details (id, {", ".join(DETAIL_FIELDS)})
+        VALUES (?{", ?" * len(DETAIL_FIELDS)})
+        """,
+        (boe_id, *(details.get(field) or None for field in DETAIL_FIELDS)),
+    )
+    cur.execute("DELETE FROM article_terms WHERE id = ?", (boe_id,))
+    cur.executemany(
+        "INSERT OR IGNORE INTO article_terms (kind, value, date, id) VALUES (?, ?, ?, ?)",
+        [
+            (kind, value.strip(), date, boe_id)
+            for key, kind in TERM_KINDS.items()
+            for value in details.get(key) or []
+            if value and value.strip()
+        ],
+    )
+
+
+def _normalize_relation(relation: str) -> str:
+    """Map ``<posterior>`` wording ("SE MODIFICA") to the active form ("MODIFICA")."""
+    relation = " ".join(relation.upper().split())
+    return relation[3:] if relation.startswith("SE ") else relation
+
+
+def _write_references(cur: sqlite3.Cursor, boe_id: str, details: dict) -> None:
+    """Replace the reference edges stated by one article's ``<analisis>``."""
+    edges = [
+        (boe_id, ref["id"], _normalize_relation(ref.get("relation") or ""), boe_id)
+        for ref in details.get("anteriores") or []
+    ] + [
+        (ref["id"], boe_id, _normalize_relation(ref.get("relation") or ""), boe_id)
+        for ref in details.get("posteriores") or []
+    ]
+    cur.execute("DELETE FROM reference_edges WHERE origin = ?", (boe_id,))
+    cur.executemany(
+        "INSERT OR IGNORE INTO reference_edges (source, target, relation, origin) "
+        "VALUES (?, ?, ?, ?)",
+        edges,
+    )
+
+
+def _write_article(
+    cur: sqlite3.Cursor, record: dict, text: str, details: dict | None = None
+) -> None:
     meta_values = (
         record.get("id"),
         record.get("date"),
@@ -77,12 +210,95 @@ def insert_article(record: dict, text: str, db_path: str = "data/boe.db"):
         """,
         article_values,
     )
+    if details is not None:
+        _write_details(cur, record.get("id"), record.get("date"), details)
+        _write_references(cur, record.get("id"), details)
+
+
+@task
+def insert_article(
+    record: dict, text: str, db_path: str = "data/boe.db", details: dict | None = None
+):
+    """Insert or replace article metadata and text into the database.
+
+    ``details`` is the output of ``parse_article_xml``; when given, its
+    ``<metadatos>`` fields and analysis terms are stored as well.
+    """
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    _write_article(cur, record, text, details)
     conn.commit()
     conn.close()
     logger.info("Ruta de base de datos utilizada: %s", db_path)
     logger.info("Artículo insertado correctamente.")
 
 
+@task
+def insert_articles(rows: list[tuple], db_path: str = "data/boe.db") -> int:
+    """Insert or replace many ``(record, text[, details])`` rows in one transaction."""
+    if not rows:
+        return 0
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    for row in rows:
+        _write_article(cur, *row)
+    conn.commit()
+    conn.close()
+    logger.info("insert_articles -> %s artículos insertados en %s", len(rows), db_path)
+    return len(rows)
+
+
+@task
+def insert_metadata_records(records: list[dict], db_path: str = "data/boe.db") -> int:
+    """Upsert sumario-level metadata without touching stored ranks or texts."""
+    if not records:
+        return 0
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.executemany(
+        """
+        INSERT INTO metadata (id, date, title, department, rank, url_xml, url_pdf)
+        VALUES (:id, :date, :title, :department, :rank, :url_xml, :url_pdf)
+        ON CONFLICT(id) DO UPDATE SET
+            date = excluded.date,
+            title = excluded.title,
+            department = excluded.department,
+            url_xml = excluded.url_xml,
+            url_pdf = excluded.url_pdf
+        """,
+        [
+            {k: r.get(k) for k in ("id", "date", "title", "department", "rank", "url_xml", "url_pdf")}
+            for r in records
+        ],
+    )
+    conn.commit()
+    conn.close()
+    logger.info("insert_metadata_records -> %s registros en %s", len(records), db_path)
+    return len(records)
+
+
+@task
+def pending_articles(
+    db_path: str = "data/boe.db", limit: int | None = None
+) -> list[tuple[str, str]]:
+    """Return ``(id, date)`` of metadata rows whose full text is not stored yet."""
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    query = """
+        SELECT m.id, m.date FROM metadata m
+        LEFT JOIN articles a ON a.id = m.id
+        WHERE a.id IS NULL
+        ORDER BY m.date, m.id
+    """
+    if limit is not None:
+        cur.execute(query + " LIMIT ?", (limit,))
+    else:
+        cur.execute(query)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
 @task
 def article_exists(boe_id: str, db_path: str = "data/boe.db") -> bool:
     """Check if an article already exists in the database."""
@@ -93,6 +309,24 @@ def article_exists(boe_id: str, db_path: str = "data/boe.db") -> bool:
     conn.close()
     return exists
 
+
+@task
+def existing_article_ids(boe_ids: list[str], db_path: str = "data/boe.db") -> set[str]:
+    """Return which of ``boe_ids`` are already stored, in a single query."""
+    if not boe_ids:
+        return set()
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    found: set[str] = set()
+    # Stay under SQLite's default limit on bound parameters
+    for i in range(0, len(boe_ids), 500):
+        chunk = boe_ids[i : i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(f"SELECT id FROM articles WHERE id IN ({placeholders})", chunk)
+        found.update(row[0] for row in cur.fetchall())
+    conn.close()
+    return found
+
 @task
 def fetch_all_articles(db_path: str = "data/boe.db") -> list[dict]:
     """Return all articles with id, title and text."""
@@ -102,3 +336,187 @@ def fetch_all_articles(db_path: str = "data/boe.db") -> list[dict]:
     rows = cur.fetchall()
     conn.close()
     return [{"id": r[0], "title": r[1], "text": r[2]} for r in rows]
+
+
+@task
+def sync_watermark(db_path: str = "data/boe.db") -> str | None:
+    """Return the latest synced day (``YYYY-MM-DD``), or ``None``."""
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT max(date) FROM sync_state").fetchone()
+    conn.close()
+    return row[0]
+
+
+@task
+def sync_hashes(date_from: str, date_to: str, db_path: str = "data/boe.db") -> dict[str, str]:
+    """Return ``{date: sumario hash}`` of the days synced in a date range."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT date, sumario_hash FROM sync_state WHERE date BETWEEN ? AND ?",
+        (date_from, date_to),
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+@task
+def record_sync_state(
+    date_iso: str, sumario_hash: str, items: int, db_path: str = "data/boe.db"
+) -> None:
+    """Mark ``date_iso`` as synced with the sumario it was synced from."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO sync_state (date, sumario_hash, items, synced_at)
+        VALUES (?, ?, ?, datetime('now'))
+        """,
+        (date_iso, sumario_hash, items),
+    )
+    conn.commit()
+    conn.close()
+
+
+@task
+def pending_pdfs(
+    db_path: str = "data/boe.db",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    """Return ``id``, ``date`` and ``url_pdf`` of articles without a stored PDF."""
+    where, params = _date_filter(date_from, date_to, "m.")
+    query = f"""
+        SELECT m.id, m.date, m.url_pdf FROM metadata m
+        LEFT JOIN pdf_files p ON p.id = m.id
+        WHERE p.id IS NULL AND coalesce(m.url_pdf, '') != ''{where}
+        ORDER BY m.date, m.id
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+    return [{"id": r[0], "date": r[1], "url_pdf": r[2]} for r in rows]
+
+
+@task
+def record_pdf_files(results: list[dict], db_path: str = "data/boe.db") -> int:
+    """Store ``id, path, bytes, sha256`` of downloaded PDFs."""
+    if not results:
+        return 0
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO pdf_files (id, path, bytes, sha256, downloaded_at)
+        VALUES (:id, :path, :bytes, :sha256, datetime('now'))
+        """,
+        results,
+    )
+    conn.commit()
+    conn.close()
+    return len(results)
+
+
+@task
+def stored_pdf_files(
+    db_path: str = "data/boe.db", date_from: str | None = None, date_to: str | None = None
+) -> list[dict]:
+    """Return the recorded PDFs of articles published within a date range."""
+    where, params = _date_filter(date_from, date_to, "m.")
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        f"""
+        SELECT p.id, p.path, p.bytes, p.sha256 FROM pdf_files p
+        LEFT JOIN metadata m ON m.id = p.id
+        WHERE 1 = 1{where}
+        ORDER BY p.id
+        """,
+        params,
+    ).fetchall()
+    conn.close()
+    return [dict(zip(("id", "path", "bytes", "sha256"), row)) for row in rows]
+
+
+@task
+def forget_pdf_files(boe_ids: list[str], db_path: str = "data/boe.db") -> None:
+    """Drop PDF records so the files are downloaded again."""
+    conn = sqlite3.connect(db_path)
+    conn.executemany("DELETE FROM pdf_files WHERE id = ?", [(i,) for i in boe_ids])
+    conn.commit()
+    conn.close()
+
+
+def _date_filter(date_from: str | None, date_to: str | None, alias: str = "") -> tuple[str, list]:
+    clauses, params = [], []
+    if date_from:
+        clauses.append(f"{alias}date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append(f"{alias}date <= ?")
+        params.append(date_to)
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+@task
+def articles_with_term(
+    kind: str,
+    value: str,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    db_path: str = "data/boe.db",
+) -> list[str]:
+    """Return ids of articles tagged ``kind``/``value`` within a date range.
+
+    ``kind`` is ``materia``, ``nota``, ``referencia`` or ``alerta``; dates
+    are inclusive ``YYYY-MM-DD`` strings.
+    """
+    where, params = _date_filter(date_from, date_to)
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT id FROM article_terms WHERE kind = ? AND value = ?{where} ORDER BY date, id",
+        [kind, value, *params],
+    )
+    ids = [row[0] for row in cur.fetchall()]
+    conn.close()
+    return ids
+
+
+@task
+def facet_counts(
+    kind: str,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    filters: dict[str, str] | None = None,
+    limit: int | None = 20,
+    db_path: str = "data/boe.db",
+) -> list[tuple[str, int]]:
+    """Count articles per ``kind`` value, most frequent first.
+
+    ``filters`` maps other kinds to a required value, e.g.
+    ``facet_counts("materia", "2024-01-01", "2024-12-31", {"alerta": "Sanidad"})``
+    counts materias among 2024 articles carrying that alerta.
+    """
+    where, params = _date_filter(date_from, date_to, "t.")
+    for filter_kind, filter_value in (filters or {}).items():
+        where += (
+            " AND t.id IN (SELECT id FROM article_terms WHERE kind = ? AND value = ?)"
+        )
+        params += [filter_kind, filter_value]
+    query = f"""
+        SELECT t.value, count(*) AS n FROM article_terms t
+        WHERE t.kind = ?{where}
+        GROUP BY t.value
+        ORDER BY n DESC, t.value
+    """
+    params = [kind, *params]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
@@ -0,0 +1,406 @@
+"""MinHash/LSH near-duplicate detection for articles and segments.
+
+Texts are reduced to word shingles and summarised by a MinHash signature,
+whose agreement rate estimates the Jaccard similarity of two texts. The
+signature is split into bands and every band is hashed into an SQLite
+bucket table. Texts sharing a bucket are candidates, and only those
+candidates are compared signature to signature. State is persistent, so
+detection runs incrementally: each new text is checked against everything
+registered before it.
+
+Two namespaces are used: ``article`` (whole texts, linked at ingest time in
+the main database) and ``segment`` (paragraphs from
+``split_into_paragraphs``, checked at index time so that near-duplicates
+are not embedded twice). Each entry also records a hash of its text
+(:func:`text_hash`), so that re-indexing can tell a changed segment from one
+already embedded.
+"""
+
+from prefect import task
+from typing import Iterable
+from pathlib import Path
+import hashlib
+import sqlite3
+import zlib
+import logging
+
+import numpy as np
+
+from tasks.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+BANDS = 16
+THRESHOLD = 0.8
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[str]:
+    """Return the lowercased word ``size``-grams of ``text``.
+
+    Texts shorter than ``size`` words yield a single shingle.
+    """
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Compute MinHash signatures with ``num_perm`` universal hash functions."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """Return a ``uint32`` signature, or ``None`` for a text without words."""
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)
+        )
+        # uint64 arithmetic wraps on overflow, which is fine for hashing
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class LSHIndex:
+    """Persistent banded LSH index of MinHash signatures in SQLite.
+
+    ``bands`` must divide the signature length. With 128 permutations and
+    16 bands of 8 rows, pairs above roughly 0.7 Jaccard become candidates;
+    candidates are then confirmed against ``threshold``.
+
+    With ``readonly`` the database is opened read-only and no tables are
+    created; lookups on a database without them find nothing. Search uses
+    this, since it only reads links.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        namespace: str = "article",
+        threshold: float = THRESHOLD,
+        bands: int = BANDS,
+        hasher: MinHasher | None = None,
+        readonly: bool = False,
+    ):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError("bands must divide the number of permutations")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        if readonly:
+            uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, timeout=30)
+            self.missing = not self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'minhash_signatures'"
+            ).fetchone()
+            return
+        self.missing = False
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                article_id TEXT,
+                signature BLOB NOT NULL,
+                duplicate_of TEXT,
+                similarity REAL,
+                text_hash TEXT,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(minhash_signatures)")}
+        if "text_hash" not in columns:
+            self.conn.execute("ALTER TABLE minhash_signatures ADD COLUMN text_hash TEXT")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                namespace TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (namespace, band, bucket, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_minhash_duplicate_of "
+            "ON minhash_signatures (namespace, duplicate_of)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_minhash_article "
+            "ON minhash_signatures (namespace, article_id)"
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "LSHIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _buckets(self, signature: np.ndarray) -> list[tuple[int, int]]:
+        return [
+            (
+                band,
+                int.from_bytes(
+                    hashlib.blake2b(
+                        signature[band * self.rows : (band + 1) * self.rows].tobytes(),
+                        digest_size=8,
+                    ).digest(),
+                    "big",
+                    signed=True,
+                ),
+            )
+            for band in range(self.bands)
+        ]
+
+    def query(self, signature: np.ndarray) -> list[tuple[str, str | None, float]]:
+        """Return ``(key, duplicate_of, similarity)`` of stored near-duplicates,
+        most similar first."""
+        candidates: set[str] = set()
+        for band, bucket in self._buckets(signature):
+            candidates.update(
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT key FROM minhash_buckets "
+                    "WHERE namespace = ? AND band = ? AND bucket = ?",
+                    (self.namespace, band, bucket),
+                )
+            )
+        matches = []
+        for key in candidates:
+            stored, duplicate_of = self.conn.execute(
+                "SELECT signature, duplicate_of FROM minhash_signatures "
+                "WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            similarity = jaccard(signature, np.frombuffer(stored, dtype=np.uint32))
+            if similarity >= self.threshold:
+                matches.append((key, duplicate_of, similarity))
+        matches.sort(key=lambda m: (-m[2], m[0]))
+        return matches
+
+    def add(
+        self,
+        key: str,
+        signature: np.ndarray,
+        article_id: str | None = None,
+        duplicate_of: str | None = None,
+        similarity: float | None = None,
+        text_hash: str | None = None,
+    ) -> None:
+        """Register ``signature`` under ``key``, replacing a previous entry."""
+        self.remove(key)
+        self.conn.execute(
+            "INSERT INTO minhash_signatures "
+            "(namespace, key, article_id, signature, duplicate_of, similarity, text_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.namespace,
+                key,
+                article_id,
+                signature.tobytes(),
+                duplicate_of,
+                similarity,
+                text_hash,
+            ),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO minhash_buckets VALUES (?, ?, ?, ?)",
+            [(self.namespace, band, bucket, key) for band, bucket in self._buckets(signature)],
+        )
+
+    def remove(self, key: str) -> None:
+        row = self.conn.execute(
+            "SELECT signature FROM minhash_signatures WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return
+        signature = np.frombuffer(row[0], dtype=np.uint32)
+        self.conn.executemany(
+            "DELETE FROM minhash_buckets WHERE namespace = ? AND band = ? AND bucket = ? AND key = ?",
+            [(self.namespace, band, bucket, key) for band, bucket in self._buckets(signature)],
+        )
+        self.conn.execute(
+            "DELETE FROM minhash_signatures WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def contains(self, key: str) -> bool:
+        if self.missing:
+            return False
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM minhash_signatures WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            is not None
+        )
+
+    def link(
+        self, key: str, text: str, article_id: str | None = None
+    ) -> tuple[str | None, float | None]:
+        """Register ``text`` and return ``(canonical key, similarity)`` of its
+        most similar registered near-duplicate, or ``(None, None)``.
+
+        Keys that are already registered keep their stored link, so re-runs
+        are idempotent; :meth:`changed_keys` finds entries whose text has
+        changed since. Duplicates always point at a canonical entry, never at
+        another duplicate.
+        """
+        stored = self.conn.execute(
+            "SELECT duplicate_of, similarity FROM minhash_signatures "
+            "WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if stored is not None:
+            return stored
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return None, None
+        canonical, best = None, None
+        matches = self.query(signature)
+        if matches:
+            match_key, match_of, best = matches[0]
+            canonical = match_of or match_key
+            METRICS.inc("boe_near_duplicates_total", namespace=self.namespace)
+        self.add(key, signature, article_id, canonical, best, text_hash(text))
+        return canonical, best
+
+    def changed_keys(self, article_id: str, texts: dict[str, str]) -> list[str]:
+        """Return the registered keys of ``article_id`` whose text is not
+        ``texts[key]`` any more, including keys missing from ``texts``.
+
+        Entries registered before text hashes were recorded are compared by
+        signature, and their hash is filled in when they still match.
+        """
+        changed = []
+        for key, stored_hash, stored in self.conn.execute(
+            "SELECT key, text_hash, signature FROM minhash_signatures "
+            "WHERE namespace = ? AND article_id = ?",
+            (self.namespace, article_id),
+        ).fetchall():
+            text = texts.get(key)
+            if text is None:
+                changed.append(key)
+            elif stored_hash is None:
+                signature = self.hasher.signature(text)
+                if signature is None or signature.tobytes() != stored:
+                    changed.append(key)
+                else:
+                    self.conn.execute(
+                        "UPDATE minhash_signatures SET text_hash = ? WHERE namespace = ? AND key = ?",
+                        (text_hash(text), self.namespace, key),
+                    )
+            elif stored_hash != text_hash(text):
+                changed.append(key)
+        return changed
+
+    def canonical_map(self, keys: Iterable[str]) -> dict[str, str]:
+        """Map each of ``keys`` that is a registered duplicate to its canonical key."""
+        keys = list(keys)
+        found: dict[str, str] = {}
+        if self.missing:
+            return found
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                self.conn.execute(
+                    f"SELECT key, duplicate_of FROM minhash_signatures "
+                    f"WHERE namespace = ? AND duplicate_of IS NOT NULL AND key IN ({placeholders})",
+                    [self.namespace, *chunk],
+                ).fetchall()
+            )
+        return found
+
+    def duplicates_of(self, key: str) -> list[tuple[str, float]]:
+        """Return ``(key, similarity)`` of every entry linked to canonical ``key``."""
+        if self.missing:
+            return []
+        return self.conn.execute(
+            "SELECT key, similarity FROM minhash_signatures "
+            "WHERE namespace = ? AND duplicate_of = ? ORDER BY key",
+            (self.namespace, key),
+        ).fetchall()
+
+
+@task
+def link_near_duplicate_articles(
+    rows: list[tuple], db_path: str = "data/boe.db"
+) -> dict[str, str]:
+    """Register article texts from ``(record, text, ...)`` rows and link
+    near-duplicates to the earliest matching article.
+
+    Returns ``{article id: canonical article id}`` for the duplicates found.
+    """
+    links: dict[str, str] = {}
+    with LSHIndex(db_path, "article") as lsh:
+        for record, text, *_ in rows:
+            boe_id = record.get("id")
+            canonical, similarity = lsh.link(boe_id, text or "", boe_id)
+            if canonical is not None:
+                links[boe_id] = canonical
+                logger.info(
+                    "link_near_duplicate_articles -> %s ~ %s (%.2f)", boe_id, canonical, similarity
+                )
+    return links
+
+
+def collapse_near_duplicates(
+    hits: list[dict],
+    db_path: str = "data/boe.db",
+    key: str = "id",
+    lsh: LSHIndex | None = None,
+) -> list[dict]:
+    """Drop search hits whose article is a near-duplicate of an earlier hit.
+
+    Hits keep their order; each surviving hit lists the article ids it
+    absorbed under ``"duplicates"``. Pass an open article ``lsh`` to reuse
+    its connection instead of opening ``db_path``.
+    """
+    if lsh is None:
+        with LSHIndex(db_path, "article", readonly=True) as lsh:
+            canonical = lsh.canonical_map(h.get(key) for h in hits)
+    else:
+        canonical = lsh.canonical_map(h.get(key) for h in hits)
+    kept: dict[str, dict] = {}
+    for hit in hits:
+        article_id = hit.get(key)
+        root = canonical.get(article_id, article_id)
+        if root in kept:
+            if article_id != kept[root].get(key):
+                kept[root].setdefault("duplicates", []).append(article_id)
+            continue
+        kept[root] = dict(hit)
+    return list(kept.values())
@@ -0,0 +1,195 @@
+"""Persistent embedding store kept alongside the FAISS index.
+
+Layout of a store directory::
+
+    vectors.bin     row-major float16/float32 matrix, appended in place
+    rows.jsonl      one ``{"id", "seq", "title"}`` line per vector row
+    manifest.json   model name, backend and version, dimension, dtype, row count
+
+``manifest.json`` is replaced atomically after the data files are appended,
+so its ``count`` and ``rows_bytes`` are the committed length: rows written
+past them by an interrupted run are ignored and trimmed on the next append.
+Any FAISS index can be rebuilt from the store with
+:func:`rebuild_faiss_index` instead of re-encoding the corpus.
+"""
+
+from prefect import task
+from pathlib import Path
+import json
+import os
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {"float16": np.float16, "float32": np.float32}
+
+
+class EmbeddingStore:
+    """Append-only memory-mapped matrix of embeddings plus a row-id mapping.
+
+    Opening an existing store with a different ``model``, ``backend``,
+    ``model_version`` or ``dim`` raises ``ValueError``; vectors from
+    different models must not be mixed. ``backend`` is what ran the model
+    (``torch``, ``onnx``, ``onnx-int8``) and ``model_version`` identifies its
+    weights.
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/embeddings",
+        model: str | None = None,
+        model_version: str | None = None,
+        dim: int | None = None,
+        dtype: str = "float16",
+        backend: str | None = None,
+    ):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / "manifest.json"
+        self.vectors_path = self.directory / "vectors.bin"
+        self.rows_path = self.directory / "rows.jsonl"
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            expected = {
+                "model": model,
+                "backend": backend,
+                "model_version": model_version,
+                "dim": dim,
+            }
+            for key, value in expected.items():
+                if value is not None and self.manifest.get(key) != value:
+                    raise ValueError(
+                        f"Embedding store {directory} has {key}={self.manifest.get(key)!r}, "
+                        f"not {value!r}"
+                    )
+        else:
+            if model is None or dim is None:
+                raise ValueError("A new embedding store needs a model name and dimension")
+            if dtype not in DTYPES:
+                raise ValueError(f"Unknown dtype: {dtype}")
+            self.manifest = {
+                "model": model,
+                "backend": backend,
+                "model_version": model_version,
+                "dim": dim,
+                "dtype": dtype,
+                "count": 0,
+                "rows_bytes": 0,
+            }
+
+    @property
+    def count(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.manifest["dim"]
+
+    @property
+    def dtype(self):
+        return DTYPES[self.manifest["dtype"]]
+
+    def _write_manifest(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _trim(self) -> None:
+        """Cut the data files back to the committed rows."""
+        if self.vectors_path.exists():
+            with self.vectors_path.open("r+b") as f:
+                f.truncate(self.count * self.dim * np.dtype(self.dtype).itemsize)
+        if self.rows_path.exists():
+            with self.rows_path.open("r+b") as f:
+                f.truncate(self.manifest["rows_bytes"])
+
+    def append(self, vectors, rows: list[dict]) -> None:
+        """Append ``vectors`` (one per entry of ``rows``) and commit them."""
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim)
+        if len(vectors) != len(rows):
+            raise ValueError("append needs exactly one row entry per vector")
+        if not rows:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._trim()
+        encoded = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+        with self.vectors_path.open("ab") as f:
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        with self.rows_path.open("ab") as f:
+            f.write(encoded)
+        self.manifest["count"] += len(rows)
+        self.manifest["rows_bytes"] += len(encoded)
+        self._write_manifest()
+
+    def reset(self) -> None:
+        """Drop every stored vector."""
+        self.manifest["count"] = 0
+        self.manifest["rows_bytes"] = 0
+        self._trim()
+        self._write_manifest()
+
+    def vectors(self) -> np.ndarray:
+        """Return a read-only memory map of the committed vectors."""
+        if not self.count:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim))
+
+    def rows(self) -> list[dict]:
+        """Return the row-id mapping of the committed vectors, in row order."""
+        if not self.count:
+            return []
+        with self.rows_path.open(encoding="utf-8") as f:
+            return [json.loads(line) for _, line in zip(range(self.count), f)]
+
+
+def _write_meta(meta_path: Path, rows: list[dict]) -> None:
+    tmp = meta_path.with_suffix(".tmp")
+    tmp.write_text(
+        "\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8"
+    )
+    os.replace(tmp, meta_path)
+
+
+@task
+def rebuild_faiss_index(
+    store_dir: str = "data/embeddings",
+    index_path: str = "data/index.faiss",
+    meta_path: str = "data/index_meta.jsonl",
+    factory: str = "Flat",
+    train_size: int = 100_000,
+    batch_rows: int = 65_536,
+) -> int:
+    """Build a FAISS index from the embedding store without re-encoding.
+
+    ``factory`` is any ``faiss.index_factory`` string (``"Flat"``,
+    ``"IVF1024,PQ32"``, ``"HNSW32"``...). Indexes that need training are
+    trained on up to ``train_size`` evenly spaced vectors. The index and its
+    metadata file are replaced atomically; returns the number of vectors.
+    """
+    import faiss
+
+    store = EmbeddingStore(store_dir)
+    vectors = store.vectors()
+    index = faiss.index_factory(store.dim, factory)
+    if not index.is_trained:
+        step = max(1, store.count // train_size)
+        index.train(np.ascontiguousarray(vectors[::step], dtype=np.float32))
+    for start in range(0, store.count, batch_rows):
+        index.add(np.ascontiguousarray(vectors[start : start + batch_rows], dtype=np.float32))
+
+    index_file = Path(index_path)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_file.with_suffix(".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, index_file)
+    _write_meta(Path(meta_path), store.rows())
+    logger.info(
+        "rebuild_faiss_index -> %s vectors (%s) from %s into %s",
+        store.count,
+        factory,
+        store_dir,
+        index_path,
+    )
+    return store.count
@@ -0,0 +1,242 @@
+"""Sentence encoding backends, in process or over a pool of CPU workers.
+
+``BOE_EMBEDDING_BACKEND`` selects the backend: ``torch`` (the default,
+sentence-transformers on PyTorch), ``onnx`` or ``onnx-int8`` (ONNX Runtime,
+the latter with int8 dynamically quantized weights, see
+:mod:`tasks.onnx_encoder`).
+
+Large backfills are dominated by ``model.encode``. A single PyTorch process
+rarely keeps a many-core CPU busy, so :class:`EncodingPool` starts
+``workers`` processes, each loading its own copy of the model and limited
+to ``threads_per_worker`` intra-op threads. Chunks of segments are streamed
+to the workers with a bounded number in flight, and the results come back
+in input order.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterable, Iterator
+import multiprocessing
+import os
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.environ.get("BOE_EMBEDDING_BACKEND", "torch")
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+# Serialises the temporary os.environ changes of _thread_env
+_env_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def load_encoder(model_name: str, backend: str = EMBEDDING_BACKEND):
+    """Return an object with ``encode`` and ``get_sentence_embedding_dimension``."""
+    if backend == "torch":
+        return load_sentence_transformer(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        from tasks.onnx_encoder import OnnxEncoder
+
+        return OnnxEncoder(model_name, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected one of {BACKENDS})")
+
+
+def sentence_transformer_version(model) -> str | None:
+    """Identify the weights of a loaded SentenceTransformer.
+
+    The Hugging Face commit the model was downloaded at, or else a hash of
+    its parameters (models loaded from a local directory). Upgrading
+    sentence-transformers or torch does not change it.
+    """
+    try:
+        commit = model[0].auto_model.config._commit_hash
+        if isinstance(commit, str) and commit:
+            return commit
+        import hashlib
+
+        digest = hashlib.sha256()
+        for name, tensor in sorted(model.state_dict().items()):
+            digest.update(name.encode("utf-8"))
+            digest.update(tensor.detach().cpu().numpy().tobytes())
+        return f"weights-{digest.hexdigest()[:16]}"
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+
+
+def encoder_version(model) -> str | None:
+    """Identify the model behind the embeddings ``model`` produces.
+
+    The backend is recorded separately; this only changes with the weights.
+    """
+    if isinstance(model, EncodingPool):
+        return model.model_version()
+    version = getattr(model, "model_version", None)
+    if isinstance(version, str):
+        # OnnxEncoder: recorded at export time
+        return version
+    return sentence_transformer_version(model)
+
+
+def encoder_factory(backend: str = EMBEDDING_BACKEND):
+    """Picklable ``model_factory`` for :class:`EncodingPool`."""
+    return partial(load_encoder, backend=backend)
+
+
+@contextmanager
+def _thread_env(threads: int):
+    """Set the thread-count variables in this process while spawning workers.
+
+    A spawned child imports numpy (and torch) while unpickling its
+    initializer, before any of its own code runs, and the OpenMP and BLAS
+    pools are sized at import. So the limit has to be in the environment
+    the child inherits.
+    """
+    with _env_lock:
+        saved = {var: os.environ.get(var) for var in _THREAD_ENV_VARS}
+        os.environ.update({var: str(threads) for var in _THREAD_ENV_VARS})
+        try:
+            yield
+        finally:
+            for var, value in saved.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+
+def _init_worker(model_factory: Callable, model_name: str, threads: int) -> None:
+    global _worker_model
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = model_factory(model_name)
+
+
+def _encode_chunk(segments: list[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_model.encode(segments, batch_size=batch_size), dtype=np.float32)
+
+
+def _worker_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _worker_version() -> str | None:
+    return encoder_version(_worker_model)
+
+
+def chunks_of(items: Iterable, size: int) -> Iterator[list]:
+    """Yield consecutive lists of ``size`` items without materialising ``items``."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class EncodingPool:
+    """Encode segments with ``workers`` model replicas in separate processes.
+
+    ``model_factory(model_name)`` must be a picklable, module-level callable
+    returning an object with ``encode`` and
+    ``get_sentence_embedding_dimension``. Workers are started with the
+    ``spawn`` method so that no PyTorch thread pool is inherited via fork,
+    with ``OMP_NUM_THREADS`` and friends set to ``threads_per_worker`` in
+    the environment they start with.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        threads_per_worker: int = 1,
+        chunk_size: int = 256,
+        batch_size: int = 32,
+        max_in_flight: int | None = None,
+        model_factory: Callable = load_sentence_transformer,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight or 2 * workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_factory, model_name, threads_per_worker),
+        )
+        self._dimension = None
+        logger.info(
+            "EncodingPool -> %s workers x %s threads for %s",
+            workers,
+            threads_per_worker,
+            model_name,
+        )
+
+    def _submit(self, fn: Callable, *args):
+        # The executor spawns workers lazily, inside submit()
+        with _thread_env(self.threads_per_worker):
+            return self._executor.submit(fn, *args)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self._submit(_worker_dimension).result()
+        return self._dimension
+
+    def model_version(self) -> str | None:
+        """:func:`encoder_version` of the workers' model."""
+        return self._submit(_worker_version).result()
+
+    def encode_chunks(self, segments: Iterable[str]) -> Iterator[tuple[list[str], np.ndarray]]:
+        """Yield ``(chunk, embeddings)`` pairs in input order.
+
+        At most ``max_in_flight`` chunks are queued at a time, so ``segments``
+        can be a lazy iterator over a corpus larger than memory.
+        """
+        pending: deque = deque()
+        for chunk in chunks_of(segments, self.chunk_size):
+            pending.append((chunk, self._submit(_encode_chunk, chunk, self.batch_size)))
+            if len(pending) >= self.max_in_flight:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+    def encode(self, segments: Iterable[str]) -> np.ndarray:
+        """Encode ``segments`` and return one float32 row per segment."""
+        parts = [embeddings for _, embeddings in self.encode_chunks(segments)]
+        if not parts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "EncodingPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
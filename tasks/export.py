@@ -0,0 +1,262 @@
+"""Columnar export of the corpus to date-partitioned Parquet datasets.
+
+Layout under ``out_dir``::
+
+    metadata/date=YYYY-MM-DD/part-0.parquet     one row per article
+    segments/date=YYYY-MM-DD/part-0.parquet     one row per paragraph
+    embeddings/date=YYYY-MM-DD/part-0.parquet   optional, one row per vector
+    _export_state.json                          fingerprint of exported days
+    _export_state_embeddings.json               same, plus the FAISS index files
+
+The ``date`` column lives only in the Hive-style partition path. Only days
+whose rows changed since the previous export are rewritten, and each
+partition file is replaced atomically. With ``include_embeddings`` a day is
+also rewritten when its embeddings were never exported or the index changed
+since.
+"""
+
+from prefect import task
+from pathlib import Path
+import hashlib
+import json
+import os
+import sqlite3
+import logging
+
+from tasks.processing import segment_text
+from tasks.snapshots import INDEX_FILE, META_FILE, current_version
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "_export_state.json"
+EMBEDDINGS_STATE_FILE = "_export_state_embeddings.json"
+METADATA_COLUMNS = ("id", "title", "department", "rank", "url_xml", "url_pdf")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet export requires the 'pyarrow' package") from exc
+    return pyarrow, pyarrow.parquet
+
+
+def day_fingerprints(db_path: str) -> dict[str, str]:
+    """Return a change fingerprint per publication day.
+
+    Articles are only written with ``INSERT OR REPLACE``, which assigns a
+    fresh rowid, so their count plus highest rowid changes whenever a day
+    gains or rewrites texts. Metadata is also upserted in place (same rowid),
+    so its exported columns are hashed instead.
+    """
+    conn = sqlite3.connect(db_path)
+    prints: dict[str, list] = {}
+    digests: dict[str, list] = {}
+    for day, *row in conn.execute(
+        f"SELECT date, {', '.join(METADATA_COLUMNS)} FROM metadata ORDER BY date, id"
+    ):
+        entry = digests.setdefault(day, [0, hashlib.sha256()])
+        entry[0] += 1
+        entry[1].update(json.dumps(row).encode("utf-8"))
+    for day, (count, digest) in digests.items():
+        prints.setdefault(day, []).append(f"metadata:{count}:{digest.hexdigest()[:16]}")
+    for day, count, max_rowid in conn.execute(
+        "SELECT date, count(*), max(rowid) FROM articles GROUP BY date"
+    ):
+        prints.setdefault(day, []).append(f"articles:{count}:{max_rowid}")
+    conn.close()
+    return {day: "|".join(parts) for day, parts in prints.items() if day}
+
+
+def index_fingerprint(index_path: str, meta_path: str) -> str:
+    """Size and mtime of the index files; rewritten by every indexing run."""
+    parts = []
+    for path in (index_path, meta_path):
+        st = os.stat(path)
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "index:" + ":".join(parts)
+
+
+def _load_state(path: Path, full: bool) -> dict[str, str]:
+    return {} if full or not path.exists() else json.loads(path.read_text())
+
+
+def _save_state(path: Path, state: dict[str, str]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=0, sort_keys=True))
+    os.replace(tmp, path)
+
+
+class _PartitionWriter:
+    """Write one partition file in row chunks and publish it atomically."""
+
+    def __init__(self, out_dir: Path, dataset: str, day: str, schema):
+        _, pq = _require_pyarrow()
+        directory = out_dir / dataset / f"date={day}"
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / "part-0.parquet"
+        self.tmp = directory / "part-0.parquet.tmp"
+        self.schema = schema
+        self.writer = pq.ParquetWriter(self.tmp, schema, compression="zstd")
+        self.rows = 0
+
+    def write(self, columns: dict) -> None:
+        pa, _ = _require_pyarrow()
+        batch = pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self) -> int:
+        self.writer.close()
+        os.replace(self.tmp, self.path)
+        return self.rows
+
+
+def _load_embeddings(index_path: str, meta_path: str):
+    """Map article id -> list of (seq, row) in the FAISS index."""
+    import faiss
+
+    index = faiss.read_index(index_path)
+    rows: dict[str, list[tuple[int, int]]] = {}
+    with open(meta_path, encoding="utf-8") as f:
+        for row, line in enumerate(f):
+            if not line.strip():
+                continue
+            meta = json.loads(line)
+            seqs = rows.setdefault(meta.get("id"), [])
+            # Older metadata has no seq: vectors were stored in segment order
+            seqs.append((meta.get("seq", len(seqs)), row))
+    return index, rows
+
+
+def export_day(
+    day: str,
+    db_path: str,
+    out_dir: Path,
+    embeddings=None,
+    chunk_rows: int = 5000,
+) -> dict[str, int]:
+    """Export one publication day and return rows written per dataset."""
+    pa, _ = _require_pyarrow()
+    string = pa.string()
+    metadata_schema = pa.schema([(c, string) for c in METADATA_COLUMNS] + [("has_text", pa.bool_())])
+    segment_schema = pa.schema(
+        [("id", string), ("seq", pa.int32()), ("text", string)]
+    )
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {", ".join("m." + c for c in METADATA_COLUMNS)}, a.id IS NOT NULL
+        FROM metadata m LEFT JOIN articles a ON a.id = m.id
+        WHERE m.date = ? ORDER BY m.id
+        """,
+        (day,),
+    )
+    meta_writer = _PartitionWriter(out_dir, "metadata", day, metadata_schema)
+    while rows := cur.fetchmany(chunk_rows):
+        columns = {c: [r[i] for r in rows] for i, c in enumerate(METADATA_COLUMNS)}
+        columns["has_text"] = [bool(r[-1]) for r in rows]
+        meta_writer.write(columns)
+    counts = {"metadata": meta_writer.close()}
+
+    index, emb_rows = embeddings if embeddings else (None, None)
+    seg_writer = _PartitionWriter(out_dir, "segments", day, segment_schema)
+    emb_writer = None
+    if index is not None:
+        emb_schema = pa.schema(
+            [
+                ("id", string),
+                ("seq", pa.int32()),
+                ("vector", pa.list_(pa.float32(), index.d)),
+            ]
+        )
+        emb_writer = _PartitionWriter(out_dir, "embeddings", day, emb_schema)
+
+    cur.execute("SELECT id, text FROM articles WHERE date = ? ORDER BY id", (day,))
+    while rows := cur.fetchmany(chunk_rows):
+        seg = {"id": [], "seq": [], "text": []}
+        for article_id, text in rows:
+            for seq, paragraph in enumerate(segment_text(text or "", clean=False)):
+                seg["id"].append(article_id)
+                seg["seq"].append(seq)
+                seg["text"].append(paragraph)
+        seg_writer.write(seg)
+        if emb_writer is not None:
+            emb = {"id": [], "seq": [], "vector": []}
+            for article_id, _ in rows:
+                for seq, row in emb_rows.get(article_id, []):
+                    emb["id"].append(article_id)
+                    emb["seq"].append(seq)
+                    emb["vector"].append(index.reconstruct(row).tolist())
+            emb_writer.write(emb)
+    conn.close()
+    counts["segments"] = seg_writer.close()
+    if emb_writer is not None:
+        counts["embeddings"] = emb_writer.close()
+    return counts
+
+
+@task
+def export_corpus_to_parquet(
+    db_path: str = "data/boe.db",
+    out_dir: str = "data/parquet",
+    include_embeddings: bool = False,
+    index_path: str = "data/index.faiss",
+    meta_path: str = "data/index_meta.jsonl",
+    full: bool = False,
+    snapshot_dir: str | None = None,
+) -> list[str]:
+    """Export new or changed days to Parquet and return the days written.
+
+    With ``snapshot_dir`` the embeddings come from the current published
+    snapshot there instead of ``index_path`` and ``meta_path``.
+    """
+    _require_pyarrow()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    state_path = out / STATE_FILE
+    emb_state_path = out / EMBEDDINGS_STATE_FILE
+    state = _load_state(state_path, full)
+    emb_state = _load_state(emb_state_path, full)
+
+    current = day_fingerprints(db_path)
+    emb_current: dict[str, str] = {}
+    index_print = None
+    if include_embeddings and snapshot_dir:
+        # Published versions are immutable, so the name identifies the files
+        version = current_version(snapshot_dir)
+        if version:
+            index_path = str(Path(snapshot_dir) / version / INDEX_FILE)
+            meta_path = str(Path(snapshot_dir) / version / META_FILE)
+            index_print = f"snapshot:{version}"
+    elif include_embeddings and Path(index_path).exists() and Path(meta_path).exists():
+        index_print = index_fingerprint(index_path, meta_path)
+    if index_print:
+        emb_current = {day: f"{fp}|{index_print}" for day, fp in current.items()}
+    days = sorted(
+        day
+        for day, fp in current.items()
+        if state.get(day) != fp or (emb_current and emb_state.get(day) != emb_current[day])
+    )
+    logger.info("export_corpus_to_parquet -> %s days to export", len(days))
+    if not days:
+        return []
+
+    embeddings = _load_embeddings(index_path, meta_path) if emb_current else None
+
+    for day in days:
+        counts = export_day(day, db_path, out, embeddings)
+        state[day] = current[day]
+        if emb_current:
+            emb_state[day] = emb_current[day]
+        else:
+            # The day's embeddings partition, if any, predates these rows
+            emb_state.pop(day, None)
+        # Persist progress after every day so an interrupted run resumes
+        _save_state(emb_state_path, emb_state)
+        _save_state(state_path, state)
+        logger.info("export_corpus_to_parquet -> %s: %s", day, counts)
+    return days
@@ -2,8 +2,86 @@ from prefect import task
 from typing import Iterable
 from pathlib import Path
 import json
+import os
+import shutil
+import time
+import logging
 
-from tasks.processing import split_into_paragraphs
+from tasks.dedup import LSHIndex
+from tasks.embedding_store import EmbeddingStore, rebuild_faiss_index
+from tasks.encoding import (
+    EMBEDDING_BACKEND,
+    EncodingPool,
+    chunks_of,
+    encoder_factory,
+    encoder_version,
+    load_encoder,
+)
+from tasks.metrics import METRICS
+from tasks.processing import segment_texts
+from tasks.segments import SEGMENTS_FILE, SegmentStore
+from tasks.snapshots import (
+    INDEX_FILE,
+    META_FILE,
+    current_snapshot_dir,
+    publish_snapshot,
+    stage_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def _sync_store(store: EmbeddingStore, index, metas: list[dict]) -> None:
+    """Make ``store`` mirror ``index`` row for row, copying vectors out of it."""
+    if store.count == index.ntotal:
+        return
+    logger.warning(
+        "Embedding store has %s rows but the index %s; copying vectors from the index",
+        store.count,
+        index.ntotal,
+    )
+    store.reset()
+    try:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        logger.warning("Index type cannot reconstruct vectors; embedding store left empty")
+        return
+    store.append(vectors, metas)
+
+
+def _drop_changed_segments(lsh: LSHIndex, index, metas: list[dict], records, all_segments) -> int:
+    """Forget segments whose text changed since they were indexed.
+
+    Their dedup entries, and those of segments linked to them, are removed
+    so that the caller links or embeds them again; their vectors are
+    removed from ``index`` and ``metas`` (in place). Returns how many
+    vectors were removed.
+    """
+    import numpy as np
+
+    stale: set[str] = set()
+    for record, segments in zip(records, all_segments):
+        boe_id = record.get("id")
+        texts = {f"{boe_id}:{seq}": text for seq, text in enumerate(segments)}
+        stale.update(lsh.changed_keys(boe_id, texts))
+    if not stale:
+        return 0
+    # Duplicates of a changed segment have lost the vector they stood for
+    stale.update(key for canonical in list(stale) for key, _ in lsh.duplicates_of(canonical))
+    for key in stale:
+        lsh.remove(key)
+    rows = [row for row, meta in enumerate(metas) if f"{meta.get('id')}:{meta.get('seq')}" in stale]
+    logger.info("create_or_update_index -> %s changed segments, %s vectors replaced", len(stale), len(rows))
+    if not rows:
+        return 0
+    # Row ids after the removed ones shift down, as in metas below
+    index.remove_ids(np.array(rows, dtype="int64"))
+    dropped = set(rows)
+    metas[:] = [meta for row, meta in enumerate(metas) if row not in dropped]
+    return len(rows)
 
 
 @task
@@ -11,41 +89,222 @@ def create_or_update_index(
     records: Iterable[dict],
     index_path: str = "data/index.faiss",
     meta_path: str = "data/index_meta.jsonl",
+    dedup: bool = True,
+    dedup_path: str | None = None,
+    store_dir: str | None = None,
+    store_dtype: str = "float16",
+    workers: int = 0,
+    threads_per_worker: int = 1,
+    chunk_size: int = 256,
+    backend: str | None = None,
+    snapshot_dir: str | None = None,
+    segments_path: str | None = None,
 ):
-    """Compute embeddings for each fragment and store them in a local index."""
+    """Compute embeddings for each fragment and store them in a local index.
+
+    With ``dedup`` every segment is registered in a MinHash/LSH index kept
+    next to the FAISS file (``dedup_path``, ``<index>.dedup.db`` by default).
+    Segments already indexed, or near-duplicates of an indexed segment, are
+    not embedded again; their link to the canonical segment stays in the
+    LSH database. A segment whose text changed since it was indexed has its
+    old vector removed and is linked or embedded again.
+
+    New vectors are also appended to an :class:`EmbeddingStore` in
+    ``store_dir`` (``embeddings/`` next to the index by default). If the
+    index file is missing but the store is not, the index is rebuilt from
+    the store instead of re-encoding everything.
+
+    Segments are encoded in chunks of ``chunk_size``. With ``workers`` > 1
+    the chunks are streamed to an :class:`EncodingPool` of that many
+    processes, each using ``threads_per_worker`` threads. ``backend``
+    overrides ``BOE_EMBEDDING_BACKEND`` (``torch``, ``onnx`` or
+    ``onnx-int8``). If the store was written by another model or backend,
+    its vectors cannot be mixed with new ones: the mismatch is logged and
+    the store and index are rebuilt from ``records``.
+
+    With ``snapshot_dir`` the index is read from the current snapshot there
+    and the result is published as a new immutable version (see
+    :mod:`tasks.snapshots`) instead of overwriting ``index_path`` and
+    ``meta_path``. The embedding store and dedup database then default to
+    that directory too. No version is published when nothing was added.
+
+    The paragraphs of every record are written to a :class:`SegmentStore`
+    (``segments_path``, ``segments.db`` next to the index or inside the new
+    snapshot version by default) so that hits resolve to their passage text
+    without re-splitting articles.
+    """
 
-    from sentence_transformers import SentenceTransformer
     import faiss
     import numpy as np
 
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    dim = model.get_sentence_embedding_dimension()
-
-    index_file = Path(index_path)
-    meta_file = Path(meta_path)
+    backend = backend or EMBEDDING_BACKEND
+    pool = None
+    if workers > 1:
+        pool = EncodingPool(
+            EMBEDDING_MODEL,
+            workers,
+            threads_per_worker,
+            chunk_size,
+            model_factory=encoder_factory(backend),
+        )
+    model = pool or load_encoder(EMBEDDING_MODEL, backend)
+    model_version = encoder_version(model)
+    staging = None
+    try:
+        dim = model.get_sentence_embedding_dimension()
 
-    if index_file.exists():
-        index = faiss.read_index(str(index_file))
-        metas = (
-            [json.loads(line) for line in meta_file.read_text(encoding="utf-8").splitlines()]
-            if meta_file.exists()
-            else []
+        if snapshot_dir:
+            root = Path(snapshot_dir)
+            staging = stage_snapshot(snapshot_dir)
+            base = current_snapshot_dir(snapshot_dir) or staging
+            index_file, meta_file = base / INDEX_FILE, base / META_FILE
+            out_index, out_meta = staging / INDEX_FILE, staging / META_FILE
+            default_dedup = root / "index.dedup.db"
+        else:
+            root = Path(index_path).parent
+            index_file = out_index = Path(index_path)
+            meta_file = out_meta = Path(meta_path)
+            default_dedup = index_file.with_suffix(".dedup.db")
+        store_dir = store_dir or str(root / "embeddings")
+        store_args = dict(
+            model=EMBEDDING_MODEL,
+            backend=backend,
+            model_version=model_version,
+            dim=dim,
+            dtype=store_dtype,
         )
-    else:
-        index_file.parent.mkdir(parents=True, exist_ok=True)
-        index = faiss.IndexFlatL2(dim)
-        metas = []
-
-    for record in records:
-        segments = split_into_paragraphs(record.get("text", ""))
-        if not segments:
-            continue
-        embeddings = model.encode(segments)
-        index.add(np.array(embeddings, dtype="float32"))
-        metas.extend({"id": record.get("id"), "title": record.get("title")} for _ in segments)
-
-    faiss.write_index(index, str(index_file))
-    meta_file.write_text(
-        "\n".join(json.dumps(m, ensure_ascii=False) for m in metas),
-        encoding="utf-8",
-    )
+        rebuild = False
+        try:
+            store = EmbeddingStore(store_dir, **store_args)
+        except ValueError as exc:
+            logger.warning("create_or_update_index -> %s; rebuilding the index", exc)
+            shutil.rmtree(store_dir)
+            store = EmbeddingStore(store_dir, **store_args)
+            rebuild = True
+
+        fresh = False
+        if index_file.exists() and not rebuild:
+            index = faiss.read_index(str(index_file))
+            metas = (
+                [json.loads(line) for line in meta_file.read_text(encoding="utf-8").splitlines()]
+                if meta_file.exists()
+                else []
+            )
+            _sync_store(store, index, metas)
+        elif store.count:
+            rebuild_faiss_index.fn(store_dir, str(out_index), str(out_meta))
+            index = faiss.read_index(str(out_index))
+            metas = store.rows()
+        else:
+            fresh = True
+            out_index.parent.mkdir(parents=True, exist_ok=True)
+            index = faiss.IndexFlatL2(dim)
+            metas = []
+
+        if segments_path is None and staging is not None:
+            # Versioned with the snapshot: start from the current version's copy
+            segments_path = str(staging / SEGMENTS_FILE)
+            for source in (base / SEGMENTS_FILE, root / SEGMENTS_FILE):
+                if source.exists():
+                    shutil.copyfile(source, segments_path)
+                    break
+        segment_store = SegmentStore(segments_path or str(root / SEGMENTS_FILE))
+        lsh = None
+        if dedup:
+            dedup_file = Path(dedup_path) if dedup_path else default_dedup
+            if fresh:
+                # A fresh index must not inherit links to vectors it does not hold
+                dedup_file.unlink(missing_ok=True)
+            lsh = LSHIndex(str(dedup_file), "segment")
+
+        new_vectors: list = []
+        new_metas: list[dict] = []
+        texts: list[str] = []
+        started = time.perf_counter()
+        records = list(records)
+        all_segments = segment_texts((r.get("text", "") for r in records), clean=False)
+        removed = 0
+        if lsh is not None:
+            with METRICS.timer("boe_stage_seconds", stage="dedup"):
+                removed = _drop_changed_segments(lsh, index, metas, records, all_segments)
+        skipped = changed = 0
+        for record, segments in zip(records, all_segments):
+            changed += segment_store.put(record.get("id"), segments)
+            seqs = list(range(len(segments)))
+            if lsh is not None:
+                with METRICS.timer("boe_stage_seconds", stage="dedup"):
+                    seqs = []
+                    for seq, segment in enumerate(segments):
+                        key = f"{record.get('id')}:{seq}"
+                        if lsh.contains(key) or lsh.link(key, segment, record.get("id"))[0]:
+                            continue
+                        seqs.append(seq)
+                skipped += len(segments) - len(seqs)
+            texts.extend(segments[seq] for seq in seqs)
+            new_metas.extend(
+                {"id": record.get("id"), "title": record.get("title"), "seq": seq} for seq in seqs
+            )
+
+        if pool is not None:
+            batches = pool.encode_chunks(texts)
+        else:
+            batches = (
+                (chunk, np.array(model.encode(chunk), dtype="float32"))
+                for chunk in chunks_of(texts, chunk_size)
+            )
+        while True:
+            with METRICS.timer("boe_stage_seconds", stage="encode"):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            index.add(batch[1])
+            new_vectors.append(batch[1])
+        vectors = len(texts)
+
+        elapsed = time.perf_counter() - started
+        METRICS.inc("boe_vectors_total", vectors)
+        METRICS.inc("boe_segments_skipped_total", skipped)
+        METRICS.set_gauge("boe_vectors_per_second", vectors / elapsed if elapsed else 0.0)
+
+        # Store first: if the index write fails, the next run sees more stored
+        # rows than indexed vectors and resynchronises from the index
+        metas.extend(new_metas)
+        if removed:
+            # Rows were deleted from the middle: rewrite the store from the index
+            store.reset()
+            if index.ntotal:
+                store.append(index.reconstruct_n(0, index.ntotal), metas)
+        elif new_metas:
+            store.append(np.concatenate(new_vectors), new_metas)
+        segment_store.close()
+        if (
+            staging is None
+            or new_metas
+            or removed
+            or changed
+            or current_snapshot_dir(snapshot_dir) is None
+        ):
+            # Write both under temporary names, then rename each into place so
+            # readers never load a half-written file. Metadata goes first: when
+            # vectors were only appended, a reader in between pairs the old
+            # index with a superset of its rows
+            tmp_index = out_index.with_name(out_index.name + ".tmp")
+            tmp_meta = out_meta.with_name(out_meta.name + ".tmp")
+            faiss.write_index(index, str(tmp_index))
+            tmp_meta.write_text(
+                "\n".join(json.dumps(m, ensure_ascii=False) for m in metas),
+                encoding="utf-8",
+            )
+            os.replace(tmp_meta, out_meta)
+            os.replace(tmp_index, out_index)
+            if staging is not None:
+                publish_snapshot(snapshot_dir, staging)
+                staging = None
+        if lsh is not None:
+            # Commit the segment links only once the vectors they refer to are saved
+            lsh.close()
+    finally:
+        if pool is not None:
+            pool.close()
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,67 @@
+from prefect import task
+import logging
+
+from tasks.boe import fetch_article_xml, get_article_metadata, parse_article_xml
+from tasks.database import existing_article_ids, insert_articles
+from tasks.dedup import link_near_duplicate_articles
+from tasks.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def chunked(items: list, size: int) -> list[list]:
+    """Split ``items`` into consecutive chunks of at most ``size`` elements."""
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def build_article_row(
+    boe_id: str, date_iso: str, xml: bytes | str
+) -> tuple[dict, str, dict]:
+    """Turn a downloaded article into the ``(record, text, details)`` row stored in SQLite."""
+    metadata = get_article_metadata.fn(boe_id, date_iso)
+    with METRICS.timer("boe_stage_seconds", stage="parse"):
+        article_data = parse_article_xml.fn(xml)
+    record = {
+        **metadata,
+        "title": article_data.get("title"),
+        "department": article_data.get("department"),
+        "rank": article_data.get("rank"),
+    }
+    return record, "\n".join(article_data.get("segments", [])), article_data
+
+
+def _within_retry_budget(task, task_run, state) -> bool:
+    """Retry a failed batch only while the run's retry budget allows."""
+    from tasks import budget
+
+    return budget.withdraw("task")
+
+
+@task(retries=2, retry_delay_seconds=5, retry_condition_fn=_within_retry_budget)
+def ingest_article_batch(
+    boe_ids: list[str], date_iso: str, db_path: str = "data/boe.db"
+) -> int:
+    """Fetch, parse and store a chunk of articles within one task run.
+
+    Articles already in the database are skipped, and whatever was fetched
+    before a failure is still written, so a retry resumes where the previous
+    attempt stopped. Stored texts are linked to near-duplicate articles.
+    """
+    logger.info("ingest_article_batch -> %s ids for %s", len(boe_ids), date_iso)
+    existing = existing_article_ids.fn(boe_ids, db_path)
+    rows: list[tuple[dict, str, dict]] = []
+    try:
+        for boe_id in boe_ids:
+            if boe_id in existing:
+                METRICS.inc("boe_articles_skipped_total")
+                continue
+            with METRICS.timer("boe_stage_seconds", stage="article_fetch"):
+                xml = fetch_article_xml.fn(boe_id)
+            rows.append(build_article_row(boe_id, date_iso, xml))
+    finally:
+        with METRICS.timer("boe_stage_seconds", stage="db_write"):
+            insert_articles.fn(rows, db_path)
+        with METRICS.timer("boe_stage_seconds", stage="dedup"):
+            link_near_duplicate_articles.fn(rows, db_path)
+    logger.info("ingest_article_batch -> stored %s articles", len(rows))
+    return len(rows)
@@ -0,0 +1,196 @@
+"""In-process metrics registry for flow stages and HTTP traffic.
+
+Metrics are disabled unless ``BOE_METRICS`` is set to a truthy value (or
+``METRICS.enabled`` is switched on), in which case every call below returns
+immediately so instrumented code paths pay close to nothing.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TRUTHY = {"1", "true", "yes", "on"}
+_QUANTILES = (0.5, 0.95, 0.99)
+_NULL_TIMER = nullcontext()
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _quantile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    pos = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[pos]
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_labels", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: dict):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(
+            self._name, time.perf_counter() - self._start, **self._labels
+        )
+        return False
+
+
+class Metrics:
+    """Thread-safe counters, gauges and timing summaries."""
+
+    def __init__(self, enabled: bool = False, max_samples: int = 10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._timings: dict[tuple, list] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = float(value)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            entry = self._timings.get(key)
+            if entry is None:
+                entry = self._timings[key] = [0, 0.0, deque(maxlen=self.max_samples)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+
+    def timer(self, name: str, **labels):
+        """Context manager that records the elapsed time of its block."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    @contextmanager
+    def collect(self, key: str):
+        """Context manager for a flow run: clears the registry on entry and
+        publishes it under ``key`` on exit, also after an early return or
+        an error."""
+        self.reset()
+        try:
+            yield self
+        finally:
+            self.publish(key)
+
+    def quantile(self, name: str, q: float, **labels) -> float | None:
+        """Return the ``q`` quantile of the recent samples of a timing."""
+        with self._lock:
+            entry = self._timings.get((name, _label_key(labels)))
+            samples = list(entry[2]) if entry else []
+        return _quantile(samples, q) if samples else None
+
+    def snapshot(self) -> dict:
+        """Return a plain-dict copy of every recorded series."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {k: (v[0], v[1], list(v[2])) for k, v in self._timings.items()}
+        summary = {}
+        for key, (count, total, samples) in timings.items():
+            summary[key] = {
+                "count": count,
+                "sum": total,
+                **{f"p{int(q * 100)}": _quantile(samples, q) for q in _QUANTILES},
+            }
+        return {"counters": counters, "gauges": gauges, "timings": summary}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines: list[str] = []
+        seen: set[str] = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, key), value in sorted(snap["counters"].items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for (name, key), value in sorted(snap["gauges"].items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for (name, key), stats in sorted(snap["timings"].items()):
+            header(name, "summary")
+            for q in _QUANTILES:
+                labels = _format_labels(key, (("quantile", str(q)),))
+                lines.append(f"{name}{labels} {stats[f'p{int(q * 100)}']:.6f}")
+            lines.append(f"{name}_sum{_format_labels(key)} {stats['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {stats['count']}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def publish(self, key: str) -> None:
+        """Expose the current metrics as a Prefect artifact and textfile.
+
+        The Prometheus text is written to ``BOE_METRICS_FILE`` when that
+        variable is set, so a node exporter textfile collector can scrape it.
+        """
+        if not self.enabled:
+            return
+        text = self.render_prometheus()
+        metrics_file = os.environ.get("BOE_METRICS_FILE")
+        if metrics_file:
+            tmp = f"{metrics_file}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, metrics_file)
+        try:
+            from prefect.artifacts import create_markdown_artifact
+
+            create_markdown_artifact(
+                markdown=f"```\n{text}```",
+                key=key,
+                description="Per-stage timings and throughput",
+            )
+        except Exception as exc:  # no active run or API unavailable
+            logger.debug("publish -> artifact not created: %s", exc)
+
+
+METRICS = Metrics(enabled=os.environ.get("BOE_METRICS", "").lower() in _TRUTHY)
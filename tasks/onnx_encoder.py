@@ -0,0 +1,176 @@
+"""ONNX Runtime backend for the sentence embedding model.
+
+:func:`export_onnx` converts a sentence-transformers model to ONNX once
+(this step needs torch and sentence-transformers) and optionally writes an
+int8 dynamically quantized copy. :class:`OnnxEncoder` then only needs
+``onnxruntime`` and ``transformers`` for the tokenizer. It reproduces the
+model's pooling (mean over the attention mask) and its optional L2
+normalisation.
+"""
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_DIR = os.environ.get("BOE_ONNX_DIR", "data/onnx")
+_CONFIG = "encoder.json"
+
+
+def _model_dir(model_name: str, onnx_dir: str) -> Path:
+    return Path(onnx_dir) / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str, onnx_dir: str = ONNX_DIR, quantize: bool = True) -> Path:
+    """Export ``model_name`` to ``onnx_dir`` and return the export directory.
+
+    Writes ``model.onnx``, ``model.int8.onnx`` (with ``quantize``), the
+    tokenizer files and ``encoder.json`` (sequence length, pooling,
+    normalisation and the revision of the exported weights). An existing
+    export is reused.
+    """
+    target = _model_dir(model_name, onnx_dir)
+    fp32 = target / "model.onnx"
+    int8 = target / "model.int8.onnx"
+    if not fp32.exists():
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+
+        from tasks.encoding import sentence_transformer_version
+
+        st = SentenceTransformer(model_name, device="cpu")
+        transformer = st[0].auto_model.eval()
+        tokenizer = st.tokenizer
+        target.mkdir(parents=True, exist_ok=True)
+        tokenizer.save_pretrained(target)
+        sample = tokenizer(["ejemplo de texto"], return_tensors="pt")
+        inputs = ("input_ids", "attention_mask", "token_type_ids")
+        inputs = tuple(name for name in inputs if name in sample)
+        # {axis index: name} for every input and the output
+        dynamic = {0: "batch", 1: "tokens"}
+
+        class ByName(torch.nn.Module):
+            # Newer transformers wrap forward() and break positional tracing
+            def __init__(self):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *tensors):
+                return self.transformer(**dict(zip(inputs, tensors)))[0]
+
+        torch.onnx.export(
+            ByName().eval(),
+            tuple(sample[name] for name in inputs),
+            str(fp32),
+            input_names=list(inputs),
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: dynamic for name in (*inputs, "last_hidden_state")},
+            opset_version=14,
+            # The TorchScript exporter: dynamic_axes is its API, and the
+            # dynamo one would also need onnxscript
+            dynamo=False,
+        )
+        (target / _CONFIG).write_text(
+            json.dumps(
+                {
+                    "model": model_name,
+                    "revision": sentence_transformer_version(st),
+                    "max_seq_length": st.max_seq_length,
+                    "normalize": any(isinstance(m, Normalize) for m in st),
+                    "inputs": list(inputs),
+                }
+            ),
+            encoding="utf-8",
+        )
+        logger.info("export_onnx -> %s exported to %s", model_name, fp32)
+    if quantize and not int8.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32), str(int8), weight_type=QuantType.QInt8)
+        logger.info("export_onnx -> int8 model written to %s", int8)
+    return target
+
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray, normalize: bool) -> np.ndarray:
+    """Average token states over the attention mask, as sentence-transformers does."""
+    mask = mask[..., None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+
+def _file_version(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"weights-{digest.hexdigest()[:16]}"
+
+
+class OnnxEncoder:
+    """Drop-in replacement for ``SentenceTransformer.encode`` on ONNX Runtime.
+
+    ``threads`` sets the intra-op thread count; by default it follows
+    ``OMP_NUM_THREADS`` (as set by :class:`tasks.encoding.EncodingPool`) or
+    lets ONNX Runtime decide. ``model_version`` is the revision of the
+    weights that were exported, or a hash of ``model.onnx`` for exports
+    that predate it.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        quantized: bool = True,
+        onnx_dir: str = ONNX_DIR,
+        threads: int | None = None,
+    ):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        target = _model_dir(model_name, onnx_dir)
+        if not (target / _CONFIG).exists() or (
+            quantized and not (target / "model.int8.onnx").exists()
+        ):
+            target = export_onnx(model_name, onnx_dir, quantize=quantized)
+        self.config = json.loads((target / _CONFIG).read_text(encoding="utf-8"))
+        self.model_version = self.config.get("revision") or _file_version(target / "model.onnx")
+        self.tokenizer = AutoTokenizer.from_pretrained(target)
+        options = onnxruntime.SessionOptions()
+        threads = threads if threads is not None else int(os.environ.get("OMP_NUM_THREADS", 0))
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = target / ("model.int8.onnx" if quantized else "model.onnx")
+        self.session = onnxruntime.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._dimension = None
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        sentences = [sentences] if isinstance(sentences, str) else list(sentences)
+        parts = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.config["max_seq_length"],
+                return_tensors="np",
+            )
+            feed = {name: tokens[name].astype(np.int64) for name in self.config["inputs"]}
+            hidden = self.session.run(None, feed)[0]
+            parts.append(mean_pool(hidden, tokens["attention_mask"], self.config["normalize"]))
+        if not parts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = int(self.encode(["dimension"]).shape[1])
+        return self._dimension
@@ -0,0 +1,207 @@
+"""Streaming, resumable download of article PDFs.
+
+Each PDF is streamed in ``CHUNK_SIZE`` pieces to ``<id>.pdf.part`` next to
+its destination and hashed (SHA-256) on the way, so memory use does not
+depend on the file size. A download cut short leaves the ``.part`` file
+behind. The next attempt asks only for the missing bytes with ``Range:
+bytes=N-``, guarded by ``If-Range`` with the validator saved from the first
+response. A server that answers 200 instead of 206 starts the file over.
+The finished file must have the expected size (the sumario's ``szBytes``,
+otherwise the announced length) and start like a PDF. Only then is it
+renamed into place.
+
+Files already on disk with the expected size are skipped without a request.
+The ``pdf_files`` table records the size and SHA-256 of every stored file,
+and ``fetch_pdfs(verify=True)`` re-hashes them to find damaged copies.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import logging
+
+import requests
+from prefect import task
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from tasks import session
+from tasks.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+PDF_DIR = os.environ.get("BOE_PDF_DIR", "data/pdfs")
+PDF_CONCURRENCY = int(os.environ.get("BOE_PDF_CONCURRENCY", 4))
+CHUNK_SIZE = 256 * 1024
+ATTEMPTS = 3
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+class PDFDownloadError(Exception):
+    """The downloaded file failed its size or format check."""
+
+
+def pdf_path(root: str, boe_id: str, date_iso: str | None = None) -> Path:
+    """``<root>/YYYY/MM/DD/<id>.pdf``, or ``<root>/<id>.pdf`` without a date."""
+    parts = date_iso.split("-") if date_iso else []
+    return Path(root, *parts, f"{boe_id}.pdf")
+
+
+def _file_digest(path: Path):
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def file_sha256(path: str | Path) -> str:
+    return _file_digest(Path(path)).hexdigest()
+
+
+def _body_chunks(response):
+    """Yield the body as it arrives (``read1``), so an interrupted transfer
+    keeps everything received, unlike ``iter_content`` which loses the
+    incomplete last chunk."""
+    try:
+        while chunk := response.raw.read1(CHUNK_SIZE, decode_content=True):
+            yield chunk
+    except ProtocolError as exc:
+        raise requests.exceptions.ChunkedEncodingError(exc) from exc
+    except ReadTimeoutError as exc:
+        raise requests.exceptions.ConnectionError(exc) from exc
+
+
+def _validator(response) -> str | None:
+    return response.headers.get("ETag") or response.headers.get("Last-Modified")
+
+
+def _fetch_into(url: str, part: Path, meta: Path, timeout: float) -> tuple[int | None, str]:
+    """Append the missing bytes of ``url`` to ``part``.
+
+    Returns the total size announced by the server and the SHA-256 of
+    ``part``.
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    # Compressed transfer would break byte offsets, and PDFs barely compress
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if meta.exists():
+            headers["If-Range"] = json.loads(meta.read_text())["validator"]
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416 and offset:
+            total = r.headers.get("Content-Range", "").rpartition("/")[2]
+            return (int(total) if total.isdigit() else offset), _file_digest(part).hexdigest()
+        r.raise_for_status()
+        if r.status_code == 206:
+            match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+            if not match or int(match.group(1)) != offset:
+                raise PDFDownloadError(f"Unexpected Content-Range for {url}")
+            total = int(match.group(2)) if match.group(2) != "*" else None
+            mode, digest = "ab", _file_digest(part)
+            METRICS.inc("boe_pdf_resumed_total")
+        else:
+            length = r.headers.get("Content-Length")
+            total = int(length) if length else None
+            mode, digest = "wb", hashlib.sha256()
+            validator = _validator(r)
+            if validator:
+                meta.write_text(json.dumps({"validator": validator}))
+            else:
+                meta.unlink(missing_ok=True)
+        with part.open(mode) as f:
+            for chunk in _body_chunks(r):
+                f.write(chunk)
+                digest.update(chunk)
+                METRICS.inc("boe_pdf_bytes_total", len(chunk))
+    return total, digest.hexdigest()
+
+
+def download_pdf(
+    url: str,
+    dest: str | Path,
+    expected_bytes: int = 0,
+    attempts: int = ATTEMPTS,
+    timeout: float = 30,
+) -> dict:
+    """Download ``url`` to ``dest``, resuming any partial file.
+
+    Returns ``{"path", "bytes", "sha256", "skipped"}``; an existing file
+    with the expected size is hashed but not downloaded again. Raises
+    :class:`PDFDownloadError` when the result has the wrong size or is not a
+    PDF, and the last transfer error once ``attempts`` are used up.
+    """
+    dest = Path(dest)
+    if dest.exists() and (not expected_bytes or dest.stat().st_size == expected_bytes):
+        METRICS.inc("boe_pdf_files_total", result="skipped")
+        return {
+            "path": str(dest),
+            "bytes": dest.stat().st_size,
+            "sha256": file_sha256(dest),
+            "skipped": True,
+        }
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    meta = dest.with_name(dest.name + ".part.json")
+    for attempt in range(1, attempts + 1):
+        try:
+            total, sha256 = _fetch_into(url, part, meta, timeout)
+            break
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as exc:
+            # Whatever arrived stays in the .part file for the next attempt
+            logger.warning("download_pdf -> %s interrupted (%s/%s): %s", url, attempt, attempts, exc)
+            if attempt == attempts:
+                raise
+    size = part.stat().st_size
+    expected = expected_bytes or total
+    with part.open("rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+    if (expected and size != expected) or not is_pdf:
+        part.unlink()
+        meta.unlink(missing_ok=True)
+        METRICS.inc("boe_pdf_files_total", result="invalid")
+        raise PDFDownloadError(
+            f"{url}: got {size} bytes, expected {expected or 'unknown'}"
+            + ("" if is_pdf else ", not a PDF")
+        )
+    os.replace(part, dest)
+    meta.unlink(missing_ok=True)
+    METRICS.inc("boe_pdf_files_total", result="downloaded")
+    return {"path": str(dest), "bytes": size, "sha256": sha256, "skipped": False}
+
+
+@task
+def download_pdfs(
+    records: list[dict],
+    root: str = PDF_DIR,
+    max_workers: int = PDF_CONCURRENCY,
+) -> list[dict]:
+    """Download the ``url_pdf`` of each record with bounded concurrency.
+
+    Records carry ``id``, ``date``, ``url_pdf`` and optionally the
+    sumario's ``pdf_bytes``. Returns one result per record that was
+    downloaded or already present, with ``id`` and ``date`` added. Failures
+    are logged and left out, so they are retried by the next run.
+    """
+    records = [r for r in records if r.get("url_pdf")]
+    logger.info("download_pdfs -> %s PDFs, %s workers", len(records), max_workers)
+
+    def fetch(record: dict) -> dict | None:
+        dest = pdf_path(root, record["id"], record.get("date"))
+        try:
+            with METRICS.timer("boe_stage_seconds", stage="pdf_fetch"):
+                result = download_pdf(record["url_pdf"], dest, record.get("pdf_bytes") or 0)
+        except (requests.RequestException, PDFDownloadError, OSError) as exc:
+            logger.error("download_pdfs -> %s failed: %s", record["id"], exc)
+            METRICS.inc("boe_pdf_files_total", result="failed")
+            return None
+        return {"id": record["id"], "date": record.get("date"), **result}
+
+    if not records:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(records)))) as pool:
+        return [result for result in pool.map(fetch, records) if result is not None]
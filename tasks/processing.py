@@ -1,4 +1,13 @@
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable
+
+_BLANKS_RE = re.compile(r"[ \t]+")
+_NEWLINES_RE = re.compile(r"\n+")
+
+# Below this many documents a process pool costs more than it saves
+POOL_MIN_DOCUMENTS = 2000
 
 
 def clean_boe_text(text: str) -> str:
@@ -8,9 +17,9 @@ def clean_boe_text(text: str) -> str:
     # Normalize line endings
     text = text.replace("\r", "\n")
     # Collapse spaces and tabs but keep newlines
-    cleaned = re.sub(r"[ \t]+", " ", text)
+    cleaned = _BLANKS_RE.sub(" ", text)
     # Collapse multiple newlines
-    cleaned = re.sub(r"\n+", "\n", cleaned)
+    cleaned = _NEWLINES_RE.sub("\n", cleaned)
     return cleaned.strip()
 
 
@@ -18,5 +27,42 @@ def split_into_paragraphs(text: str) -> list[str]:
     """Split cleaned BOE article text into paragraphs."""
     if not text:
         return []
-    paragraphs = [p.strip() for p in re.split(r"\n+", text) if p.strip()]
+    paragraphs = [p.strip() for p in _NEWLINES_RE.split(text) if p.strip()]
     return paragraphs
+
+
+def segment_text(text: str, clean: bool = True) -> list[str]:
+    """Normalize and split ``text`` into paragraphs in a single pass.
+
+    Returns exactly ``split_into_paragraphs(clean_boe_text(text))``, or
+    ``split_into_paragraphs(text)`` when ``clean`` is false.
+    """
+    if not text:
+        return []
+    if clean:
+        text = _BLANKS_RE.sub(" ", text.replace("\r", "\n"))
+    return [p for p in map(str.strip, text.split("\n")) if p]
+
+
+def _segment_chunk(texts: list[str], clean: bool) -> list[list[str]]:
+    return [segment_text(t, clean) for t in texts]
+
+
+def segment_texts(
+    texts: Iterable[str],
+    clean: bool = True,
+    processes: int | None = None,
+    chunksize: int = 256,
+) -> list[list[str]]:
+    """Segment many documents, optionally spreading them over a process pool.
+
+    ``processes`` enables the pool for batches of at least
+    ``POOL_MIN_DOCUMENTS`` documents; results keep the input order.
+    """
+    texts = list(texts)
+    if not processes or processes < 2 or len(texts) < POOL_MIN_DOCUMENTS:
+        return _segment_chunk(texts, clean)
+    chunks = [texts[i : i + chunksize] for i in range(0, len(texts), chunksize)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = pool.map(partial(_segment_chunk, clean=clean), chunks)
+        return [segments for chunk in results for segments in chunk]
@@ -0,0 +1,269 @@
+"""Adaptive token-bucket rate limiting for the shared HTTP session.
+
+The bucket refills at ``rate`` requests per second. Every 429/503 halves the
+rate and blocks new requests until ``Retry-After`` has passed, and each
+successful response raises the rate additively up to ``max_rate`` (AIMD).
+:class:`SqliteTokenBucket` keeps that state in a SQLite file so that every
+thread and process pointing at the same file shares one allowance.
+
+Configuration is read from the environment by :func:`limiter_from_env`:
+
+* ``BOE_RATE_LIMIT`` – initial requests per second (``0`` disables limiting).
+* ``BOE_RATE_LIMIT_MAX`` – ceiling the rate may grow to.
+* ``BOE_RATE_LIMIT_DB`` – SQLite file used to coordinate workers.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import logging
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from tasks.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """Return the delay in seconds announced by a ``Retry-After`` header."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class TokenBucket:
+    """Token bucket shared by the threads of a single process."""
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        max_rate: float = 20.0,
+        min_rate: float = 0.2,
+        burst: float | None = None,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.initial_rate = rate
+        self.max_rate = max(rate, max_rate)
+        self.min_rate = min_rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._state = self._initial_state()
+
+    def _initial_state(self) -> dict:
+        return {
+            "tokens": self.burst,
+            "rate": self.initial_rate,
+            "updated": self.clock(),
+            "blocked_until": 0.0,
+        }
+
+    def _update(self, fn):
+        """Apply ``fn`` to the bucket state atomically and return its result."""
+        with self._lock:
+            return fn(self._state)
+
+    def _refill(self, state: dict, now: float) -> None:
+        elapsed = max(0.0, now - state["updated"])
+        capacity = max(self.burst, state["rate"])
+        state["tokens"] = min(capacity, state["tokens"] + elapsed * state["rate"])
+        state["updated"] = now
+
+    def _try_take(self, state: dict) -> float:
+        now = self.clock()
+        self._refill(state, now)
+        if now < state["blocked_until"]:
+            return state["blocked_until"] - now
+        if state["tokens"] >= 1.0:
+            state["tokens"] -= 1.0
+            return 0.0
+        return (1.0 - state["tokens"]) / state["rate"]
+
+    def acquire(self) -> float:
+        """Block until a request may be sent and return the time waited."""
+        waited = 0.0
+        while True:
+            delay = self._update(self._try_take)
+            if delay <= 0:
+                break
+            delay = min(delay, 1.0)
+            self.sleep(delay)
+            waited += delay
+        if waited:
+            METRICS.observe("boe_rate_limit_wait_seconds", waited)
+        return waited
+
+    def on_response(self, status: int, retry_after: float | None = None) -> None:
+        """Adapt the rate to the outcome of a request."""
+
+        def adapt(state: dict) -> None:
+            now = self.clock()
+            self._refill(state, now)
+            if status in THROTTLE_STATUSES:
+                state["rate"] = max(self.min_rate, state["rate"] * self.decrease)
+                state["tokens"] = 0.0
+                pause = retry_after if retry_after is not None else 1.0 / state["rate"]
+                state["blocked_until"] = max(state["blocked_until"], now + pause)
+                logger.warning(
+                    "on_response -> throttled (%s), rate now %.2f req/s, pausing %.1fs",
+                    status,
+                    state["rate"],
+                    pause,
+                )
+            elif status < 500:
+                state["rate"] = min(self.max_rate, state["rate"] + self.increase)
+            METRICS.set_gauge("boe_rate_limit_rate", state["rate"])
+
+        self._update(adapt)
+
+    @property
+    def rate(self) -> float:
+        return self._update(lambda state: state["rate"])
+
+
+class SqliteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in SQLite, shared across processes."""
+
+    def __init__(self, db_path: str, name: str = "boe", **kwargs):
+        self.db_path = db_path
+        self.name = name
+        self._local = threading.local()
+        super().__init__(**kwargs)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "name TEXT PRIMARY KEY, tokens REAL, rate REAL, "
+            "updated REAL, blocked_until REAL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _update(self, fn):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, rate, updated, blocked_until FROM rate_limit WHERE name=?",
+                (self.name,),
+            ).fetchone()
+            if row is None:
+                state = self._initial_state()
+            else:
+                state = dict(zip(("tokens", "rate", "updated", "blocked_until"), row))
+            result = fn(state)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.name,
+                    state["tokens"],
+                    state["rate"],
+                    state["updated"],
+                    state["blocked_until"],
+                ),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+class LimitedRetry(Retry):
+    """urllib3 ``Retry`` that reports throttling and waits for a token
+    before every retried attempt.
+
+    With a ``budget`` (:class:`tasks.retry.RetryBudget`) each retry also
+    spends a budget token, and the request fails as if its retries were
+    exhausted once the budget is empty.
+    """
+
+    def __init__(self, *args, limiter: TokenBucket | None = None, budget=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+        self.budget = budget
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.limiter = self.limiter
+        retry.budget = self.budget
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        redirect = response is not None and response.get_redirect_location()
+        if self.budget is not None and not redirect and not self.budget.withdraw("retry"):
+            reason = error or ResponseError(
+                f"retry budget exhausted after status {getattr(response, 'status', None)}"
+            )
+            raise MaxRetryError(_pool, url, reason) from reason
+        return retry
+
+    def sleep(self, response=None):
+        if self.limiter is not None and response is not None:
+            self.limiter.on_response(
+                response.status, parse_retry_after(response.headers.get("Retry-After"))
+            )
+        super().sleep(response)
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTP adapter that takes a token before sending each request.
+
+    Successful responses are credited to the retry ``budget``, if any.
+    """
+
+    def __init__(self, limiter: TokenBucket | None = None, budget=None, **kwargs):
+        self.limiter = limiter
+        self.budget = budget
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        response = super().send(request, **kwargs)
+        if self.limiter is not None:
+            self.limiter.on_response(
+                response.status_code, parse_retry_after(response.headers.get("Retry-After"))
+            )
+        if self.budget is not None and response.status_code < 500 and response.status_code != 429:
+            self.budget.deposit()
+        return response
+
+
+def limiter_from_env() -> TokenBucket | None:
+    """Build the session limiter from ``BOE_RATE_LIMIT*`` variables."""
+    rate = float(os.environ.get("BOE_RATE_LIMIT", "5"))
+    if rate <= 0:
+        return None
+    max_rate = float(os.environ.get("BOE_RATE_LIMIT_MAX", str(max(rate, 20.0))))
+    db_path = os.environ.get("BOE_RATE_LIMIT_DB")
+    if db_path:
+        return SqliteTokenBucket(db_path, rate=rate, max_rate=max_rate)
+    return TokenBucket(rate=rate, max_rate=max_rate)
@@ -0,0 +1,195 @@
+"""In-memory legal reference graph over the ``reference_edges`` table.
+
+Edges are written during ingestion by ``tasks.database`` from the
+``<anteriores>``/``<posteriores>`` links of each article. This module loads
+them into compressed sparse row (CSR) adjacency arrays, one for each
+direction, so that multi-hop traversals only slice numpy arrays instead of
+querying SQLite hop by hop.
+"""
+
+from collections import deque
+from prefect import task
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Relations that change the text or validity of their target
+MODIFYING_RELATIONS = (
+    "MODIFICA",
+    "AÑADE",
+    "DEROGA",
+    "SUPRIME",
+    "SUSTITUYE",
+    "DA NUEVA REDACCION",
+    "DA NUEVA REDACCIÓN",
+    "ANULA",
+    "PRORROGA",
+    "PRÓRROGA",
+    "SUSPENDE",
+)
+
+
+class ReferenceGraph:
+    """Directed graph of BOE dispositions stored as CSR arrays.
+
+    ``out`` adjacency follows ``source -> target`` (what an article
+    modifies); ``in`` adjacency follows ``target -> source`` (what modifies
+    an article).
+    """
+
+    def __init__(self, edges: list[tuple[str, str, str]]):
+        ids: dict[str, int] = {}
+        relations: dict[str, int] = {}
+        src = np.empty(len(edges), dtype=np.int32)
+        dst = np.empty(len(edges), dtype=np.int32)
+        rel = np.empty(len(edges), dtype=np.int16)
+        for i, (source, target, relation) in enumerate(edges):
+            src[i] = ids.setdefault(source, len(ids))
+            dst[i] = ids.setdefault(target, len(ids))
+            rel[i] = relations.setdefault(relation, len(relations))
+        self.nodes = list(ids)
+        self.index = ids
+        self.relations = list(relations)
+        self._relation_index = relations
+        self.edge_count = len(edges)
+        self._out = self._csr(src, dst, rel, len(ids))
+        self._in = self._csr(dst, src, rel, len(ids))
+
+    @staticmethod
+    def _csr(keys: np.ndarray, values: np.ndarray, rel: np.ndarray, n: int):
+        order = np.argsort(keys, kind="stable")
+        ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+        return ptr, values[order], rel[order]
+
+    @classmethod
+    def load(cls, db_path: str = "data/boe.db") -> "ReferenceGraph":
+        """Build the graph from every distinct edge in ``reference_edges``."""
+        conn = sqlite3.connect(db_path)
+        edges = conn.execute(
+            "SELECT DISTINCT source, target, relation FROM reference_edges"
+        ).fetchall()
+        conn.close()
+        return cls(edges)
+
+    def _relation_codes(self, relations) -> np.ndarray | None:
+        if relations is None:
+            return None
+        return np.array(
+            [self._relation_index[r] for r in relations if r in self._relation_index],
+            dtype=np.int16,
+        )
+
+    def neighbors(
+        self, boe_id: str, direction: str = "in", relations=None
+    ) -> list[tuple[str, str]]:
+        """Return ``(id, relation)`` pairs one hop away from ``boe_id``."""
+        return [
+            (boe_id_, relation)
+            for boe_id_, _, relation, _ in self.traverse(boe_id, direction, relations, 1)
+        ]
+
+    def traverse(
+        self,
+        boe_id: str,
+        direction: str = "in",
+        relations=None,
+        max_depth: int = 1,
+    ) -> list[tuple[str, int, str, str]]:
+        """Breadth-first walk from ``boe_id``.
+
+        Returns ``(id, depth, relation, via)`` for every reachable node up to
+        ``max_depth`` hops, where ``via`` is the node it was reached from.
+        ``direction`` is ``"in"`` (who points at it, e.g. its modifiers) or
+        ``"out"`` (what it points at); ``relations`` restricts the followed
+        edges.
+        """
+        if direction not in ("in", "out"):
+            raise ValueError("direction must be 'in' or 'out'")
+        start = self.index.get(boe_id)
+        if start is None:
+            return []
+        ptr, adjacent, rel = self._in if direction == "in" else self._out
+        allowed = self._relation_codes(relations)
+        seen = {start}
+        found = []
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            lo, hi = ptr[node], ptr[node + 1]
+            targets, codes = adjacent[lo:hi], rel[lo:hi]
+            if allowed is not None:
+                mask = np.isin(codes, allowed)
+                targets, codes = targets[mask], codes[mask]
+            for target, code in zip(targets.tolist(), codes.tolist()):
+                if target in seen:
+                    continue
+                seen.add(target)
+                found.append(
+                    (self.nodes[target], depth + 1, self.relations[code], self.nodes[node])
+                )
+                queue.append((target, depth + 1))
+        return found
+
+
+class _CachedGraph:
+    """Graph for one database plus what is needed to notice edge changes.
+
+    ``PRAGMA data_version`` on a long-lived connection changes whenever
+    another connection commits, so an unchanged database costs one pragma per
+    lookup. Only after a commit is the O(n) edge fingerprint recomputed.
+    """
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.data_version = None
+        self.fingerprint = None
+        self.graph: ReferenceGraph | None = None
+
+
+_graphs: dict[str, _CachedGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_reference_graph(db_path: str = "data/boe.db") -> ReferenceGraph:
+    """Return a cached graph for ``db_path``, rebuilt only after edges change."""
+    with _graphs_lock:
+        cached = _graphs.get(db_path)
+        if cached is None:
+            cached = _graphs[db_path] = _CachedGraph(db_path)
+        data_version = cached.conn.execute("PRAGMA data_version").fetchone()[0]
+        if cached.graph is not None and data_version == cached.data_version:
+            return cached.graph
+        fingerprint = cached.conn.execute(
+            "SELECT count(*), max(edge_id) FROM reference_edges"
+        ).fetchone()
+        if cached.graph is None or fingerprint != cached.fingerprint:
+            cached.graph = ReferenceGraph.load(db_path)
+            cached.fingerprint = fingerprint
+            logger.info(
+                "get_reference_graph -> %s nodes, %s edges",
+                len(cached.graph.nodes),
+                cached.graph.edge_count,
+            )
+        cached.data_version = data_version
+        return cached.graph
+
+
+@task
+def modified_by(
+    boe_id: str, max_depth: int = 1, db_path: str = "data/boe.db"
+) -> list[tuple[str, int, str, str]]:
+    """Return the dispositions modifying ``boe_id``, following up to ``max_depth`` hops.
+
+    Each entry is ``(id, depth, relation, via)``, as in
+    :meth:`ReferenceGraph.traverse`.
+    """
+    graph = get_reference_graph(db_path)
+    relations = [r for r in graph.relations if r.startswith(MODIFYING_RELATIONS)]
+    return graph.traverse(boe_id, "in", relations, max_depth)
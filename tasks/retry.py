@@ -0,0 +1,168 @@
+"""Retry budget and hedged requests for BOE downloads.
+
+Retries are made in one place: the urllib3 ``Retry`` of the shared session
+(``BOE_HTTP_RETRIES`` attempts after the first, default 3). The fetch tasks
+no longer add Prefect retries on top, and task-level retries of
+``ingest_article_batch`` are only granted while the budget allows them.
+
+:class:`RetryBudget` caps retries per run: it starts with
+``BOE_RETRY_BUDGET`` tokens (default 20), every successful response
+deposits ``BOE_RETRY_BUDGET_RATIO`` of a token (default 0.1), and every
+retry or hedge withdraws one. A failing endpoint therefore drains the
+budget and further failures surface at once instead of each waiting
+through its own backoff.
+
+:class:`Hedger` (enabled with ``BOE_HEDGE=1``) sends a second copy of a
+GET that has been outstanding longer than the recent p95 latency for its
+host and returns whichever response arrives first.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import os
+import threading
+import time
+import logging
+
+from tasks.metrics import METRICS, _quantile
+
+logger = logging.getLogger(__name__)
+
+HTTP_RETRIES = int(os.environ.get("BOE_HTTP_RETRIES", 3))
+HEDGE_ENABLED = os.environ.get("BOE_HEDGE", "0").lower() in ("1", "true", "yes")
+
+
+class RetryBudget:
+    """Thread-safe token budget shared by every retry and hedge of a run."""
+
+    def __init__(self, initial: float = 20.0, ratio: float = 0.1, cap: float | None = None):
+        self.initial = initial
+        self.ratio = ratio
+        self.cap = cap if cap is not None else max(initial, 100.0)
+        self._lock = threading.Lock()
+        self._tokens = initial
+
+    @classmethod
+    def from_env(cls) -> "RetryBudget":
+        return cls(
+            initial=float(os.environ.get("BOE_RETRY_BUDGET", 20)),
+            ratio=float(os.environ.get("BOE_RETRY_BUDGET_RATIO", 0.1)),
+        )
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            return self._tokens
+
+    def reset(self) -> None:
+        """Start a new run with the initial allowance."""
+        with self._lock:
+            self._tokens = self.initial
+
+    def deposit(self) -> None:
+        """Credit a successful request."""
+        with self._lock:
+            self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def withdraw(self, kind: str = "retry") -> bool:
+        """Take one token for a retry or hedge; ``False`` when exhausted."""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+        METRICS.inc("boe_retry_budget_denied_total", kind=kind)
+        logger.warning("RetryBudget -> %s denied, budget exhausted", kind)
+        return False
+
+
+class Hedger:
+    """Issue a backup request when the first one is slower than usual.
+
+    The hedge delay is the p95 of the last ``window`` latencies seen for
+    the host, and no hedging happens until ``min_samples`` are known.
+    Hedges draw from ``budget``. The losing request is left to finish in the
+    background and its response is discarded.
+    """
+
+    def __init__(
+        self,
+        session,
+        budget: RetryBudget | None = None,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 500,
+        min_delay: float = 0.01,
+        max_workers: int = 16,
+    ):
+        self.session = session
+        self.budget = budget
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._window = window
+        self._latencies: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def _record(self, host: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(host, deque(maxlen=self._window)).append(seconds)
+
+    def hedge_delay(self, host: str) -> float | None:
+        """Seconds to wait before hedging, or ``None`` while warming up."""
+        with self._lock:
+            samples = list(self._latencies.get(host, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, _quantile(samples, self.quantile))
+
+    def _timed_get(self, host: str, url: str, kwargs: dict):
+        started = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        # Losing copies are recorded too, so slow responses still count
+        self._record(host, time.perf_counter() - started)
+        return response
+
+    def get(self, url: str, **kwargs):
+        host = urlsplit(url).hostname or ""
+        started = time.perf_counter()
+        primary = self._executor.submit(self._timed_get, host, url, kwargs)
+        delay = self.hedge_delay(host)
+        futures = [primary]
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and (self.budget is None or self.budget.withdraw("hedge")):
+                METRICS.inc("boe_http_hedges_total", host=host)
+                futures.append(self._executor.submit(self._timed_get, host, url, kwargs))
+        # Take the first success; fall back to the other copy if one fails
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as exc:
+                    error = exc
+                    continue
+                hedged = len(futures) > 1
+                if hedged:
+                    winner = "primary" if future is primary else "backup"
+                    METRICS.inc("boe_http_hedge_wins_total", host=host, winner=winner)
+                METRICS.observe(
+                    "boe_fetch_seconds",
+                    time.perf_counter() - started,
+                    hedged="yes" if hedged else "no",
+                )
+                for other in pending:
+                    other.add_done_callback(_discard)
+                return response
+        raise error
+
+
+def _discard(future) -> None:
+    try:
+        future.result().close()
+    except Exception:
+        pass
@@ -0,0 +1,96 @@
+from prefect import task
+from pathlib import Path
+import json
+import logging
+
+from tasks.encoding import EMBEDDING_BACKEND, load_encoder
+from tasks.indexing import EMBEDDING_MODEL
+from tasks.segments import SegmentStore, default_segments_path
+from tasks.snapshots import Snapshot, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def load_search_index(
+    index_path: str = "data/index.faiss",
+    meta_path: str = "data/index_meta.jsonl",
+    snapshot_dir: str | None = None,
+) -> Snapshot:
+    """Load the current snapshot of ``snapshot_dir``, or the legacy index files."""
+    import faiss
+
+    if snapshot_dir:
+        snapshot = load_snapshot(snapshot_dir)
+        if snapshot is None:
+            raise FileNotFoundError(f"No index snapshot published in {snapshot_dir}")
+        return snapshot
+    index = faiss.read_index(index_path)
+    with Path(meta_path).open(encoding="utf-8") as f:
+        metas = [json.loads(line) for line in f]
+    return Snapshot(None, index, metas)
+
+
+def search_depth(k: int, ntotal: int, collapse: bool) -> int:
+    """Number of neighbours to fetch for ``k`` hits."""
+    # Collapsing may drop hits, so look a little further than k
+    return min(ntotal, 2 * k if collapse else k)
+
+
+def rank_hits(
+    distances, rows, metas: list[dict], k: int, db_path: str | None = None, lsh=None
+) -> list[dict]:
+    """Turn one row of a FAISS ``search`` result into at most ``k`` hits.
+
+    With ``db_path`` (or an open article ``lsh``) near-duplicate articles are
+    collapsed into the best ranked one.
+    """
+    hits = [
+        {**metas[row], "distance": float(distance)}
+        for distance, row in zip(distances, rows)
+        if row >= 0
+    ]
+    if lsh is not None or (db_path and Path(db_path).exists()):
+        from tasks.dedup import collapse_near_duplicates
+
+        hits = collapse_near_duplicates(hits, db_path, lsh=lsh)
+    return hits[:k]
+
+
+@task
+def search_index(
+    query: str,
+    k: int = 10,
+    index_path: str = "data/index.faiss",
+    meta_path: str = "data/index_meta.jsonl",
+    db_path: str | None = "data/boe.db",
+    backend: str | None = None,
+    snapshot_dir: str | None = None,
+    context: int | None = 0,
+    segments_path: str | None = None,
+) -> list[dict]:
+    """Return the ``k`` indexed segments closest to ``query``.
+
+    Each hit is its metadata row (``id``, ``title``, ``seq``) plus the L2
+    ``distance``, nearest first. With ``db_path`` hits whose article is a
+    near-duplicate of a better ranked one are collapsed into it (see
+    :func:`tasks.dedup.collapse_near_duplicates`); ``None`` keeps them all.
+    With ``snapshot_dir`` the current published snapshot is searched
+    instead of ``index_path``.
+
+    Hits get their passage ``text`` from the segment store written at index
+    time and, with ``context`` > 0, that many neighbouring passages on each
+    side under ``"context"``. ``context=None`` skips the lookup.
+    """
+    import numpy as np
+
+    version, index, metas = load_search_index(index_path, meta_path, snapshot_dir)
+    model = load_encoder(EMBEDDING_MODEL, backend or EMBEDDING_BACKEND)
+    vector = np.array(model.encode([query]), dtype="float32")
+    distances, rows = index.search(vector, search_depth(k, index.ntotal, bool(db_path)))
+    hits = rank_hits(distances[0], rows[0], metas, k, db_path)
+    segments_path = segments_path or default_segments_path(index_path, snapshot_dir, version)
+    if context is not None and Path(segments_path).exists():
+        with SegmentStore(segments_path) as store:
+            hits = store.attach(hits, context)
+    logger.info("search_index -> %s hits for %r", len(hits), query)
+    return hits
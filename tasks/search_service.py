@@ -0,0 +1,344 @@
+"""Local HTTP search service with dynamic micro-batching.
+
+Encoding one query and searching one vector at a time leaves most of the
+work per call in fixed overhead (tokenizer and model dispatch, FAISS
+setup). :class:`MicroBatcher` queues concurrent requests and hands them to
+a single worker thread in batches: a batch closes when it holds
+``max_batch_size`` requests or ``max_wait_ms`` after its first request,
+whichever comes first. :class:`SearchService` then runs one ``encode`` and
+one FAISS ``search`` per batch.
+
+Endpoints of :class:`SearchHTTPServer`::
+
+    GET  /search?q=...&k=10&context=1
+    POST /search {"query": "...", "k": 10, "context": 1}
+    GET  /health
+    GET  /stats
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+import json
+import queue
+import threading
+import time
+import logging
+
+import numpy as np
+
+from tasks.metrics import METRICS, _quantile
+from tasks.search import load_search_index, rank_hits, search_depth
+from tasks.segments import SegmentStore, default_segments_path
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class MicroBatcher:
+    """Group items submitted from many threads into batches for ``handler``.
+
+    ``handler`` receives a list of items and must return one result per
+    item, in order. An exception fails every request of its batch.
+    ``teardown`` runs in the worker thread when the batcher is closed.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list], list],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        teardown: Callable[[], None] | None = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.handler = handler
+        self.teardown = teardown
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    # Past the deadline, only take requests already waiting
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _CLOSE:
+                self._queue.put(_CLOSE)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _CLOSE:
+                if self.teardown is not None:
+                    self.teardown()
+                return
+            batch = self._collect(first)
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def close(self) -> None:
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+
+class SearchService:
+    """Answer ``(query, k, context)`` requests in micro-batches over one index.
+
+    The index comes from ``snapshot_dir`` (hot-reloaded with
+    :class:`tasks.snapshots.SnapshotReader`) or from ``index_path`` and
+    ``meta_path``. With ``db_path`` near-duplicate articles are collapsed.
+    Hits carry their passage text from the segment store of the snapshot
+    version that answered (or next to the index, or ``segments_path``),
+    plus ``context`` neighbouring passages per side.
+    """
+
+    def __init__(
+        self,
+        model,
+        index_path: str = "data/index.faiss",
+        meta_path: str = "data/index_meta.jsonl",
+        snapshot_dir: str | None = None,
+        db_path: str | None = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        poll_seconds: float = 5.0,
+        segments_path: str | None = None,
+    ):
+        self.model = model
+        self.index_path = index_path
+        self.snapshot_dir = snapshot_dir
+        self.segments_path = segments_path
+        # Collapsing needs the article LSH tables of an existing database
+        self.db_path = db_path if db_path and Path(db_path).exists() else None
+        self._reader = None
+        if snapshot_dir:
+            from tasks.snapshots import SnapshotReader
+
+            self._reader = SnapshotReader(snapshot_dir, poll_seconds).start()
+            if self._reader.snapshot is None:
+                raise FileNotFoundError(f"No index snapshot published in {snapshot_dir}")
+        else:
+            self._snapshot = load_search_index(index_path, meta_path)
+        self._lsh = None
+        self._segments = None
+        self._segments_version = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self._latencies: deque = deque(maxlen=10000)
+        self.batcher = MicroBatcher(
+            self._search_batch, max_batch_size, max_wait_ms, teardown=self._close_stores
+        )
+
+    @property
+    def snapshot(self):
+        return self._reader.snapshot if self._reader else self._snapshot
+
+    def _segment_store(self, version: str | None) -> SegmentStore | None:
+        """The segment store of snapshot ``version``, reopened when it changes."""
+        if self._segments is not None and self._segments_version == version:
+            return self._segments
+        if self._segments is not None:
+            self._segments.close()
+            self._segments = None
+        path = self.segments_path or default_segments_path(
+            self.index_path, self.snapshot_dir, version
+        )
+        if Path(path).exists():
+            self._segments = SegmentStore(path)
+        self._segments_version = version
+        return self._segments
+
+    def _search_batch(self, requests: list[tuple[str, int, int]]) -> list[list[dict]]:
+        version, index, metas = self.snapshot
+        queries = [query for query, _, _ in requests]
+        with METRICS.timer("boe_search_batch_seconds", stage="encode"):
+            vectors = np.asarray(
+                self.model.encode(queries, batch_size=len(queries)), dtype="float32"
+            )
+        depth = search_depth(max(k for _, k, _ in requests), index.ntotal, bool(self.db_path))
+        with METRICS.timer("boe_search_batch_seconds", stage="search"):
+            distances, rows = index.search(vectors, depth)
+        # Opened in the batcher thread, the only one that uses them
+        if self.db_path and self._lsh is None:
+            from tasks.dedup import LSHIndex
+
+            self._lsh = LSHIndex(self.db_path, "article", readonly=True)
+        segments = self._segment_store(version)
+        METRICS.inc("boe_search_batches_total")
+        METRICS.inc("boe_search_queries_total", len(requests))
+        with self._lock:
+            self.batches += 1
+        results = []
+        for i, (_, k, context) in enumerate(requests):
+            hits = rank_hits(distances[i], rows[i], metas, k, lsh=self._lsh)
+            if segments is not None:
+                hits = segments.attach(hits, context)
+            results.append(hits)
+        return results
+
+    def search(
+        self, query: str, k: int = 10, context: int = 0, timeout: float | None = None
+    ) -> list[dict]:
+        started = time.perf_counter()
+        hits = self.batcher.submit((query, k, context)).result(timeout)
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.perf_counter() - started)
+        return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            requests, batches = self.requests, self.batches
+        return {
+            "version": self.snapshot.version,
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            **{
+                f"p{q}_ms": _quantile(latencies, q / 100) * 1000 if latencies else None
+                for q in (50, 99)
+            },
+        }
+
+    def _close_stores(self) -> None:
+        for store in (self._lsh, self._segments):
+            if store is not None:
+                store.close()
+        self._lsh = self._segments = None
+
+    def close(self) -> None:
+        self.batcher.close()
+        if self._reader is not None:
+            self._reader.stop()
+
+    def __enter__(self) -> "SearchService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "SearchHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("search_service -> " + format, *args)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/health":
+            version = self.server.service.snapshot.version
+            return self._send(200, {"status": "ok", "version": version})
+        if parts.path == "/stats":
+            return self._send(200, self.server.service.stats())
+        if parts.path == "/search":
+            params = parse_qs(parts.query)
+            return self._search(
+                params.get("q", [""])[0],
+                params.get("k", ["10"])[0],
+                params.get("context", ["0"])[0],
+            )
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/search":
+            return self._send(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON body"})
+        self._search(body.get("query", ""), body.get("k", 10), body.get("context", 0))
+
+    def _search(self, query: str, k, context) -> None:
+        try:
+            k, context = int(k), int(context)
+        except (TypeError, ValueError):
+            return self._send(400, {"error": "k and context must be integers"})
+        if not query or not 1 <= k <= self.server.max_k or not 0 <= context <= 10:
+            return self._send(
+                400, {"error": f"need a query, 1 <= k <= {self.server.max_k}, 0 <= context <= 10"}
+            )
+        try:
+            hits = self.server.service.search(query, k, context)
+        except Exception as exc:
+            logger.exception("search_service -> search for %r failed", query)
+            return self._send(500, {"error": str(exc)})
+        self._send(200, {"query": query, "hits": hits})
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SearchHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP front end; every request thread blocks on the batcher."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        service: SearchService,
+        address: tuple[str, int] = ("127.0.0.1", 8090),
+        max_k: int = 100,
+    ):
+        super().__init__(address, _Handler)
+        self.service = service
+        self.max_k = max_k
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SearchHTTPServer":
+        """Serve in a background thread and return ``self``."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,115 @@
+"""SQLite store of indexed segment texts.
+
+``create_or_update_index`` writes every paragraph of every indexed article
+here as ``(id, seq, text)``, where ``seq`` is the position that index
+metadata rows carry. The primary key clusters an article's segments in
+order (``WITHOUT ROWID``), so a hit and its neighbouring passages come
+back from one range scan instead of reloading and re-splitting the whole
+article text. Segments skipped as near-duplicates are stored too, since
+they can still be another hit's context.
+
+With index snapshots every version carries its own ``segments.db``: an
+indexing run copies the current version's store into the staging
+directory and updates the copy, so a reader of an older version keeps the
+passages its vectors were computed from.
+"""
+
+from pathlib import Path
+from typing import Iterable
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_FILE = "segments.db"
+
+
+def default_segments_path(
+    index_path: str, snapshot_dir: str | None = None, version: str | None = None
+) -> str:
+    """Segment store of snapshot ``version``, or the one next to the index.
+
+    Snapshots published before stores were versioned use the shared store
+    in the snapshot root.
+    """
+    if snapshot_dir and version:
+        path = Path(snapshot_dir) / version / SEGMENTS_FILE
+        if path.exists():
+            return str(path)
+    root = Path(snapshot_dir) if snapshot_dir else Path(index_path).parent
+    return str(root / SEGMENTS_FILE)
+
+
+class SegmentStore:
+    """Map ``(article id, seq)`` to segment text.
+
+    Writes are committed by :meth:`commit` or on :meth:`close`.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (id, seq)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "SegmentStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def put(self, boe_id: str, segments: list[str]) -> int:
+        """Replace the stored segments of ``boe_id``; returns how many rows
+        were added, changed or deleted."""
+        before = self.conn.total_changes
+        self.conn.execute(
+            "DELETE FROM segments WHERE id = ? AND seq >= ?", (boe_id, len(segments))
+        )
+        self.conn.executemany(
+            "INSERT INTO segments (id, seq, text) VALUES (?, ?, ?) "
+            "ON CONFLICT (id, seq) DO UPDATE SET text = excluded.text "
+            "WHERE text != excluded.text",
+            [(boe_id, seq, text) for seq, text in enumerate(segments)],
+        )
+        return self.conn.total_changes - before
+
+    def passage(self, boe_id: str, seq: int, context: int = 0) -> list[tuple[int, str]]:
+        """Return ``(seq, text)`` of segment ``seq`` and up to ``context``
+        segments on each side, in order."""
+        return self.conn.execute(
+            "SELECT seq, text FROM segments WHERE id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+            (boe_id, seq - context, seq + context),
+        ).fetchall()
+
+    def attach(self, hits: Iterable[dict], context: int = 0) -> list[dict]:
+        """Add ``text`` to each hit with ``id`` and ``seq`` and, with
+        ``context``, the surrounding segments under ``"context"``."""
+        out = []
+        for hit in hits:
+            hit = dict(hit)
+            if hit.get("seq") is not None:
+                rows = self.passage(hit["id"], hit["seq"], context)
+                for seq, text in rows:
+                    if seq == hit["seq"]:
+                        hit["text"] = text
+                if context:
+                    hit["context"] = [{"seq": seq, "text": text} for seq, text in rows]
+            out.append(hit)
+        return out
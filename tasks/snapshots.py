@@ -0,0 +1,198 @@
+"""Versioned, immutable FAISS index snapshots.
+
+Layout of a snapshot root::
+
+    v000001/        index.faiss, index_meta.jsonl, manifest.json
+    v000002/
+    CURRENT         name of the published version, e.g. ``v000002``
+
+A writer fills a staging directory (:func:`stage_snapshot`) and
+:func:`publish_snapshot` renames it to the next version and then replaces
+``CURRENT`` with ``os.replace``. Readers resolve ``CURRENT`` and load the
+pair from one version directory, so they never see a half-written index or
+an index with the metadata of another version. Published versions are
+never modified; only the oldest ones beyond ``keep`` are deleted.
+
+:class:`SnapshotReader` keeps the loaded snapshot in memory and swaps in a
+newer one from a background thread, so queries keep running on the old
+version while the new one loads.
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+META_FILE = "index_meta.jsonl"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+KEEP_SNAPSHOTS = int(os.environ.get("BOE_INDEX_SNAPSHOTS_KEEP", 3))
+
+_STAGING_PREFIX = ".staging-"
+
+
+class Snapshot(NamedTuple):
+    version: str
+    index: object
+    metas: list[dict]
+
+
+def _versions(root: Path) -> list[str]:
+    if not root.exists():
+        return []
+    return sorted(
+        p.name for p in root.iterdir() if p.is_dir() and p.name[:1] == "v" and p.name[1:].isdigit()
+    )
+
+
+def current_version(root: str) -> str | None:
+    """Return the published version name, or ``None`` before the first one."""
+    try:
+        return (Path(root) / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_snapshot_dir(root: str) -> Path | None:
+    version = current_version(root)
+    return Path(root) / version if version else None
+
+
+def stage_snapshot(root: str) -> Path:
+    """Create and return an empty staging directory under ``root``."""
+    staging = Path(root) / f"{_STAGING_PREFIX}{uuid.uuid4().hex}"
+    staging.mkdir(parents=True)
+    return staging
+
+
+def publish_snapshot(root: str, staging: Path, keep: int = KEEP_SNAPSHOTS) -> str:
+    """Publish ``staging`` as the next version and return its name.
+
+    ``staging`` must hold ``index.faiss`` and ``index_meta.jsonl``. Versions
+    older than the newest ``keep`` are removed afterwards.
+    """
+    root_path = Path(root)
+    for name in (INDEX_FILE, META_FILE):
+        if not (staging / name).exists():
+            raise FileNotFoundError(f"Snapshot staging directory lacks {name}")
+    versions = _versions(root_path)
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1:06d}"
+    manifest = {"version": version, "created": time.time()}
+    (staging / MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+    # Fails instead of merging if a concurrent writer took the same version
+    staging.rename(root_path / version)
+    tmp = root_path / f"{CURRENT_FILE}.tmp"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, root_path / CURRENT_FILE)
+    logger.info("publish_snapshot -> %s is now current in %s", version, root)
+    prune_snapshots(root, keep)
+    return version
+
+
+def prune_snapshots(root: str, keep: int = KEEP_SNAPSHOTS) -> list[str]:
+    """Delete all but the newest ``keep`` versions (never the current one)
+    and leftover staging directories; return the removed version names."""
+    root_path = Path(root)
+    current = current_version(root)
+    removed = []
+    for version in _versions(root_path)[: -max(keep, 1)]:
+        if version != current:
+            shutil.rmtree(root_path / version, ignore_errors=True)
+            removed.append(version)
+    for staging in root_path.glob(f"{_STAGING_PREFIX}*"):
+        # Only abandoned ones: a writer may still be filling a recent one
+        if time.time() - staging.stat().st_mtime > 3600:
+            shutil.rmtree(staging, ignore_errors=True)
+    if removed:
+        logger.info("prune_snapshots -> removed %s", ", ".join(removed))
+    return removed
+
+
+def load_snapshot(root: str, retries: int = 3) -> Snapshot | None:
+    """Load the current version, or return ``None`` if nothing is published.
+
+    If the version is pruned between reading ``CURRENT`` and opening its
+    files, ``CURRENT`` is read again.
+    """
+    import faiss
+
+    for attempt in range(retries):
+        version = current_version(root)
+        if version is None:
+            return None
+        directory = Path(root) / version
+        try:
+            index = faiss.read_index(str(directory / INDEX_FILE))
+            with (directory / META_FILE).open(encoding="utf-8") as f:
+                metas = [json.loads(line) for line in f if line.strip()]
+        except (FileNotFoundError, RuntimeError):
+            if attempt == retries - 1:
+                raise
+            continue
+        return Snapshot(version, index, metas)
+
+
+class SnapshotReader:
+    """Serve the latest published snapshot of ``root`` and hot-reload it.
+
+    :attr:`snapshot` is replaced as a whole, so a caller that takes one
+    reference keeps a consistent index/metadata pair for its query. Call
+    :meth:`start` to poll ``CURRENT`` every ``poll_seconds`` in a daemon
+    thread, or :meth:`refresh` to check on demand.
+    """
+
+    def __init__(self, root: str, poll_seconds: float = 5.0):
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self.snapshot: Snapshot | None = load_snapshot(root)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def version(self) -> str | None:
+        return self.snapshot.version if self.snapshot else None
+
+    def refresh(self) -> bool:
+        """Load the published version if it changed; return whether it did."""
+        if current_version(self.root) == self.version:
+            return False
+        snapshot = load_snapshot(self.root)
+        if snapshot is None or snapshot.version == self.version:
+            return False
+        self.snapshot = snapshot
+        logger.info("SnapshotReader -> switched to %s", snapshot.version)
+        return True
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the loaded version; try again on the next tick
+                logger.exception("SnapshotReader -> reload of %s failed", self.root)
+
+    def start(self) -> "SnapshotReader":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="snapshot-reader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SnapshotReader":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,10 +1,19 @@
+import atexit
+import gzip
 import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 from prefect import task
 from pathlib import Path
+from typing import Iterable, Iterator
 import logging
 
 logger = logging.getLogger(__name__)
 
+_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst", "none": ".jsonl"}
+
 
 @task
 def storage_text(text: str, filename: str):
@@ -23,3 +32,249 @@ def append_metadata(record: dict, file_path: str = "data/boe_metadata.jsonl"):
         f.write(json.dumps(record, ensure_ascii=False) + "\n")
     logger.info("Ruta de archivo utilizada: %s", path)
     logger.info("Registro de metadata guardado correctamente.")
+
+
+def _compressor(compression: str):
+    if compression == "gzip":
+        return lambda data: gzip.compress(data, compresslevel=6), gzip.decompress
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError("zstd compression requires the 'zstandard' package") from exc
+        return (
+            zstandard.ZstdCompressor(level=3).compress,
+            lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+        )
+    if compression == "none":
+        return (lambda data: data), (lambda data: data)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+_INDEX_FILE = "metadata_index.db"
+
+
+def _open_index(directory: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(directory / _INDEX_FILE, timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metadata_blocks (
+            file TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            PRIMARY KEY (file, offset)
+        ) WITHOUT ROWID
+        """
+    )
+    # Latest block and line per (id, day): one primary-key lookup per read
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metadata_records (
+            id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            file TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            PRIMARY KEY (id, day)
+        ) WITHOUT ROWID
+        """
+    )
+    return conn
+
+
+class MetadataWriter:
+    """Buffered JSONL writer with daily rotation and an offset index.
+
+    Records are kept in memory and flushed when ``max_records`` or
+    ``max_bytes`` is reached, or at the latest ``flush_interval`` seconds
+    after the last flush (checked on every write and by a background thread
+    while records are buffered). Each flush appends one independently
+    compressed block per day to ``boe_metadata-YYYY-MM-DD.jsonl.gz`` (day
+    taken from the record's ``date`` field) and records each id's block and
+    line in ``metadata_index.db``, so :func:`read_metadata_record` finds a
+    record with one index lookup and decompresses a single block.
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/metadata",
+        compression: str = "gzip",
+        max_records: int = 1000,
+        max_bytes: int = 1 << 20,
+        flush_interval: float = 5.0,
+        clock=time.time,
+    ):
+        self.directory = Path(directory)
+        self.compression = compression
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._compress, _ = _compressor(compression)
+        self._buffer: list[tuple[str, str, bytes]] = []
+        self._buffered_bytes = 0
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: threading.Thread | None = None
+
+    def write(self, record: dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        day = str(record.get("date") or "")[:10] or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        with self._lock:
+            self._buffer.append((day, str(record.get("id", "")), line))
+            self._buffered_bytes += len(line)
+            due = (
+                len(self._buffer) >= self.max_records
+                or self._buffered_bytes >= self.max_bytes
+                or self.clock() - self._last_flush >= self.flush_interval
+            )
+            if due:
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Thread(
+                    target=self._flush_periodically, name="metadata-flush", daemon=True
+                )
+                self._timer.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._buffer and self.clock() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def write_many(self, records: Iterable[dict]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = self.clock()
+        if not self._buffer:
+            return
+        by_day: dict[str, list[tuple[str, bytes]]] = {}
+        for day, boe_id, line in self._buffer:
+            by_day.setdefault(day, []).append((boe_id, line))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        blocks = []
+        for day, entries in by_day.items():
+            data_path = self.directory / f"boe_metadata-{day}{_SUFFIXES[self.compression]}"
+            block = self._compress(b"".join(line for _, line in entries))
+            with data_path.open("ab") as f:
+                offset = f.tell()
+                f.write(block)
+            blocks.append((data_path.name, offset, len(block), day, entries))
+        # The index is committed after the blocks so it never points past the data
+        conn = _open_index(self.directory)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metadata_blocks VALUES (?, ?, ?, ?)",
+                    [(name, offset, length, day) for name, offset, length, day, _ in blocks],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metadata_records VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (boe_id, day, name, offset, n)
+                        for name, offset, _, day, entries in blocks
+                        for n, (boe_id, _) in enumerate(entries)
+                    ],
+                )
+        finally:
+            conn.close()
+        logger.info("MetadataWriter -> %s registros escritos", len(self._buffer))
+        self._buffer.clear()
+        self._buffered_bytes = 0
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_writers: dict[tuple[str, str], MetadataWriter] = {}
+
+
+def get_metadata_writer(directory: str = "data/metadata", compression: str = "gzip") -> MetadataWriter:
+    """Return the process-wide writer for ``directory``, flushed at exit."""
+    key = (str(Path(directory).resolve()), compression)
+    writer = _writers.get(key)
+    if writer is None:
+        writer = _writers[key] = MetadataWriter(directory, compression)
+        atexit.register(writer.close)
+    return writer
+
+
+@task
+def append_metadata_buffered(
+    records: list[dict], directory: str = "data/metadata", compression: str = "gzip"
+) -> int:
+    """Queue metadata records on the shared buffered writer."""
+    get_metadata_writer(directory, compression).write_many(records)
+    return len(records)
+
+
+def _read_block(path: Path, offset: int, length: int) -> bytes:
+    compression = next(c for c, sfx in _SUFFIXES.items() if path.name.endswith(sfx))
+    _, decompress = _compressor(compression)
+    with path.open("rb") as f:
+        f.seek(offset)
+        return decompress(f.read(length))
+
+
+def read_metadata_record(
+    boe_id: str, directory: str = "data/metadata", date: str | None = None
+) -> dict | None:
+    """Return the latest stored record for ``boe_id`` using the offset index.
+
+    Without ``date`` the record of the most recent day wins.
+    """
+    root = Path(directory)
+    if not (root / _INDEX_FILE).exists():
+        return None
+    conn = _open_index(root)
+    try:
+        sql = "SELECT file, offset, line FROM metadata_records WHERE id = ?"
+        params: tuple = (boe_id,)
+        if date:
+            sql += " AND day = ?"
+            params += (date[:10],)
+        found = conn.execute(sql + " ORDER BY day DESC LIMIT 1", params).fetchone()
+        if found is None:
+            return None
+        name, offset, line_no = found
+        (length,) = conn.execute(
+            "SELECT length FROM metadata_blocks WHERE file = ? AND offset = ?", (name, offset)
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(_read_block(root / name, offset, length).splitlines()[line_no])
+
+
+def iter_metadata_records(directory: str = "data/metadata") -> Iterator[dict]:
+    """Yield every stored record, day by day, one block at a time."""
+    root = Path(directory)
+    if not (root / _INDEX_FILE).exists():
+        return
+    conn = _open_index(root)
+    try:
+        blocks = conn.execute(
+            "SELECT file, offset, length FROM metadata_blocks ORDER BY day, file, offset"
+        ).fetchall()
+    finally:
+        conn.close()
+    for name, offset, length in blocks:
+        for raw in _read_block(root / name, offset, length).splitlines():
+            yield json.loads(raw)
@@ -0,0 +1,278 @@
+"""Durable work queue in SQLite shared by ingestion workers.
+
+Several Prefect workers (or hosts sharing the database file) pull work from
+the ``work_items`` table instead of each scraping whole days on its own.
+An item is a ``(kind, key)`` pair, e.g. ``("day", "2025-07-03")`` or
+``("article", "BOE-A-2025-13297")``. :meth:`WorkQueue.claim` leases a batch
+of items to one worker inside a ``BEGIN IMMEDIATE`` transaction, so no two
+workers ever hold the same item. A lease lasts ``lease_seconds`` and is
+extended by heartbeats while the worker is busy. A worker that dies stops
+heartbeating, and its items become claimable again once the lease
+expires. Items that fail ``max_attempts`` times are parked as ``failed``.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+from tasks.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = float(os.environ.get("BOE_QUEUE_LEASE_SECONDS", 300))
+MAX_ATTEMPTS = int(os.environ.get("BOE_QUEUE_MAX_ATTEMPTS", 5))
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+
+def worker_name() -> str:
+    """Identify this worker across hosts: ``host:pid:random``."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    """Lease-based work queue stored in ``db_path``.
+
+    One connection per thread; every state change is a short ``BEGIN
+    IMMEDIATE`` transaction. Only the worker that owns a lease can
+    heartbeat, complete or fail its items.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/boe.db",
+        lease_seconds: float = LEASE_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        clock=time.time,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._local = threading.local()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work_items (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                date TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated REAL,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID
+            """
+        )
+        # Serves claim: ready items of a kind, oldest day first
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_work_items_ready "
+            "ON work_items (kind, status, date, key)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            # WAL lets readers continue while a worker holds the write lock
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, kind: str, items: Iterable[tuple[str, str | None]]) -> int:
+        """Add ``(key, date)`` items; known keys keep their state.
+
+        Returns how many items were new.
+        """
+        now = self.clock()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_items (kind, key, date, updated) VALUES (?, ?, ?, ?)",
+                [(kind, key, date, now) for key, date in items],
+            )
+            added = conn.total_changes - before
+        METRICS.inc("boe_queue_enqueued_total", added, kind=kind)
+        return added
+
+    def claim(self, kind: str, worker: str, limit: int = 1) -> list[tuple[str, str | None]]:
+        """Lease up to ``limit`` ready items to ``worker``, oldest day first.
+
+        Ready means pending, or leased by someone whose lease has expired.
+        Expired leases that were already on their last attempt are parked as
+        ``failed`` instead. Returns ``(key, date)`` pairs.
+        """
+        now = self.clock()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.execute(
+                """
+                UPDATE work_items
+                SET status = 'failed', owner = NULL, lease_until = NULL, updated = ?,
+                    error = coalesce(error, 'lease expired on the last attempt')
+                WHERE kind = ? AND status = 'leased' AND lease_until < ? AND attempts >= ?
+                """,
+                (now, kind, now, self.max_attempts),
+            )
+            abandoned = conn.total_changes - before
+            rows = conn.execute(
+                """
+                SELECT key, date, status FROM work_items
+                WHERE kind = ? AND attempts < ?
+                  AND (status = 'pending' OR (status = 'leased' AND lease_until < ?))
+                ORDER BY date, key
+                LIMIT ?
+                """,
+                (kind, self.max_attempts, now, limit),
+            ).fetchall()
+            conn.executemany(
+                """
+                UPDATE work_items
+                SET status = 'leased', owner = ?, lease_until = ?,
+                    attempts = attempts + 1, updated = ?
+                WHERE kind = ? AND key = ?
+                """,
+                [(worker, now + self.lease_seconds, now, kind, key) for key, _, _ in rows],
+            )
+        if abandoned:
+            logger.warning("WorkQueue -> parked %s expired %s leases out of attempts", abandoned, kind)
+            METRICS.inc("boe_queue_failed_total", abandoned, kind=kind)
+        reclaimed = sum(status == LEASED for _, _, status in rows)
+        if reclaimed:
+            logger.warning("WorkQueue -> %s took over %s expired %s leases", worker, reclaimed, kind)
+            METRICS.inc("boe_queue_reclaimed_total", reclaimed, kind=kind)
+        METRICS.inc("boe_queue_claimed_total", len(rows), kind=kind)
+        return [(key, date) for key, date, _ in rows]
+
+    def _owned(self, conn, sql: str, kind: str, worker: str, keys: list[str], *values) -> int:
+        before = conn.total_changes
+        conn.executemany(
+            sql + " WHERE kind = ? AND key = ? AND owner = ? AND status = 'leased'",
+            [(*values, kind, key, worker) for key in keys],
+        )
+        return conn.total_changes - before
+
+    def heartbeat(self, kind: str, worker: str, keys: list[str]) -> int:
+        """Extend the leases ``worker`` still holds; returns how many."""
+        now = self.clock()
+        with self._transaction() as conn:
+            return self._owned(
+                conn,
+                "UPDATE work_items SET lease_until = ?, updated = ?",
+                kind,
+                worker,
+                keys,
+                now + self.lease_seconds,
+                now,
+            )
+
+    def complete(self, kind: str, worker: str, keys: list[str]) -> int:
+        """Mark items done. Leases lost to another worker are not touched."""
+        with self._transaction() as conn:
+            done = self._owned(
+                conn,
+                "UPDATE work_items SET status = 'done', owner = NULL, lease_until = NULL, "
+                "error = NULL, updated = ?",
+                kind,
+                worker,
+                keys,
+                self.clock(),
+            )
+        METRICS.inc("boe_queue_completed_total", done, kind=kind)
+        return done
+
+    def fail(self, kind: str, worker: str, keys: list[str], error: str = "") -> int:
+        """Return items to the queue, or park them once out of attempts."""
+        with self._transaction() as conn:
+            failed = self._owned(
+                conn,
+                "UPDATE work_items SET owner = NULL, lease_until = NULL, error = ?, "
+                "updated = ?, status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END",
+                kind,
+                worker,
+                keys,
+                error[:500],
+                self.clock(),
+                self.max_attempts,
+            )
+        METRICS.inc("boe_queue_failed_total", failed, kind=kind)
+        return failed
+
+    def counts(self, kind: str | None = None) -> dict[str, int]:
+        """Number of items per status."""
+        sql = "SELECT status, count(*) FROM work_items"
+        params: tuple = ()
+        if kind is not None:
+            sql += " WHERE kind = ?"
+            params = (kind,)
+        return dict(self._connect().execute(sql + " GROUP BY status", params).fetchall())
+
+    @contextmanager
+    def lease(
+        self,
+        kind: str,
+        worker: str,
+        limit: int = 1,
+        heartbeat_seconds: float | None = None,
+    ) -> Iterator[list[tuple[str, str | None]]]:
+        """Claim a batch and keep its leases alive while the block runs.
+
+        The items are completed when the block exits normally and failed
+        when it raises. Heartbeats run every ``heartbeat_seconds`` (a third
+        of the lease by default) on a background thread.
+        """
+        items = self.claim(kind, worker, limit)
+        keys = [key for key, _ in items]
+        stop = threading.Event()
+        beat = None
+        if keys:
+            interval = heartbeat_seconds or self.lease_seconds / 3
+
+            def _beat():
+                while not stop.wait(interval):
+                    if self.heartbeat(kind, worker, keys) < len(keys):
+                        logger.warning("WorkQueue -> %s lost %s leases", worker, kind)
+
+            beat = threading.Thread(target=_beat, name="queue-heartbeat", daemon=True)
+            beat.start()
+        try:
+            yield items
+        except BaseException as exc:
+            stop.set()
+            if keys:
+                self.fail(kind, worker, keys, f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            stop.set()
+            if beat is not None:
+                beat.join()
+        if keys:
+            self.complete(kind, worker, keys)
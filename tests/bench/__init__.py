@@ -0,0 +1 @@
+# This file enables Python to treat the 'bench' directory under 'tests' as a sub-package.
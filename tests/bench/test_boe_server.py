@@ -0,0 +1,54 @@
+import requests
+
+from bench.boe_server import BOEStandInServer, ServerConfig
+from tasks.boe import extract_article_ids, parse_article_xml
+
+
+def test_serves_sumario_and_articles():
+    with BOEStandInServer(config=ServerConfig(articles_per_day=7)) as server:
+        r = requests.get(f"{server.base_url}/datosabiertos/api/boe/sumario/20250703")
+        assert r.status_code == 200
+        assert "xml" in r.headers["Content-Type"]
+        ids = extract_article_ids.fn(r.text)
+        assert len(ids) == 7
+
+        r = requests.get(f"{server.base_url}/diario_boe/xml.php", params={"id": ids[0]})
+        assert r.status_code == 200
+        data = parse_article_xml.fn(r.text)
+        assert data["identificador"] == ids[0]
+        assert data["segments"]
+
+
+def test_sunday_sumario_not_found():
+    with BOEStandInServer() as server:
+        r = requests.get(f"{server.base_url}/datosabiertos/api/boe/sumario/20250706")
+        assert r.status_code == 404
+
+
+def test_throttling_sends_retry_after():
+    config = ServerConfig(throttle_rate=1.0, retry_after=7)
+    with BOEStandInServer(config=config) as server:
+        r = requests.get(f"{server.base_url}/datosabiertos/api/boe/sumario/20250703")
+        assert r.status_code == 429
+        assert r.headers["Retry-After"] == "7"
+        assert config.stats[429] == 1
+
+
+def test_serves_fixtures(tmp_path):
+    (tmp_path / "articles").mkdir()
+    (tmp_path / "articles" / "BOE-A-2025-00001.xml").write_text("<documento/>")
+    with BOEStandInServer(config=ServerConfig(fixtures_dir=str(tmp_path))) as server:
+        r = requests.get(
+            f"{server.base_url}/diario_boe/xml.php", params={"id": "BOE-A-2025-00001"}
+        )
+        assert r.text == "<documento/>"
+
+
+def test_gzip_when_accepted():
+    with BOEStandInServer() as server:
+        url = f"{server.base_url}/datosabiertos/api/boe/sumario/20250703"
+        r = requests.get(url, headers={"Accept-Encoding": "gzip"})
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.content.startswith(b"<?xml")
+        r = requests.get(url, headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in r.headers
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from flows import index_articles as index_module
+from flows.direct import direct_execution, run_flow
+from flows.index_articles import index_articles
+from tasks.ingest import ingest_article_batch
+
+
+def test_direct_execution_swaps_and_restores_tasks():
+    original = index_module.create_or_update_index
+
+    with direct_execution():
+        shim = index_module.create_or_update_index
+        assert shim is not original
+        assert shim.fn is original.fn
+
+    assert index_module.create_or_update_index is original
+
+
+def test_direct_submit_returns_future():
+    with patch.object(ingest_article_batch, "fn", return_value=3):
+        with direct_execution():
+            from tasks import ingest
+
+            future = ingest.ingest_article_batch.submit(["BOE-A-1"], "2024-01-01")
+            assert future.result() == 3
+
+
+@patch("flows.index_articles.init_db")
+@patch("flows.index_articles.fetch_all_articles", return_value=[])
+def test_run_flow_direct_calls_tasks_without_engine(mock_fetch, mock_init_db):
+    with patch.object(index_module.create_or_update_index, "fn") as mock_index:
+        run_flow(index_articles, "test.db", direct=True)
+
+    mock_index.assert_called_once_with(
+        [], workers=0, threads_per_worker=1, snapshot_dir=None
+    )
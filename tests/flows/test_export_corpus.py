@@ -0,0 +1,17 @@
+from unittest.mock import patch
+
+from flows.export_corpus import export_corpus
+
+
+@patch("flows.export_corpus.init_db")
+@patch("flows.export_corpus.export_corpus_to_parquet")
+def test_export_corpus_flow(mock_export, mock_init_db):
+    mock_export.return_value = ["2023-01-01"]
+
+    days = export_corpus.fn(db_path="test.db", out_dir="out")
+
+    mock_init_db.assert_called_once_with("test.db")
+    mock_export.assert_called_once_with(
+        "test.db", "out", include_embeddings=False, full=False, snapshot_dir=None
+    )
+    assert days == ["2023-01-01"]
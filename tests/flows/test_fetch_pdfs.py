@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from bench.boe_server import BOEStandInServer, ServerConfig, render_pdf
+from flows.direct import run_flow
+from flows.fetch_pdfs import fetch_pdfs
+from tasks.database import init_db, insert_metadata_records
+
+
+def test_fetch_pdfs_downloads_pending_and_repairs_damaged(tmp_path):
+    db_path = str(tmp_path / "boe.db")
+    root = str(tmp_path / "pdfs")
+    init_db.fn(db_path)
+    with BOEStandInServer(config=ServerConfig(pdf_kb=16)) as server:
+        ids = [f"BOE-A-2024-1200{i}" for i in range(3)]
+        insert_metadata_records.fn(
+            [
+                {"id": boe_id, "date": "2024-03-04",
+                 "url_pdf": f"{server.base_url}/boe/dias/2024/03/04/pdfs/{boe_id}.pdf"}
+                for boe_id in ids
+            ],
+            db_path,
+        )
+
+        first = run_flow(fetch_pdfs, db_path, root=root, max_workers=2, direct=True)
+        second = run_flow(fetch_pdfs, db_path, root=root, direct=True)
+        damaged = Path(root, "2024", "03", "04", f"{ids[0]}.pdf")
+        damaged.write_bytes(b"%PDF-broken")
+        repaired = run_flow(fetch_pdfs, db_path, root=root, verify=True, direct=True)
+
+    assert first == {"downloaded": 3, "present": 0, "failed": 0, "damaged": 0}
+    assert second == {"downloaded": 0, "present": 0, "failed": 0, "damaged": 0}
+    assert repaired == {"downloaded": 1, "present": 0, "failed": 0, "damaged": 1}
+    assert damaged.read_bytes() == render_pdf(ids[0], 16)
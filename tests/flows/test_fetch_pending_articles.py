@@ -0,0 +1,31 @@
+from unittest.mock import call, patch
+
+from flows.fetch_pending_articles import fetch_pending_articles
+
+
+@patch("flows.fetch_pending_articles.init_db")
+@patch("flows.fetch_pending_articles.ingest_article_batch")
+@patch("flows.fetch_pending_articles.pending_articles")
+def test_fetch_pending_articles_groups_by_date(
+    mock_pending_articles, mock_ingest_article_batch, mock_init_db
+):
+    mock_pending_articles.return_value = [
+        ("ID-1", "2023-01-01"),
+        ("ID-2", "2023-01-01"),
+        ("ID-3", "2023-01-01"),
+        ("ID-4", "2023-01-02"),
+    ]
+    mock_ingest_article_batch.side_effect = [2, 1, 1]
+
+    processed = fetch_pending_articles.fn(db_path="test.db", batch_size=2)
+
+    assert processed == 4
+    mock_init_db.assert_called_once_with("test.db")
+    mock_pending_articles.assert_called_once_with("test.db", None)
+    mock_ingest_article_batch.assert_has_calls(
+        [
+            call(["ID-1", "ID-2"], "2023-01-01", "test.db"),
+            call(["ID-3"], "2023-01-01", "test.db"),
+            call(["ID-4"], "2023-01-02", "test.db"),
+        ]
+    )
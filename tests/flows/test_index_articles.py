@@ -13,4 +13,6 @@ def test_index_articles_flow(mock_create_or_update_index, mock_fetch_all_article
 
     mock_init_db.assert_called_once_with("test.db")
     mock_fetch_all_articles.assert_called_once_with("test.db")
-    mock_create_or_update_index.assert_called_once_with(sample_records)
+    mock_create_or_update_index.assert_called_once_with(
+        sample_records, workers=0, threads_per_worker=1, snapshot_dir=None
+    )
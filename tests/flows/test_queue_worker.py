@@ -0,0 +1,74 @@
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from bench.boe_server import render_sumario
+from flows.direct import run_flow
+from flows.queue_worker import queue_worker
+from tasks.boe import SumarioNotFound
+from tasks.work_queue import WorkQueue
+
+
+def _sumario(year, month, day):
+    return render_sumario(date(int(year), int(month), int(day)), 5, "http://boe").encode()
+
+
+@patch("flows.queue_worker.ingest_article_batch", side_effect=lambda ids, d, db: len(ids))
+@patch("flows.queue_worker.fetch_index_xml.fn", side_effect=_sumario)
+def test_workers_split_the_queue_without_duplicates(mock_fetch, mock_ingest, tmp_path):
+    db_path = str(tmp_path / "boe.db")
+
+    first = run_flow(
+        queue_worker, db_path, start_date="2024-03-04", end_date="2024-03-05",
+        batch_size=3, max_batches=2, worker="w1", direct=True,
+    )
+    second = run_flow(
+        queue_worker, db_path, start_date="2024-03-04", end_date="2024-03-05",
+        batch_size=3, worker="w2", direct=True,
+    )
+
+    assert first == {"days": 2, "batches": 2, "articles": 6}
+    assert second == {"days": 0, "batches": 2, "articles": 4}
+    assert mock_fetch.call_count == 2
+    ingested = [boe_id for c in mock_ingest.call_args_list for boe_id in c.args[0]]
+    assert len(ingested) == len(set(ingested)) == 10
+    assert WorkQueue(db_path).counts() == {"done": 12}
+
+
+@patch("flows.queue_worker.fetch_index_xml.fn", side_effect=_sumario)
+def test_failing_batch_does_not_stop_the_worker(mock_fetch, tmp_path):
+    db_path = str(tmp_path / "boe.db")
+    calls = []
+
+    def ingest(ids, date_iso, db):
+        calls.append(ids)
+        if len(calls) == 1:
+            raise RuntimeError("boe.es down")
+        return len(ids)
+
+    with patch("flows.queue_worker.ingest_article_batch", side_effect=ingest):
+        result = run_flow(
+            queue_worker, db_path, start_date="2024-03-04", batch_size=2,
+            worker="w1", direct=True,
+        )
+
+    # The failed batch went back to the queue and was ingested on retry
+    assert result == {"days": 1, "batches": 4, "articles": 5}
+    assert WorkQueue(db_path).counts() == {"done": 6}
+
+
+@pytest.mark.parametrize("missing", [b"", SumarioNotFound("20240310")])
+@patch("flows.queue_worker.ingest_article_batch", side_effect=lambda ids, d, db: len(ids))
+def test_missing_sumario_is_retried_not_done(mock_ingest, missing, tmp_path):
+    db_path = str(tmp_path / "boe.db")
+    queue = WorkQueue(db_path, max_attempts=2)
+    queue.enqueue("day", [("2024-03-10", "2024-03-10")])
+    queue.close()
+
+    with patch("flows.queue_worker.fetch_index_xml.fn", side_effect=[missing, _sumario("2024", "03", "10")]):
+        result = run_flow(queue_worker, db_path, batch_size=5, direct=True)
+
+    # The first attempt failed the lease; the retry stored the day
+    assert result == {"days": 1, "batches": 1, "articles": 5}
+    assert WorkQueue(db_path).counts() == {"done": 6}
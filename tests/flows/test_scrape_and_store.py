@@ -21,9 +21,25 @@ def test_scrape_and_store_flow(mock_storage_text, mock_scrape_example_page):
     scrape_and_store.fn(url=test_url, filename=test_filename) # .fn to call the original function
 
     # Assert that the mocked tasks were called correctly
-    mock_scrape_example_page.assert_called_once_with(test_url)
+    mock_scrape_example_page.assert_called_once_with(test_url, None)
     mock_storage_text.assert_called_once_with("Test content", test_filename)
 
+
+@patch('flows.scrape_and_store.scrape_pages')
+@patch('flows.scrape_and_store.storage_text')
+def test_scrape_and_store_bulk(mock_storage_text, mock_scrape_pages):
+    mock_scrape_pages.return_value = ["one", "two"]
+
+    scrape_and_store.fn(url=["http://a", "http://b"], filename=["a.txt", "b.txt"], max_workers=2)
+
+    mock_scrape_pages.assert_called_once_with(["http://a", "http://b"], None, 2)
+    assert [c.args for c in mock_storage_text.call_args_list] == [("one", "a.txt"), ("two", "b.txt")]
+
+
+def test_scrape_and_store_bulk_needs_matching_filenames():
+    with pytest.raises(ValueError):
+        scrape_and_store.fn(url=["http://a", "http://b"], filename=["a.txt"])
+
 # Example of using prefect_test_harness if the flow had subflows or needed state checks
 # @patch('flows.scrape_and_store.scrape_example_page')
 # @patch('flows.scrape_and_store.storage_text')
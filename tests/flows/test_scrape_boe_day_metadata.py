@@ -1,11 +1,13 @@
 import pytest
 from unittest.mock import patch
 from flows.scrape_boe_day_metadata import scrape_boe_day_metadata
+from tasks.boe import SumarioNotFound
 
 from unittest.mock import call  # Import call for checking multiple calls
 from prefect.testing.utilities import prefect_test_harness
 
 
+@patch("flows.scrape_boe_day_metadata.link_near_duplicate_articles")
 @patch("flows.scrape_boe_day_metadata.init_db")
 @patch("flows.scrape_boe_day_metadata.insert_article")
 @patch("flows.scrape_boe_day_metadata.parse_article_xml")
@@ -23,6 +25,7 @@ def test_scrape_boe_day_metadata_flow(
     mock_parse_article_xml,
     mock_insert_article,
     mock_init_db,
+    mock_link_duplicates,
 ):
     test_url_date_str = "2023/01/01"
     expected_year, expected_month, expected_day = "2023", "01", "01"
@@ -80,6 +83,7 @@ def test_scrape_boe_day_metadata_flow(
     assert mock_parse_article_xml.call_count == 2
 
     assert mock_insert_article.call_count == 2
+    assert mock_link_duplicates.call_count == 2
 
 
 @patch("flows.scrape_boe_day_metadata.init_db")
@@ -140,10 +144,14 @@ def test_scrape_boe_day_metadata_flow_no_index(
     mock_insert_article,
     mock_init_db,
 ):
-    mock_fetch_index_xml.return_value = ""
+    mock_fetch_index_xml.side_effect = SumarioNotFound("20230103")
 
-    scrape_boe_day_metadata.fn(url_date_str="2023/01/03")
+    with patch("flows.scrape_boe_day_metadata.METRICS") as mock_metrics:
+        scrape_boe_day_metadata.fn(url_date_str="2023/01/03")
 
+    # The early return still publishes the run's metrics
+    mock_metrics.collect.assert_called_once_with("scrape-boe-day-metadata")
+    mock_metrics.collect.return_value.__exit__.assert_called_once()
     mock_fetch_index_xml.assert_called_once()
     mock_extract_article_ids.assert_not_called()
     mock_get_article_metadata.assert_not_called()
@@ -151,3 +159,105 @@ def test_scrape_boe_day_metadata_flow_no_index(
     mock_fetch_article_xml.assert_not_called()
     mock_parse_article_xml.assert_not_called()
     mock_insert_article.assert_not_called()
+
+
+@patch("flows.scrape_boe_day_metadata.init_db")
+@patch("flows.scrape_boe_day_metadata.ingest_article_batch")
+@patch("flows.scrape_boe_day_metadata.fetch_article_xml")
+@patch("flows.scrape_boe_day_metadata.extract_article_ids")
+@patch("flows.scrape_boe_day_metadata.fetch_index_xml")
+def test_scrape_boe_day_metadata_flow_batched(
+    mock_fetch_index_xml,
+    mock_extract_article_ids,
+    mock_fetch_article_xml,
+    mock_ingest_article_batch,
+    mock_init_db,
+):
+    mock_fetch_index_xml.return_value = b"<xml/>"
+    mock_extract_article_ids.return_value = ["ID-1", "ID-2", "ID-3"]
+    mock_ingest_article_batch.side_effect = [2, 1]
+
+    scrape_boe_day_metadata.fn(url_date_str="2023/01/01", batch_size=2)
+
+    mock_ingest_article_batch.assert_has_calls(
+        [call(["ID-1", "ID-2"], "2023-01-01"), call(["ID-3"], "2023-01-01")]
+    )
+    mock_fetch_article_xml.assert_not_called()
+
+
+@patch("flows.scrape_boe_day_metadata.init_db")
+@patch("flows.scrape_boe_day_metadata.ingest_article_batch")
+@patch("flows.scrape_boe_day_metadata.extract_article_ids")
+@patch("flows.scrape_boe_day_metadata.fetch_index_xml")
+def test_scrape_boe_day_metadata_flow_batched_concurrent(
+    mock_fetch_index_xml,
+    mock_extract_article_ids,
+    mock_ingest_article_batch,
+    mock_init_db,
+):
+    mock_fetch_index_xml.return_value = b"<xml/>"
+    mock_extract_article_ids.return_value = ["ID-1", "ID-2", "ID-3"]
+
+    scrape_boe_day_metadata.fn(url_date_str="2023/01/01", batch_size=2, concurrent=True)
+
+    assert mock_ingest_article_batch.submit.call_count == 2
+    mock_ingest_article_batch.submit.return_value.result.assert_called()
+    mock_ingest_article_batch.assert_not_called()
+
+
+@patch("flows.scrape_boe_day_metadata.init_db")
+@patch("flows.scrape_boe_day_metadata.insert_metadata_records")
+@patch("flows.scrape_boe_day_metadata.parse_sumario_items")
+@patch("flows.scrape_boe_day_metadata.fetch_article_xml")
+@patch("flows.scrape_boe_day_metadata.extract_article_ids")
+@patch("flows.scrape_boe_day_metadata.fetch_index_xml")
+def test_scrape_boe_day_metadata_flow_metadata_only(
+    mock_fetch_index_xml,
+    mock_extract_article_ids,
+    mock_fetch_article_xml,
+    mock_parse_sumario_items,
+    mock_insert_metadata_records,
+    mock_init_db,
+):
+    mock_fetch_index_xml.return_value = b"<xml/>"
+    mock_parse_sumario_items.return_value = [{"id": "ID-1"}]
+
+    scrape_boe_day_metadata.fn(url_date_str="2023/01/05", metadata_only=True)
+
+    mock_parse_sumario_items.assert_called_once_with(b"<xml/>", "2023-01-05")
+    mock_insert_metadata_records.assert_called_once_with([{"id": "ID-1"}])
+    mock_extract_article_ids.assert_not_called()
+    mock_fetch_article_xml.assert_not_called()
+
+
+@patch("flows.scrape_boe_day_metadata.init_db")
+@patch("flows.scrape_boe_day_metadata.insert_metadata_records", return_value=2)
+@patch("flows.scrape_boe_day_metadata.parse_sumario_items")
+@patch("flows.scrape_boe_day_metadata.fetch_index_xml")
+def test_scrape_boe_day_metadata_flow_archives_metadata(
+    mock_fetch_index_xml,
+    mock_parse_sumario_items,
+    mock_insert_metadata_records,
+    mock_init_db,
+    tmp_path,
+):
+    from tasks.storage import append_metadata_buffered, read_metadata_record
+
+    mock_fetch_index_xml.return_value = b"<xml/>"
+    mock_parse_sumario_items.return_value = [
+        {"id": "ID-1", "date": "2023-01-05"},
+        {"id": "ID-2", "date": "2023-01-05"},
+    ]
+    archive = str(tmp_path / "metadata")
+
+    with patch(
+        "flows.scrape_boe_day_metadata.append_metadata_buffered",
+        side_effect=append_metadata_buffered.fn,
+    ):
+        scrape_boe_day_metadata.fn(
+            url_date_str="2023/01/05", metadata_only=True, metadata_archive=archive
+        )
+
+    mock_parse_sumario_items.assert_called_once_with(b"<xml/>", "2023-01-05")
+    # Flushed before the flow returns
+    assert read_metadata_record("ID-2", archive) == {"id": "ID-2", "date": "2023-01-05"}
@@ -0,0 +1,49 @@
+from datetime import date
+from unittest.mock import patch
+
+from bench.boe_server import render_sumario
+from flows.direct import run_flow
+from flows.sync_boe import sync_boe
+from tasks.boe import SumarioNotFound
+from tasks.database import sync_watermark
+
+
+def _sumarios(counts: dict[str, int]):
+    def fetch(year, month, day):
+        date_iso = f"{year}-{month}-{day}"
+        if date_iso not in counts:
+            raise SumarioNotFound(date_iso)
+        return render_sumario(date.fromisoformat(date_iso), counts[date_iso], "http://boe").encode()
+
+    return fetch
+
+
+@patch("flows.sync_boe.ingest_article_batch", side_effect=lambda ids, d, db: len(ids))
+@patch("flows.sync_boe.fetch_index_xml")
+def test_sync_boe_uses_watermark_and_skips_unchanged_days(mock_fetch, mock_ingest, tmp_path):
+    db_path = str(tmp_path / "boe.db")
+    counts = {"2024-03-01": 3, "2024-03-02": 2}
+    mock_fetch.fn.side_effect = _sumarios(counts)
+
+    result = run_flow(
+        sync_boe, db_path, start_date="2024-03-01", end_date="2024-03-02", direct=True
+    )
+
+    assert result == {"synced": 2, "unchanged": 0, "articles": 5}
+    assert sync_watermark.fn(db_path) == "2024-03-02"
+
+    # Next day: the look-back day is unchanged, 03-02 gained an item
+    counts.update({"2024-03-02": 3, "2024-03-03": 4})
+    mock_ingest.reset_mock()
+    result = run_flow(sync_boe, db_path, end_date="2024-03-04", lookback_days=1, direct=True)
+
+    assert result == {"synced": 2, "unchanged": 1, "articles": 7}
+    assert [c.args[1] for c in mock_ingest.call_args_list] == ["2024-03-02", "2024-03-03"]
+    fetched = [c.args for c in mock_fetch.fn.call_args_list[2:]]
+    assert fetched == [
+        ("2024", "03", "01"),
+        ("2024", "03", "02"),
+        ("2024", "03", "03"),
+        ("2024", "03", "04"),
+    ]
+    assert sync_watermark.fn(db_path) == "2024-03-03"
@@ -1,11 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from tasks.boe import (
+    SumarioNotFound,
     fetch_index_xml,
     fetch_index_xml_by_date,
     extract_article_ids,
     get_article_metadata,
-    fetch_article_text,
 )
 from tasks.processing import clean_boe_text, split_into_paragraphs
 import requests
@@ -15,7 +15,7 @@ import logging
 @patch("tasks.boe.session.get")
 def test_fetch_index_xml_success(mock_get):
     mock_response = MagicMock()
-    mock_response.text = "<xml>test data</xml>"
+    mock_response.content = b"<xml>test data</xml>"
     mock_response.headers = {"Content-Type": "application/xml"}
     mock_response.raise_for_status = MagicMock()
     mock_get.return_value = mock_response
@@ -29,13 +29,13 @@ def test_fetch_index_xml_success(mock_get):
         timeout=10,
     )
     mock_response.raise_for_status.assert_called_once()
-    assert result == "<xml>test data</xml>"
+    assert result == b"<xml>test data</xml>"
 
 
 @patch("tasks.boe.session.get")
 def test_fetch_index_xml_success_with_capture(mock_get, caplog):
     mock_response = MagicMock()
-    mock_response.text = "<xml>test data</xml>"
+    mock_response.content = b"<xml>test data</xml>"
     mock_response.headers = {"Content-Type": "text/xml"}
     mock_response.raise_for_status = MagicMock()
     mock_get.return_value = mock_response
@@ -53,7 +53,7 @@ def test_fetch_index_xml_success_with_capture(mock_get, caplog):
         timeout=10,
     )
     mock_response.raise_for_status.assert_called_once()
-    assert result == "<xml>test data</xml>"
+    assert result == b"<xml>test data</xml>"
 
 
 @patch("tasks.boe.session.get")
@@ -83,12 +83,14 @@ def test_fetch_index_xml_http_error(mock_get):
 def test_fetch_index_xml_not_found(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 404
-    mock_response.text = ""
+    mock_response.content = b""
     mock_response.headers = {"Content-Type": "application/xml"}
     mock_response.raise_for_status = MagicMock()
     mock_get.return_value = mock_response
 
-    result = fetch_index_xml.fn("2023", "01", "02")
+    # Raised, not returned, so the empty result is never cached
+    with pytest.raises(SumarioNotFound):
+        fetch_index_xml.fn("2023", "01", "02")
 
     mock_get.assert_called_once_with(
         "https://www.boe.es/datosabiertos/api/boe/sumario/20230102",
@@ -96,7 +98,6 @@ def test_fetch_index_xml_not_found(mock_get):
         timeout=10,
     )
     mock_response.raise_for_status.assert_not_called()
-    assert result == ""
 
 
 @patch("tasks.boe.session.get")
@@ -179,54 +180,16 @@ def test_fetch_index_xml_by_date_success(mock_fetch):
     assert result == "<xml>test data</xml>"
 
 
+@patch("tasks.boe.fetch_index_xml.fn", side_effect=SumarioNotFound("20250629"))
+def test_fetch_index_xml_by_date_not_found(mock_fetch):
+    assert fetch_index_xml_by_date.fn("2025-06-29") == b""
+
+
 def test_fetch_index_xml_by_date_invalid():
     with pytest.raises(ValueError):
         fetch_index_xml_by_date.fn("202506")
 
 
-@patch("tasks.boe.session.get")
-def test_fetch_article_text_success(mock_get):
-    sample_xml = """
-    <documento>
-        <titulo>Titulo de prueba</titulo>
-        <departamento>Departamento X</departamento>
-        <rango>Orden</rango>
-        <texto>Cuerpo del texto</texto>
-    </documento>
-    """
-    mock_response = MagicMock()
-    mock_response.text = sample_xml
-    mock_response.raise_for_status = MagicMock()
-    mock_get.return_value = mock_response
-
-    url = "http://example.com/test.xml"
-    metadata, segments = fetch_article_text.fn(url)
-
-    mock_get.assert_called_once_with(url, timeout=10)
-    mock_response.raise_for_status.assert_called_once()
-    assert metadata == {
-        "title": "Titulo de prueba",
-        "department": "Departamento X",
-        "rank": "Orden",
-    }
-    assert segments == ["Cuerpo del texto"]
-
-
-@patch("tasks.boe.session.get")
-def test_fetch_article_text_http_error(mock_get):
-    mock_response = MagicMock()
-    mock_response.raise_for_status = MagicMock(
-        side_effect=requests.exceptions.HTTPError("Network Error")
-    )
-    mock_get.return_value = mock_response
-
-    with pytest.raises(requests.exceptions.HTTPError, match="Network Error"):
-        fetch_article_text.fn("http://example.com/test.xml")
-
-    mock_get.assert_called_once_with("http://example.com/test.xml", timeout=10)
-    mock_response.raise_for_status.assert_called_once()
-
-
 def test_clean_boe_text():
     raw = "  Hola\nMundo\t"
     assert clean_boe_text(raw) == "Hola\nMundo"
@@ -323,6 +286,18 @@ def test_parse_article_xml_without_metadatos():
     assert result["alertas"] == []
 
 
+def test_parse_article_xml_bytes_uses_declared_encoding():
+    xml = (
+        '<?xml version="1.0" encoding="ISO-8859-1"?>'
+        "<documento><titulo>Resoluci\u00f3n</titulo><texto>Art\u00edculo 1</texto></documento>"
+    ).encode("iso-8859-1")
+    from tasks.boe import parse_article_xml
+
+    result = parse_article_xml.fn(xml)
+    assert result["title"] == "Resoluci\u00f3n"
+    assert result["segments"] == ["Art\u00edculo 1"]
+
+
 def test_parse_article_xml_without_analisis():
     xml = """
     <documento>
@@ -343,3 +318,75 @@ def test_parse_article_xml_without_analisis():
     assert result["notas"] == []
     assert result["referencias"] == []
     assert result["alertas"] == []
+
+
+def test_parse_sumario_items():
+    xml = """
+    <response><data><sumario><diario numero="1">
+        <sumario_diario><identificador>BOE-S-2023-1</identificador></sumario_diario>
+        <seccion codigo="1" nombre="I. Disposiciones generales">
+            <departamento codigo="1" nombre="JEFATURA DEL ESTADO">
+                <epigrafe nombre="Leyes">
+                    <item>
+                        <identificador>BOE-A-2023-00001</identificador>
+                        <titulo>Ley 1/2023</titulo>
+                        <url_pdf szBytes="2048">https://www.boe.es/a.pdf</url_pdf>
+                        <url_xml>https://www.boe.es/diario_boe/xml.php?id=BOE-A-2023-00001</url_xml>
+                    </item>
+                </epigrafe>
+            </departamento>
+        </seccion>
+    </diario></sumario></data></response>
+    """
+    from tasks.boe import parse_sumario_items
+
+    items = parse_sumario_items.fn(xml, "2023-01-02")
+
+    assert items == [
+        {
+            "id": "BOE-A-2023-00001",
+            "date": "2023-01-02",
+            "title": "Ley 1/2023",
+            "department": "JEFATURA DEL ESTADO",
+            "rank": None,
+            "section": "I. Disposiciones generales",
+            "url_xml": "https://www.boe.es/diario_boe/xml.php?id=BOE-A-2023-00001",
+            "url_pdf": "https://www.boe.es/a.pdf",
+            "pdf_bytes": 2048,
+        }
+    ]
+
+
+def test_parse_article_xml_reference_links():
+    xml = """
+    <documento>
+        <metadatos><titulo>Titulo</titulo></metadatos>
+        <analisis>
+            <referencias>
+                <anteriores>
+                    <anterior referencia="BOE-A-2015-10565" orden="2000">
+                        <palabra codigo="270">MODIFICA</palabra>
+                        <texto>el art. 3</texto>
+                    </anterior>
+                </anteriores>
+                <posteriores>
+                    <posterior referencia="BOE-A-2024-00001" orden="3000">
+                        <palabra codigo="407">SE DEROGA</palabra>
+                        <texto>por Ley 1/2024</texto>
+                    </posterior>
+                </posteriores>
+            </referencias>
+        </analisis>
+        <texto>Cuerpo</texto>
+    </documento>
+    """
+    from tasks.boe import parse_article_xml
+
+    result = parse_article_xml.fn(xml)
+    assert result["segments"] == ["Cuerpo"]
+    assert result["anteriores"] == [
+        {"id": "BOE-A-2015-10565", "relation": "MODIFICA", "code": "270", "text": "el art. 3"}
+    ]
+    assert result["posteriores"] == [
+        {"id": "BOE-A-2024-00001", "relation": "SE DEROGA", "code": "407", "text": "por Ley 1/2024"}
+    ]
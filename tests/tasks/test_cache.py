@@ -0,0 +1,40 @@
+import os
+import time
+from datetime import timedelta
+
+from tasks.cache import (
+    PARSER_VERSION,
+    article_xml_cache_key,
+    parsed_article_cache_key,
+    purge_result_cache,
+    sumario_cache_key,
+)
+
+
+def test_cache_keys():
+    assert sumario_cache_key(None, {"year": "2025", "month": "7", "day": "3"}) == "boe-sumario-20250703"
+    assert article_xml_cache_key(None, {"boe_id": "BOE-A-2025-1"}) == "boe-article-xml-BOE-A-2025-1"
+
+
+def test_parsed_article_cache_key_depends_on_content_and_version():
+    key_bytes = parsed_article_cache_key(None, {"xml_text": b"<documento/>"})
+    key_str = parsed_article_cache_key(None, {"xml_text": "<documento/>"})
+    other = parsed_article_cache_key(None, {"xml_text": b"<documento>x</documento>"})
+    assert key_bytes == key_str
+    assert key_bytes != other
+    assert key_bytes.startswith(f"boe-parsed-v{PARSER_VERSION}-")
+
+
+def test_purge_result_cache(tmp_path):
+    old = tmp_path / "old"
+    new = tmp_path / "new"
+    old.write_text("x")
+    new.write_text("y")
+    past = time.time() - 3 * 86400
+    os.utime(old, (past, past))
+
+    removed = purge_result_cache.fn(timedelta(days=1), str(tmp_path))
+
+    assert removed == 1
+    assert not old.exists()
+    assert new.exists()
@@ -48,3 +48,77 @@ def test_insert_article_and_replace():
         cur.execute("SELECT count(*) FROM articles")
         assert cur.fetchone()[0] == 1
         conn.close()
+
+
+def test_existing_article_ids_and_insert_articles():
+    from tasks.database import existing_article_ids, insert_articles
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_file = str(Path(tmpdir) / "test.db")
+        init_db.fn(db_file)
+        rows = [({"id": str(i), "title": f"T{i}"}, f"text {i}") for i in range(3)]
+        assert insert_articles.fn(rows, db_file) == 3
+        assert existing_article_ids.fn(["0", "2", "9"], db_file) == {"0", "2"}
+        assert existing_article_ids.fn([], db_file) == set()
+
+
+def test_insert_metadata_records_keeps_rank_and_lists_pending():
+    from tasks.database import insert_metadata_records, pending_articles
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_file = str(Path(tmpdir) / "test.db")
+        init_db.fn(db_file)
+        insert_article.fn({"id": "1", "date": "2023-01-01", "rank": "Ley"}, "Text", db_file)
+        records = [
+            {"id": "1", "date": "2023-01-01", "title": "Uno", "rank": None},
+            {"id": "2", "date": "2023-01-01", "title": "Dos", "rank": None},
+        ]
+        assert insert_metadata_records.fn(records, db_file) == 2
+
+        conn = sqlite3.connect(db_file)
+        rows = conn.execute("SELECT id, title, rank FROM metadata ORDER BY id").fetchall()
+        conn.close()
+        assert rows == [("1", "Uno", "Ley"), ("2", "Dos", None)]
+        assert pending_articles.fn(db_file) == [("2", "2023-01-01")]
+
+
+def test_insert_article_details_and_facets(tmp_path):
+    from tasks.database import articles_with_term, facet_counts
+
+    db = str(tmp_path / "boe.db")
+    init_db.fn(db)
+    details = {
+        "identificador": "A",
+        "diario": "BOE",
+        "materias": ["Sanidad", "Empleo"],
+        "alertas": ["Salud"],
+        "notas": [],
+    }
+    insert_article.fn({"id": "A", "date": "2024-03-01"}, "t", db, details=details)
+    insert_article.fn(
+        {"id": "B", "date": "2024-05-01"}, "t", db, details={"materias": ["Sanidad"]}
+    )
+    insert_article.fn(
+        {"id": "C", "date": "2023-05-01"}, "t", db, details={"materias": ["Sanidad"]}
+    )
+
+    assert articles_with_term.fn("materia", "Sanidad", "2024-01-01", "2024-12-31", db) == ["A", "B"]
+    assert facet_counts.fn("materia", db_path=db) == [("Sanidad", 3), ("Empleo", 1)]
+    assert facet_counts.fn("materia", "2024-01-01", filters={"alerta": "Salud"}, db_path=db) == [
+        ("Empleo", 1),
+        ("Sanidad", 1),
+    ]
+
+    # Re-inserting an article replaces its terms instead of accumulating them
+    insert_article.fn({"id": "A", "date": "2024-03-01"}, "t", db, details={"materias": ["Empleo"]})
+    assert articles_with_term.fn("materia", "Sanidad", db_path=db) == ["C", "B"]
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT identificador, diario FROM article_details WHERE id='A'").fetchone() == (None, None)
+    plan = " ".join(
+        row[-1]
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM article_terms WHERE kind='materia' AND value='x' AND date >= '2024'"
+        )
+    )
+    conn.close()
+    assert "SEARCH article_terms USING PRIMARY KEY" in plan
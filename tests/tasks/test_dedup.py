@@ -0,0 +1,77 @@
+from tasks.database import init_db, insert_articles
+from tasks.dedup import (
+    LSHIndex,
+    MinHasher,
+    collapse_near_duplicates,
+    jaccard,
+    link_near_duplicate_articles,
+    shingles,
+)
+
+TEXT = (
+    "Orden por la que se regulan las bases de las ayudas destinadas a la "
+    "mejora de la eficiencia energetica en edificios de uso residencial y "
+    "se convoca el procedimiento para el ejercicio correspondiente"
+)
+
+
+def test_shingles():
+    assert shingles("A b", size=3) == {"a b"}
+    assert shingles("a b c d", size=3) == {"a b c", "b c d"}
+    assert shingles("  ") == set()
+
+
+def test_signature_estimates_similarity():
+    hasher = MinHasher()
+    a = hasher.signature(TEXT)
+    assert jaccard(a, hasher.signature(TEXT)) == 1.0
+    assert jaccard(a, hasher.signature(TEXT.replace("energetica", "hidrica"))) > 0.6
+    assert jaccard(a, hasher.signature("Texto completamente distinto sin relacion")) < 0.1
+    assert hasher.signature("") is None
+
+
+def test_lsh_links_to_canonical_and_is_idempotent(tmp_path):
+    db = str(tmp_path / "dedup.db")
+    with LSHIndex(db, "article") as lsh:
+        assert lsh.link("A", TEXT) == (None, None)
+        canonical, similarity = lsh.link("B", TEXT + " vigente")
+        assert canonical == "A" and similarity >= 0.8
+        # C matches B best but is linked to B's canonical entry
+        assert lsh.link("C", TEXT + " vigente")[0] == "A"
+        assert lsh.link("D", "Otro texto sin parecido alguno con los anteriores") == (None, None)
+        assert lsh.link("B", "cualquier cosa")[0] == "A"
+    with LSHIndex(db, "article") as lsh:
+        assert sorted(k for k, _ in lsh.duplicates_of("A")) == ["B", "C"]
+        assert lsh.canonical_map(["A", "B", "D"]) == {"B": "A"}
+    with LSHIndex(db, "segment") as lsh:
+        assert lsh.link("X", TEXT) == (None, None)
+
+
+def test_link_articles_and_collapse_hits(tmp_path):
+    db = str(tmp_path / "boe.db")
+    init_db.fn(db)
+    rows = [
+        ({"id": "A", "date": "2024-01-01"}, TEXT),
+        ({"id": "B", "date": "2024-01-02"}, TEXT + " (corregido)"),
+        ({"id": "C", "date": "2024-01-02"}, "Anuncio de licitacion de obras"),
+    ]
+    insert_articles.fn(rows, db)
+    assert link_near_duplicate_articles.fn(rows, db) == {"B": "A"}
+
+    hits = [{"id": "B", "score": 0.9}, {"id": "C", "score": 0.8}, {"id": "A", "score": 0.7}]
+    assert collapse_near_duplicates(hits, db) == [
+        {"id": "B", "score": 0.9, "duplicates": ["A"]},
+        {"id": "C", "score": 0.8},
+    ]
+
+
+def test_collapse_opens_database_read_only(tmp_path):
+    import sqlite3
+
+    db = str(tmp_path / "boe.db")
+    sqlite3.connect(db).close()
+    hits = [{"id": "A"}, {"id": "B"}]
+
+    assert collapse_near_duplicates(hits, db) == hits
+    tables = sqlite3.connect(db).execute("SELECT name FROM sqlite_master").fetchall()
+    assert tables == []
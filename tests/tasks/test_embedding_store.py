@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+
+from tasks.embedding_store import EmbeddingStore, rebuild_faiss_index
+
+
+def test_append_and_reopen(tmp_path):
+    store = EmbeddingStore(str(tmp_path), model="m", backend="torch", model_version="1", dim=2)
+    store.append([[1, 2], [3, 4]], [{"id": "A", "seq": 0}, {"id": "A", "seq": 1}])
+    store.append([[5, 6]], [{"id": "B", "seq": 0}])
+
+    reopened = EmbeddingStore(str(tmp_path), model="m", model_version="1")
+    assert reopened.count == 3
+    assert reopened.vectors().dtype == np.float16
+    assert reopened.vectors().tolist() == [[1, 2], [3, 4], [5, 6]]
+    assert [r["id"] for r in reopened.rows()] == ["A", "A", "B"]
+
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path), model="other")
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path), model="m", backend="onnx-int8", model_version="1")
+    with pytest.raises(ValueError):
+        store.append([[1, 2]], [])
+
+
+def test_uncommitted_rows_are_trimmed(tmp_path):
+    store = EmbeddingStore(str(tmp_path), model="m", dim=2, dtype="float32")
+    store.append([[1, 2]], [{"id": "A"}])
+    # Simulate a crash after the data files were written but before the manifest
+    with (tmp_path / "vectors.bin").open("ab") as f:
+        f.write(np.array([[9, 9]], dtype=np.float32).tobytes())
+    with (tmp_path / "rows.jsonl").open("a") as f:
+        f.write(json.dumps({"id": "lost"}) + "\n")
+
+    store = EmbeddingStore(str(tmp_path))
+    assert store.rows() == [{"id": "A"}]
+    store.append([[3, 4]], [{"id": "B"}])
+    assert store.vectors().tolist() == [[1, 2], [3, 4]]
+    assert [r["id"] for r in store.rows()] == ["A", "B"]
+
+
+def test_rebuild_faiss_index(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    rng = np.random.default_rng(0)
+    vectors = rng.random((300, 8), dtype=np.float32)
+    store = EmbeddingStore(str(tmp_path / "emb"), model="m", dim=8, dtype="float32")
+    store.append(vectors, [{"id": str(i), "seq": 0} for i in range(300)])
+
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "meta.jsonl"
+    assert rebuild_faiss_index.fn(str(tmp_path / "emb"), str(index_path), str(meta_path), "IVF4,Flat") == 300
+
+    index = faiss.read_index(str(index_path))
+    assert index.ntotal == 300
+    index.nprobe = 4
+    _, ids = index.search(vectors[42:43], 1)
+    assert ids[0][0] == 42
+    metas = [json.loads(line) for line in meta_path.read_text().splitlines()]
+    assert metas[42] == {"id": "42", "seq": 0}
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+import os
+
+import numpy as np
+
+from tasks.encoding import EncodingPool, chunks_of, sentence_transformer_version
+
+
+class _LengthModel:
+    def encode(self, segments, batch_size=32):
+        return [[len(s), float(s.split()[-1])] for s in segments]
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+def length_model(model_name):
+    return _LengthModel()
+
+
+# In a pool worker this runs while the initializer is unpickled, i.e. when
+# numpy and torch size their thread pools
+_IMPORT_THREADS = os.environ.get("OMP_NUM_THREADS")
+
+
+class _ThreadsModel:
+    def encode(self, segments, batch_size=32):
+        return [[float(_IMPORT_THREADS or 0)] for _ in segments]
+
+    def get_sentence_embedding_dimension(self):
+        return 1
+
+
+def threads_model(model_name):
+    return _ThreadsModel()
+
+
+def test_chunks_of():
+    assert list(chunks_of(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunks_of([], 2)) == []
+
+
+def test_encoding_pool_keeps_order():
+    segments = [f"segmento {i}" for i in range(103)]
+    with EncodingPool("fake", workers=2, chunk_size=10, model_factory=length_model) as pool:
+        assert pool.get_sentence_embedding_dimension() == 2
+        vectors = pool.encode(iter(segments))
+        assert pool.encode([]).shape == (0, 2)
+    assert vectors.dtype == np.float32
+    assert vectors[:, 1].tolist() == list(range(103))
+
+
+def test_encoding_pool_workers_start_with_thread_limit():
+    before = os.environ.get("OMP_NUM_THREADS")
+    with EncodingPool(
+        "fake", workers=2, threads_per_worker=3, chunk_size=1, model_factory=threads_model
+    ) as pool:
+        vectors = pool.encode(["a", "b", "c", "d"])
+    assert vectors[:, 0].tolist() == [3.0] * 4
+    assert os.environ.get("OMP_NUM_THREADS") == before
+
+
+class _Tensor:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def detach(self):
+        return self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _FakeSentenceTransformer(list):
+    def __init__(self, commit, weights):
+        config = SimpleNamespace(_commit_hash=commit)
+        super().__init__([SimpleNamespace(auto_model=SimpleNamespace(config=config))])
+        self.weights = weights
+
+    def state_dict(self):
+        return {"0.weight": _Tensor(self.weights)}
+
+
+def test_sentence_transformer_version_identifies_the_weights():
+    assert sentence_transformer_version(_FakeSentenceTransformer("c0ffee", [1, 2])) == "c0ffee"
+    # Local models have no commit: the parameters are hashed
+    local = sentence_transformer_version(_FakeSentenceTransformer(None, [1, 2]))
+    assert local.startswith("weights-")
+    assert sentence_transformer_version(_FakeSentenceTransformer(None, [1, 2])) == local
+    assert sentence_transformer_version(_FakeSentenceTransformer(None, [1, 3])) != local
@@ -0,0 +1,182 @@
+import pytest
+
+from tasks.database import init_db, insert_article, insert_metadata_records
+from tasks.export import export_corpus_to_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _seed(db):
+    init_db.fn(db)
+    insert_article.fn({"id": "A", "date": "2023-01-01", "title": "t"}, "Uno\nDos", db)
+    insert_article.fn({"id": "B", "date": "2023-01-02", "title": "u"}, "Tres", db)
+
+
+def test_export_writes_partitions(tmp_path):
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+
+    days = export_corpus_to_parquet.fn(db, str(out))
+
+    assert days == ["2023-01-01", "2023-01-02"]
+    segments = pq.read_table(out / "segments" / "date=2023-01-01" / "part-0.parquet")
+    assert segments.column("text").to_pylist() == ["Uno", "Dos"]
+    assert segments.column("seq").to_pylist() == [0, 1]
+    metadata = pq.read_table(out / "metadata").to_pylist()
+    assert sorted(r["id"] for r in metadata) == ["A", "B"]
+    assert all(r["has_text"] for r in metadata)
+
+
+def test_export_is_incremental(tmp_path):
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+    export_corpus_to_parquet.fn(db, str(out))
+
+    assert export_corpus_to_parquet.fn(db, str(out)) == []
+    insert_article.fn({"id": "C", "date": "2023-01-02", "title": "v"}, "Cuatro", db)
+    assert export_corpus_to_parquet.fn(db, str(out)) == ["2023-01-02"]
+    segments = pq.read_table(out / "segments" / "date=2023-01-02" / "part-0.parquet")
+    assert sorted(segments.column("id").to_pylist()) == ["B", "C"]
+    assert export_corpus_to_parquet.fn(db, str(out), full=True) == ["2023-01-01", "2023-01-02"]
+
+
+def test_export_picks_up_metadata_corrected_in_place(tmp_path):
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+    record = {"id": "B", "date": "2023-01-02", "title": "u"}
+    insert_metadata_records.fn([{**record, "id": "D"}], db)
+    export_corpus_to_parquet.fn(db, str(out))
+
+    # The upsert keeps the rowid; the corrected title must still be exported
+    insert_metadata_records.fn([{**record, "title": "u corregido"}], db)
+    assert export_corpus_to_parquet.fn(db, str(out)) == ["2023-01-02"]
+    metadata = pq.read_table(out / "metadata" / "date=2023-01-02" / "part-0.parquet")
+    assert metadata.column("title").to_pylist() == ["u corregido", "u"]
+    assert export_corpus_to_parquet.fn(db, str(out)) == []
+
+
+def test_export_embeddings(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    import numpy as np
+
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array([[1, 0], [0, 1], [1, 1]], dtype="float32"))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+    (tmp_path / "meta.jsonl").write_text('{"id": "A"}\n{"id": "A"}\n{"id": "B"}')
+
+    export_corpus_to_parquet.fn(
+        db,
+        str(out),
+        include_embeddings=True,
+        index_path=str(tmp_path / "index.faiss"),
+        meta_path=str(tmp_path / "meta.jsonl"),
+    )
+
+    table = pq.read_table(out / "embeddings" / "date=2023-01-01" / "part-0.parquet")
+    assert table.column("vector").to_pylist() == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_export_adds_embeddings_once_indexed(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    import numpy as np
+
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    paths = {"index_path": str(tmp_path / "index.faiss"), "meta_path": str(tmp_path / "meta.jsonl")}
+    _seed(db)
+    # Exported before the index exists, then without embeddings
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, **paths) == ["2023-01-01", "2023-01-02"]
+    assert export_corpus_to_parquet.fn(db, str(out), **paths) == []
+
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array([[1, 0], [0, 1], [1, 1]], dtype="float32"))
+    faiss.write_index(index, paths["index_path"])
+    (tmp_path / "meta.jsonl").write_text('{"id": "A"}\n{"id": "A"}\n{"id": "B"}')
+
+    assert export_corpus_to_parquet.fn(db, str(out), **paths) == []
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, **paths) == ["2023-01-01", "2023-01-02"]
+    table = pq.read_table(out / "embeddings" / "date=2023-01-02" / "part-0.parquet")
+    assert table.column("vector").to_pylist() == [[1.0, 1.0]]
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, **paths) == []
+
+    # Reindexing rewrites the index files
+    index.add(np.array([[2, 2]], dtype="float32"))
+    faiss.write_index(index, paths["index_path"])
+    (tmp_path / "meta.jsonl").write_text('{"id": "A"}\n{"id": "A"}\n{"id": "B"}\n{"id": "B"}')
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, **paths) == ["2023-01-01", "2023-01-02"]
+    table = pq.read_table(out / "embeddings" / "date=2023-01-02" / "part-0.parquet")
+    assert table.column("vector").to_pylist() == [[1.0, 1.0], [2.0, 2.0]]
+
+
+def test_export_dataset_reads_date_from_partition(tmp_path):
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+    export_corpus_to_parquet.fn(db, str(out))
+
+    table = pq.read_table(out / "metadata").to_pylist()
+    assert {(r["id"], str(r["date"])) for r in table} == {("A", "2023-01-01"), ("B", "2023-01-02")}
+
+
+def test_export_skips_embeddings_without_meta_file(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    import numpy as np
+
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    _seed(db)
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array([[1, 0]], dtype="float32"))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+
+    days = export_corpus_to_parquet.fn(
+        db,
+        str(out),
+        include_embeddings=True,
+        index_path=str(tmp_path / "index.faiss"),
+        meta_path=str(tmp_path / "meta.jsonl"),
+    )
+
+    assert days == ["2023-01-01", "2023-01-02"]
+    assert not (out / "embeddings").exists()
+
+
+def test_export_reads_current_snapshot(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    import numpy as np
+    from tasks.snapshots import INDEX_FILE, META_FILE, publish_snapshot, stage_snapshot
+
+    db = str(tmp_path / "boe.db")
+    out = tmp_path / "parquet"
+    root = str(tmp_path / "snapshots")
+    _seed(db)
+
+    def publish(vectors, metas):
+        staging = stage_snapshot(root)
+        index = faiss.IndexFlatL2(2)
+        index.add(np.array(vectors, dtype="float32"))
+        faiss.write_index(index, str(staging / INDEX_FILE))
+        (staging / META_FILE).write_text("\n".join(metas))
+        publish_snapshot(root, staging)
+
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, snapshot_dir=root) == [
+        "2023-01-01",
+        "2023-01-02",
+    ]
+    publish([[1, 0], [0, 1], [1, 1]], ['{"id": "A"}', '{"id": "A"}', '{"id": "B"}'])
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, snapshot_dir=root) == [
+        "2023-01-01",
+        "2023-01-02",
+    ]
+    assert export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, snapshot_dir=root) == []
+
+    publish([[2, 0], [0, 2], [2, 2]], ['{"id": "A"}', '{"id": "A"}', '{"id": "B"}'])
+    export_corpus_to_parquet.fn(db, str(out), include_embeddings=True, snapshot_dir=root)
+    table = pq.read_table(out / "embeddings" / "date=2023-01-02" / "part-0.parquet")
+    assert table.column("vector").to_pylist() == [[2.0, 2.0]]
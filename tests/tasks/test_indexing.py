@@ -2,6 +2,11 @@ import json
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+import pytest
+
+# Import numpy before sys.modules is patched: patch.dict would unload it again
+import numpy  # noqa: F401
+
 
 def test_create_or_update_index(tmp_path):
     fake_model = MagicMock()
@@ -12,15 +17,13 @@ def test_create_or_update_index(tmp_path):
     fake_index = MagicMock()
     fake_faiss = SimpleNamespace(
         IndexFlatL2=MagicMock(return_value=fake_index),
-        write_index=MagicMock(),
+        write_index=MagicMock(side_effect=lambda index, path: open(path, 'wb').close()),
         read_index=MagicMock(side_effect=FileNotFoundError),
     )
-    fake_numpy = SimpleNamespace(array=lambda x, dtype=None: x)
 
     with patch.dict('sys.modules', {
         'faiss': fake_faiss,
         'sentence_transformers': fake_sentence_module,
-        'numpy': fake_numpy,
     }):
         from tasks.indexing import create_or_update_index
 
@@ -30,7 +33,159 @@ def test_create_or_update_index(tmp_path):
 
         create_or_update_index.fn([record], str(index_path), str(meta_path))
 
-        fake_faiss.write_index.assert_called_once_with(fake_index, str(index_path))
-        assert meta_path.exists()
+        # Written under a temporary name and renamed into place
+        fake_faiss.write_index.assert_called_once_with(fake_index, str(index_path) + '.tmp')
+        assert index_path.exists() and meta_path.exists()
+        assert list(tmp_path.glob('*.tmp')) == []
         data = [json.loads(line) for line in meta_path.read_text().splitlines()]
         assert data[0]['id'] == '1'
+
+
+def test_create_or_update_index_skips_near_duplicates(tmp_path):
+    fake_model = MagicMock()
+    fake_model.get_sentence_embedding_dimension.return_value = 3
+    fake_model.encode.side_effect = lambda segments: [[0.1, 0.2, 0.3]] * len(segments)
+    fake_sentence_module = SimpleNamespace(SentenceTransformer=MagicMock(return_value=fake_model))
+    index_path = tmp_path / 'index.faiss'
+    fake_index = MagicMock(ntotal=2)
+    fake_faiss = SimpleNamespace(
+        IndexFlatL2=MagicMock(return_value=fake_index),
+        write_index=MagicMock(side_effect=lambda index, path: open(path, 'wb').close()),
+        read_index=MagicMock(return_value=fake_index),
+    )
+    paragraph = (
+        'Se modifica el articulo tercero de la orden ministerial relativa '
+        'a las ayudas para la mejora de la eficiencia energetica de edificios '
+        'de uso residencial, que queda redactado en los siguientes terminos: '
+        'las solicitudes se presentaran en el plazo de un mes a contar desde '
+        'el dia siguiente al de la publicacion de la convocatoria'
+    )
+    records = [
+        {'id': 'A', 'title': 'A', 'text': paragraph + '\nPrimer parrafo propio del articulo A'},
+        # A re-publication with a one word difference
+        {'id': 'B', 'title': 'B', 'text': paragraph.replace('tercero', 'cuarto')},
+    ]
+
+    with patch.dict('sys.modules', {
+        'faiss': fake_faiss,
+        'sentence_transformers': fake_sentence_module,
+    }):
+        from tasks.indexing import create_or_update_index
+
+        meta_path = tmp_path / 'meta.jsonl'
+        create_or_update_index.fn(records, str(index_path), str(meta_path))
+        metas = [json.loads(line) for line in meta_path.read_text().splitlines()]
+        assert [(m['id'], m['seq']) for m in metas] == [('A', 0), ('A', 1)]
+
+        # Re-indexing the same records embeds nothing new
+        create_or_update_index.fn(records, str(index_path), str(meta_path))
+        assert fake_model.encode.call_count == 1
+        assert len(meta_path.read_text().splitlines()) == 2
+
+    from tasks.embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(str(tmp_path / 'embeddings'))
+    assert store.count == 2
+    assert [(r['id'], r['seq']) for r in store.rows()] == [('A', 0), ('A', 1)]
+
+    from tasks.dedup import LSHIndex
+
+    with LSHIndex(str(tmp_path / 'index.dedup.db'), 'segment') as lsh:
+        assert lsh.canonical_map(['A:0', 'B:0']) == {'B:0': 'A:0'}
+
+
+def test_model_change_rebuilds_store_and_index(tmp_path):
+    import faiss
+
+    from tasks.embedding_store import EmbeddingStore
+    from tasks.indexing import create_or_update_index
+
+    fake_model = MagicMock()
+    fake_model.get_sentence_embedding_dimension.return_value = 2
+    fake_model.encode.side_effect = lambda segments: [[0.5, 0.5]] * len(segments)
+    index_path = tmp_path / 'index.faiss'
+    meta_path = tmp_path / 'meta.jsonl'
+    records = [{'id': 'A', 'title': 'A', 'text': 'uno'}]
+
+    with patch('tasks.indexing.load_encoder', return_value=fake_model):
+        with patch('tasks.indexing.encoder_version', return_value='rev-1'):
+            create_or_update_index.fn(records, str(index_path), str(meta_path))
+        records.append({'id': 'B', 'title': 'B', 'text': 'dos tres'})
+        with patch('tasks.indexing.encoder_version', return_value='rev-2'):
+            create_or_update_index.fn(records, str(index_path), str(meta_path))
+
+    # Every record was embedded again with the new model, none kept from the old one
+    assert fake_model.encode.call_count == 2
+    assert faiss.read_index(str(index_path)).ntotal == 2
+    store = EmbeddingStore(str(tmp_path / 'embeddings'))
+    assert store.manifest['model_version'] == 'rev-2'
+    assert [r['id'] for r in store.rows()] == ['A', 'B']
+
+
+def test_changed_segments_are_embedded_again(tmp_path):
+    import faiss
+
+    from tasks.embedding_store import EmbeddingStore
+    from tasks.indexing import create_or_update_index
+
+    encoded = []
+
+    def encode(segments):
+        encoded.extend(segments)
+        return [[float(len(s)), 0.0] for s in segments]
+
+    fake_model = MagicMock()
+    fake_model.get_sentence_embedding_dimension.return_value = 2
+    fake_model.encode.side_effect = encode
+    index_path = tmp_path / 'index.faiss'
+    meta_path = tmp_path / 'meta.jsonl'
+
+    def run(records):
+        with patch('tasks.indexing.load_encoder', return_value=fake_model), \
+                patch('tasks.indexing.encoder_version', return_value='test'):
+            create_or_update_index.fn(records, str(index_path), str(meta_path))
+        metas = [json.loads(line) for line in meta_path.read_text().splitlines()]
+        return metas, faiss.read_index(str(index_path))
+
+    run([{'id': 'A', 'title': 'A', 'text': 'uno\ndos dos'}, {'id': 'B', 'title': 'B', 'text': 'tres'}])
+    encoded.clear()
+
+    # A's first paragraph changes and its second one is gone
+    metas, index = run([{'id': 'A', 'title': 'A', 'text': 'uno corregido'}, {'id': 'B', 'title': 'B', 'text': 'tres'}])
+
+    assert encoded == ['uno corregido']
+    assert [(m['id'], m['seq']) for m in metas] == [('B', 0), ('A', 0)]
+    assert index.ntotal == 2
+    assert index.reconstruct(1).tolist() == [13.0, 0.0]
+    store = EmbeddingStore(str(tmp_path / 'embeddings'))
+    assert [(r['id'], r['seq']) for r in store.rows()] == [('B', 0), ('A', 0)]
+    assert store.vectors()[:, 0].tolist() == [4.0, 13.0]
+
+    encoded.clear()
+    run([{'id': 'A', 'title': 'A', 'text': 'uno corregido'}])
+    assert encoded == []
+
+
+def test_failed_index_write_keeps_previous_files(tmp_path):
+    import faiss
+
+    from tasks.indexing import create_or_update_index
+
+    fake_model = MagicMock()
+    fake_model.get_sentence_embedding_dimension.return_value = 2
+    fake_model.encode.side_effect = lambda segments: [[1.0, 0.0]] * len(segments)
+    index_path = tmp_path / 'index.faiss'
+    meta_path = tmp_path / 'meta.jsonl'
+    records = [{'id': 'A', 'title': 'A', 'text': 'uno'}]
+
+    with patch('tasks.indexing.load_encoder', return_value=fake_model), \
+            patch('tasks.indexing.encoder_version', return_value='test'):
+        create_or_update_index.fn(records, str(index_path), str(meta_path))
+        before = (index_path.read_bytes(), meta_path.read_text())
+        records.append({'id': 'B', 'title': 'B', 'text': 'dos'})
+        with patch('faiss.write_index', side_effect=OSError('disk full')):
+            with pytest.raises(OSError):
+                create_or_update_index.fn(records, str(index_path), str(meta_path))
+
+    assert (index_path.read_bytes(), meta_path.read_text()) == before
+    assert faiss.read_index(str(index_path)).ntotal == 1
@@ -0,0 +1,59 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tasks.database import init_db, insert_article
+from tasks.ingest import chunked, ingest_article_batch
+
+ARTICLE_XML = b"""
+<documento>
+    <titulo>Titulo</titulo>
+    <departamento>Depto</departamento>
+    <rango>Orden</rango>
+    <texto>Uno\n\nDos</texto>
+    <analisis><materias><materia>Sanidad</materia></materias></analisis>
+</documento>
+"""
+
+
+def test_chunked():
+    assert chunked([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+
+def test_ingest_article_batch_skips_existing(tmp_path):
+    db = str(tmp_path / "boe.db")
+    init_db.fn(db)
+    insert_article.fn({"id": "BOE-A-2023-00001"}, "old", db)
+    fetch = MagicMock()
+    fetch.fn.return_value = ARTICLE_XML
+
+    with patch("tasks.ingest.fetch_article_xml", fetch):
+        stored = ingest_article_batch.fn(
+            ["BOE-A-2023-00001", "BOE-A-2023-00002"], "2023-01-01", db
+        )
+
+    assert stored == 1
+    fetch.fn.assert_called_once_with("BOE-A-2023-00002")
+    conn = sqlite3.connect(db)
+    rows = dict(conn.execute("SELECT id, text FROM articles").fetchall())
+    assert rows == {"BOE-A-2023-00001": "old", "BOE-A-2023-00002": "Uno\nDos"}
+    terms = conn.execute("SELECT kind, value, date, id FROM article_terms").fetchall()
+    conn.close()
+    assert terms == [("materia", "Sanidad", "2023-01-01", "BOE-A-2023-00002")]
+
+
+def test_ingest_article_batch_keeps_progress_on_failure(tmp_path):
+    db = str(tmp_path / "boe.db")
+    init_db.fn(db)
+    fetch = MagicMock()
+    fetch.fn.side_effect = [ARTICLE_XML, RuntimeError("boom")]
+
+    with patch("tasks.ingest.fetch_article_xml", fetch):
+        with pytest.raises(RuntimeError):
+            ingest_article_batch.fn(["BOE-A-2023-00001", "BOE-A-2023-00002"], "2023-01-01", db)
+
+    conn = sqlite3.connect(db)
+    ids = [r[0] for r in conn.execute("SELECT id FROM articles")]
+    conn.close()
+    assert ids == ["BOE-A-2023-00001"]
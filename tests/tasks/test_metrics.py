@@ -0,0 +1,86 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from tasks import _record_response
+from tasks.metrics import Metrics, METRICS
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.inc("c")
+    metrics.set_gauge("g", 1)
+    with metrics.timer("t", stage="x"):
+        pass
+    assert metrics.render_prometheus() == ""
+
+
+def test_render_prometheus():
+    metrics = Metrics(enabled=True)
+    metrics.inc("boe_articles_total", 3)
+    metrics.set_gauge("boe_articles_per_second", 1.5)
+    metrics.observe("boe_stage_seconds", 0.25, stage="parse")
+    metrics.observe("boe_stage_seconds", 0.75, stage="parse")
+
+    text = metrics.render_prometheus()
+
+    assert "# TYPE boe_articles_total counter" in text
+    assert "boe_articles_total 3" in text
+    assert "boe_articles_per_second 1.5" in text
+    assert "# TYPE boe_stage_seconds summary" in text
+    assert 'boe_stage_seconds_count{stage="parse"} 2' in text
+    assert 'boe_stage_seconds_sum{stage="parse"} 1.000000' in text
+    assert metrics.quantile("boe_stage_seconds", 0.99, stage="parse") == 0.75
+
+
+def test_timer_records_elapsed():
+    metrics = Metrics(enabled=True)
+    with metrics.timer("boe_stage_seconds", stage="encode"):
+        pass
+    timing = metrics.snapshot()["timings"][("boe_stage_seconds", (("stage", "encode"),))]
+    assert timing["count"] == 1
+
+
+def test_collect_resets_and_publishes_on_error(tmp_path, monkeypatch):
+    metrics_file = tmp_path / "boe.prom"
+    monkeypatch.setenv("BOE_METRICS_FILE", str(metrics_file))
+    artifact = MagicMock()
+    monkeypatch.setattr("prefect.artifacts.create_markdown_artifact", artifact)
+    metrics = Metrics(enabled=True)
+    metrics.inc("boe_articles_total", 5)  # left over from an earlier run
+
+    with pytest.raises(RuntimeError):
+        with metrics.collect("test-run"):
+            metrics.inc("boe_articles_total", 2)
+            raise RuntimeError("boom")
+
+    assert "boe_articles_total 2" in metrics_file.read_text()
+    assert artifact.call_args.kwargs["key"] == "test-run"
+
+
+def test_response_hook_records_status_bytes_and_retries():
+    response = MagicMock()
+    response.url = "https://www.boe.es/diario_boe/xml.php?id=X"
+    response.status_code = 200
+    response.content = b"<xml/>"
+    response.elapsed = timedelta(milliseconds=120)
+    response.raw = SimpleNamespace(
+        retries=SimpleNamespace(history=(SimpleNamespace(status=503),))
+    )
+
+    METRICS.enabled = True
+    try:
+        METRICS.reset()
+        _record_response(response)
+        counters = METRICS.snapshot()["counters"]
+    finally:
+        METRICS.enabled = False
+        METRICS.reset()
+
+    host = (("host", "www.boe.es"),)
+    assert counters[("boe_http_retries_total", host)] == 1
+    assert counters[("boe_http_response_bytes_total", host)] == 6
+    assert counters[("boe_http_requests_total", (("host", "www.boe.es"), ("status", "503")))] == 1
+    assert counters[("boe_http_requests_total", (("host", "www.boe.es"), ("status", "200")))] == 1
@@ -0,0 +1,147 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from tasks.encoding import encoder_version, load_encoder
+from tasks.onnx_encoder import OnnxEncoder, export_onnx, mean_pool
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    assert mean_pool(hidden, mask, normalize=False).tolist() == [[2.0, 0.0]]
+    assert mean_pool(hidden, mask, normalize=True).tolist() == [[1.0, 0.0]]
+
+
+def test_backend_selection():
+    with pytest.raises(ValueError):
+        load_encoder("all-MiniLM-L6-v2", "tensorflow")
+
+
+def _tokenize(sentences, padding, truncation, max_length, return_tensors):
+    # One token per word, id = word length, padded to the longest sentence
+    ids = [[len(word) for word in s.split()][:max_length] for s in sentences]
+    width = max(map(len, ids))
+    return {
+        "input_ids": np.array([row + [0] * (width - len(row)) for row in ids], dtype=np.int32),
+        "attention_mask": np.array([[1] * len(row) + [0] * (width - len(row)) for row in ids]),
+        "token_type_ids": np.zeros((len(ids), width), dtype=np.int32),
+    }
+
+
+class _Session:
+    """Token states ``[id, 1]``: mean pooling gives the mean word length."""
+
+    def __init__(self, *args, **kwargs):
+        self.feeds = []
+
+    def run(self, outputs, feed):
+        self.feeds.append(feed)
+        ids = feed["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def _encoder(tmp_path, normalize, revision="abc123"):
+    target = tmp_path / "sentence-transformers__fake"
+    target.mkdir()
+    (target / "model.onnx").write_bytes(b"onnx")
+    (target / "model.int8.onnx").write_bytes(b"int8")
+    config = {"model": "sentence-transformers/fake", "max_seq_length": 3, "normalize": normalize,
+              "inputs": ["input_ids", "attention_mask"]}
+    if revision:
+        config["revision"] = revision
+    (target / "encoder.json").write_text(json.dumps(config))
+    onnxruntime = SimpleNamespace(
+        SessionOptions=MagicMock,
+        GraphOptimizationLevel=SimpleNamespace(ORT_ENABLE_ALL=99),
+        InferenceSession=_Session,
+    )
+    transformers = SimpleNamespace(
+        AutoTokenizer=SimpleNamespace(from_pretrained=lambda path: _tokenize)
+    )
+    with patch.dict("sys.modules", {"onnxruntime": onnxruntime, "transformers": transformers}):
+        return OnnxEncoder("sentence-transformers/fake", onnx_dir=str(tmp_path), threads=1)
+
+
+def test_onnx_encoder_batches_and_feeds_configured_inputs(tmp_path):
+    encoder = _encoder(tmp_path, normalize=False)
+
+    vectors = encoder.encode(["ab abcd", "abc", "a bb ccc dddd", "ab"], batch_size=3)
+
+    # Padding is ignored and the fourth word is truncated away
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[3.0, 1.0], [3.0, 1.0], [2.0, 1.0], [2.0, 1.0]]
+    assert [len(feed["input_ids"]) for feed in encoder.session.feeds] == [3, 1]
+    for feed in encoder.session.feeds:
+        assert sorted(feed) == ["attention_mask", "input_ids"]
+        assert all(array.dtype == np.int64 for array in feed.values())
+    assert encoder.encode([]).shape == (0, 2)
+
+
+def test_onnx_encoder_normalizes_and_reports_its_version(tmp_path):
+    encoder = _encoder(tmp_path, normalize=True)
+
+    vectors = encoder.encode("abc abc")
+
+    assert np.allclose(vectors, [[3 / np.sqrt(10), 1 / np.sqrt(10)]])
+    assert encoder.get_sentence_embedding_dimension() == 2
+    assert encoder_version(encoder) == "abc123"
+
+
+def test_onnx_encoder_without_revision_hashes_the_export(tmp_path):
+    version = encoder_version(_encoder(tmp_path, normalize=True, revision=None))
+    assert version.startswith("weights-")
+
+
+def test_onnx_encoder_exports_when_encoder_json_is_missing(tmp_path):
+    with patch("tasks.onnx_encoder.export_onnx", side_effect=RuntimeError("export")) as export:
+        with pytest.raises(RuntimeError, match="export"):
+            with patch.dict("sys.modules", {"onnxruntime": MagicMock(), "transformers": MagicMock()}):
+                OnnxEncoder("other/model", onnx_dir=str(tmp_path))
+    export.assert_called_once_with("other/model", str(tmp_path), quantize=True)
+
+
+class _Normalize:
+    pass
+
+
+class _SentenceTransformer(list):
+    def __init__(self, name, device):
+        transformer = SimpleNamespace(
+            auto_model=MagicMock(config=SimpleNamespace(_commit_hash="abc123"))
+        )
+        super().__init__([transformer, _Normalize()])
+        self.max_seq_length = 128
+        self.tokenizer = MagicMock(return_value={"input_ids": "ids", "attention_mask": "mask"})
+
+
+def test_export_onnx_passes_dynamic_axes_by_index(tmp_path):
+    module = type("Module", (), {"__init__": lambda self: None, "eval": lambda self: self})
+    torch = SimpleNamespace(nn=SimpleNamespace(Module=module), onnx=MagicMock())
+    sentence_transformers = SimpleNamespace(SentenceTransformer=_SentenceTransformer)
+    models = SimpleNamespace(Normalize=_Normalize)
+    modules = {
+        "torch": torch,
+        "sentence_transformers": sentence_transformers,
+        "sentence_transformers.models": models,
+    }
+    with patch.dict("sys.modules", modules):
+        target = export_onnx("sentence-transformers/fake", str(tmp_path), quantize=False)
+
+    (model, args, path), kwargs = torch.onnx.export.call_args
+    assert args == ("ids", "mask")
+    assert path == str(target / "model.onnx")
+    assert kwargs["input_names"] == ["input_ids", "attention_mask"]
+    assert kwargs["output_names"] == ["last_hidden_state"]
+    assert kwargs["dynamic_axes"] == {
+        name: {0: "batch", 1: "tokens"}
+        for name in ("input_ids", "attention_mask", "last_hidden_state")
+    }
+    assert kwargs["dynamo"] is False
+    config = json.loads((target / "encoder.json").read_text())
+    assert config["inputs"] == ["input_ids", "attention_mask"]
+    assert config["revision"] == "abc123"
+    assert config["normalize"] is True
@@ -0,0 +1,84 @@
+import hashlib
+import json
+
+import pytest
+import requests
+
+from bench.boe_server import BOEStandInServer, ServerConfig, pdf_size, render_pdf
+from tasks.pdfs import PDFDownloadError, download_pdf, download_pdfs, pdf_path
+
+BOE_ID = "BOE-A-2024-12000"
+
+
+@pytest.fixture
+def server():
+    with BOEStandInServer(config=ServerConfig(pdf_kb=300)) as server:
+        yield server
+
+
+def pdf_url(server, boe_id=BOE_ID):
+    return f"{server.base_url}/boe/dias/2024/03/04/pdfs/{boe_id}.pdf"
+
+
+def test_download_checks_size_and_skips_present_files(server, tmp_path):
+    body = render_pdf(BOE_ID, 300)
+    dest = tmp_path / "a.pdf"
+
+    result = download_pdf(pdf_url(server), dest, expected_bytes=len(body))
+    again = download_pdf(pdf_url(server), dest, expected_bytes=len(body))
+
+    assert dest.read_bytes() == body
+    assert result["sha256"] == again["sha256"] == hashlib.sha256(body).hexdigest()
+    assert not result["skipped"] and again["skipped"]
+    assert sum(server.config.stats.values()) == 1
+    assert not dest.with_name("a.pdf.part").exists()
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    body = render_pdf(BOE_ID, 300)
+    dest = tmp_path / "a.pdf"
+    server.config.truncate_rate = 1.0
+    with pytest.raises(requests.RequestException):
+        download_pdf(pdf_url(server), dest, attempts=1)
+    part = dest.with_name("a.pdf.part")
+    assert 0 < part.stat().st_size < len(body)
+
+    server.config.truncate_rate = 0.0
+    result = download_pdf(pdf_url(server), dest, expected_bytes=len(body))
+
+    assert dest.read_bytes() == body
+    assert result["sha256"] == hashlib.sha256(body).hexdigest()
+    assert server.config.stats[206] == 1
+
+
+def test_changed_validator_restarts_download(server, tmp_path):
+    body = render_pdf(BOE_ID, 300)
+    dest = tmp_path / "a.pdf"
+    dest.with_name("a.pdf.part").write_bytes(b"%PDF-stale")
+    dest.with_name("a.pdf.part.json").write_text(json.dumps({"validator": '"old"'}))
+
+    download_pdf(pdf_url(server), dest)
+
+    assert dest.read_bytes() == body
+    assert server.config.stats[200] == 1
+
+
+def test_size_mismatch_is_rejected(server, tmp_path):
+    dest = tmp_path / "a.pdf"
+    with pytest.raises(PDFDownloadError):
+        download_pdf(pdf_url(server), dest, expected_bytes=pdf_size(BOE_ID, 300) + 1)
+    assert not dest.exists()
+    assert not dest.with_name("a.pdf.part").exists()
+
+
+def test_download_pdfs_skips_failures(server, tmp_path):
+    records = [
+        {"id": BOE_ID, "date": "2024-03-04", "url_pdf": pdf_url(server)},
+        {"id": "missing", "date": "2024-03-04", "url_pdf": f"{server.base_url}/nope.pdf"},
+        {"id": "no-url", "date": "2024-03-04", "url_pdf": ""},
+    ]
+
+    results = download_pdfs.fn(records, str(tmp_path), max_workers=2)
+
+    assert [r["id"] for r in results] == [BOE_ID]
+    assert results[0]["path"] == str(pdf_path(str(tmp_path), BOE_ID, "2024-03-04"))
@@ -0,0 +1,34 @@
+import random
+from unittest.mock import patch
+
+from tasks.processing import (
+    clean_boe_text,
+    segment_text,
+    segment_texts,
+    split_into_paragraphs,
+)
+
+_ALPHABET = ["a", "B", "ñ", " ", "  ", "\t", "\n", "\n\n", "\r", "\r\n", "\x0b", "\x0c", " ", " ", "."]
+
+
+def _random_texts(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 60))) for _ in range(count)]
+
+
+def test_segment_text_matches_clean_and_split():
+    for text in _random_texts(2000) + ["", "  \n\t\r  ", "Uno\r\n\r\nDos\t\tTres\n"]:
+        assert segment_text(text) == split_into_paragraphs(clean_boe_text(text))
+        assert segment_text(text, clean=False) == split_into_paragraphs(text)
+
+
+def test_segment_text_none():
+    assert segment_text(None) == []
+
+
+def test_segment_texts_keeps_order_with_pool():
+    texts = _random_texts(40, seed=1)
+    expected = [split_into_paragraphs(clean_boe_text(t)) for t in texts]
+    assert segment_texts(texts) == expected
+    with patch("tasks.processing.POOL_MIN_DOCUMENTS", 10):
+        assert segment_texts(texts, processes=2, chunksize=7) == expected
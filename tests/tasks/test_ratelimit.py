@@ -0,0 +1,83 @@
+import threading
+
+from tasks.ratelimit import (
+    LimitedRetry,
+    SqliteTokenBucket,
+    TokenBucket,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_bucket(cls=TokenBucket, **kwargs):
+    clock = FakeClock()
+    bucket = cls(clock=clock, sleep=clock.sleep, **kwargs)
+    return bucket, clock
+
+
+def test_bucket_paces_requests():
+    bucket, clock = make_bucket(rate=2.0, burst=1.0)
+    assert bucket.acquire() == 0.0
+    waited = bucket.acquire()
+    assert abs(waited - 0.5) < 1e-9
+    assert abs(clock.now - 1000.5) < 1e-9
+
+
+def test_throttle_halves_rate_and_honours_retry_after():
+    bucket, clock = make_bucket(rate=4.0, max_rate=8.0)
+    bucket.on_response(429, retry_after=3)
+    assert bucket.rate == 2.0
+    start = clock.now
+    bucket.acquire()
+    assert clock.now - start >= 3
+
+
+def test_success_increases_rate_up_to_max():
+    bucket, _ = make_bucket(rate=1.0, max_rate=1.1, increase=0.05)
+    for _ in range(5):
+        bucket.on_response(200)
+    assert bucket.rate == 1.1
+
+
+def test_sqlite_bucket_is_shared(tmp_path):
+    db = str(tmp_path / "rate.db")
+    first, clock = make_bucket(SqliteTokenBucket, db_path=db, rate=4.0)
+    second = SqliteTokenBucket(db, rate=4.0, clock=clock, sleep=clock.sleep)
+    first.on_response(503, retry_after=10)
+    assert second.rate == 2.0
+    start = clock.now
+    second.acquire()
+    assert clock.now - start >= 10
+
+
+def test_sqlite_bucket_threads(tmp_path):
+    bucket = SqliteTokenBucket(str(tmp_path / "rate.db"), rate=1000.0, burst=50)
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert bucket.rate == 1000.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+    assert parse_retry_after("soon") is None
+
+
+def test_limited_retry_keeps_limiter_on_new():
+    bucket = TokenBucket()
+    retry = LimitedRetry(total=3, limiter=bucket)
+    assert retry.new(total=2).limiter is bucket
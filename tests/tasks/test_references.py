@@ -0,0 +1,59 @@
+from tasks.database import init_db, insert_article
+from tasks.references import ReferenceGraph, get_reference_graph, modified_by
+
+
+def _store(db, boe_id, anteriores=(), posteriores=()):
+    details = {
+        "anteriores": [{"id": t, "relation": r} for t, r in anteriores],
+        "posteriores": [{"id": t, "relation": r} for t, r in posteriores],
+    }
+    insert_article.fn({"id": boe_id, "date": "2024-01-01"}, "t", db, details=details)
+
+
+def test_traverse_multi_hop_and_relation_filter():
+    graph = ReferenceGraph(
+        [
+            ("B", "A", "MODIFICA"),
+            ("C", "B", "DEROGA"),
+            ("D", "A", "CITA"),
+            ("C", "A", "MODIFICA"),
+        ]
+    )
+    assert graph.traverse("A", "in", max_depth=1) == [
+        ("B", 1, "MODIFICA", "A"),
+        ("D", 1, "CITA", "A"),
+        ("C", 1, "MODIFICA", "A"),
+    ]
+    assert graph.traverse("A", "in", ["MODIFICA", "DEROGA"], max_depth=2) == [
+        ("B", 1, "MODIFICA", "A"),
+        ("C", 1, "MODIFICA", "A"),
+    ]
+    assert graph.traverse("C", "out", max_depth=2) == [
+        ("B", 1, "DEROGA", "C"),
+        ("A", 1, "MODIFICA", "C"),
+    ]
+    assert graph.neighbors("B", "out") == [("A", "MODIFICA")]
+    assert graph.traverse("missing") == []
+
+
+def test_edges_from_ingestion_and_cached_graph(tmp_path):
+    db = str(tmp_path / "boe.db")
+    init_db.fn(db)
+    # A learns of B through <posteriores>; B states the same edge itself
+    _store(db, "A", posteriores=[("B", "SE MODIFICA")])
+    _store(db, "B", anteriores=[("A", "MODIFICA")])
+    _store(db, "C", anteriores=[("B", "MODIFICA"), ("A", "CITA")])
+
+    assert modified_by.fn("A", db_path=db) == [("B", 1, "MODIFICA", "A")]
+    assert modified_by.fn("A", max_depth=2, db_path=db) == [
+        ("B", 1, "MODIFICA", "A"),
+        ("C", 2, "MODIFICA", "B"),
+    ]
+    graph = get_reference_graph(db)
+    assert graph.edge_count == 3
+    assert get_reference_graph(db) is graph
+
+    # Re-ingesting C replaces its edges and invalidates the cached graph
+    _store(db, "C", anteriores=[("A", "CITA")])
+    assert get_reference_graph(db) is not graph
+    assert modified_by.fn("A", max_depth=2, db_path=db) == [("B", 1, "MODIFICA", "A")]
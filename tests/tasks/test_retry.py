@@ -0,0 +1,68 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from urllib3.exceptions import MaxRetryError
+
+from tasks.ratelimit import LimitedRetry
+from tasks.retry import Hedger, RetryBudget
+
+
+def test_budget_denies_when_empty_and_refills_on_success():
+    budget = RetryBudget(initial=2, ratio=0.5)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    budget.reset()
+    assert budget.tokens == 2
+
+
+def test_limited_retry_stops_when_budget_is_spent():
+    budget = RetryBudget(initial=1, ratio=0)
+    retry = LimitedRetry(total=5, budget=budget)
+    retry = retry.increment("GET", "/a", error=ConnectionError("boom"))
+    assert retry.new().budget is budget
+    with pytest.raises(MaxRetryError):
+        retry.increment("GET", "/a", error=ConnectionError("boom"))
+
+
+class SlowFirstSession:
+    """First call blocks until released; later calls answer at once."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            self.release.wait(5)
+        response = MagicMock()
+        response.call = call
+        return response
+
+
+def test_hedger_returns_backup_when_primary_is_slow():
+    session = SlowFirstSession()
+    hedger = Hedger(session, RetryBudget(initial=1), min_samples=3)
+    for seconds in (0.01, 0.01, 0.01):
+        hedger._record("boe.es", seconds)
+    response = hedger.get("https://boe.es/a")
+    session.release.set()
+    assert response.call == 2
+    assert session.calls == 2
+
+
+def test_hedger_waits_without_budget():
+    session = SlowFirstSession()
+    session.release.set()
+    hedger = Hedger(session, RetryBudget(initial=0), min_samples=1)
+    hedger._record("boe.es", 0.0)
+    assert hedger.get("https://boe.es/a").call == 1
+    assert session.calls == 1
@@ -1,33 +1,93 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from tasks.scraping import scrape_example_page
+from tasks.scraping import extract_text, scrape_example_page, scrape_pages
 import requests
 
+PAGE = (
+    b'<html><head><meta charset="utf-8"><title>Test Page</title>'
+    b"<script>var a = 1;</script><style>p {}</style></head>"
+    b"<body><!-- note --><p>Hello <b>World</b>!</p><p>Resoluci\xc3\xb3n</p></body></html>"
+)
+
+
+def make_response(body=PAGE, status_error=None, content_type="text/html"):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.headers = requests.structures.CaseInsensitiveDict({"Content-Type": content_type})
+    response.iter_content.side_effect = lambda size: (
+        body[i : i + 7] for i in range(0, len(body), 7)
+    )
+    if status_error:
+        response.raise_for_status.side_effect = status_error
+    return response
+
+
 @patch('tasks.scraping.session.get')
 def test_scrape_example_page_success(mock_get):
-    mock_response = MagicMock()
-    mock_response.text = "<html><head><title>Test Page</title></head><body><p>Hello World!</p></body></html>"
-    mock_get.return_value = mock_response
+    mock_get.return_value = make_response()
 
     url = "http://example.com"
     result = scrape_example_page.fn(url)
 
-    mock_get.assert_called_once_with(url, timeout=10)
+    mock_get.assert_called_once_with(url, timeout=10, stream=True)
     assert "Hello World!" in result
     assert "Test Page" in result # Title is also text
+    assert "Resolución" in result
+    assert "var a" not in result
+
+
+@pytest.mark.parametrize("engine", ["lxml", "html.parser"])
+@patch('tasks.scraping.session.get')
+def test_meta_charset_applies_without_header_charset(mock_get, engine):
+    # requests would report ISO-8859-1 for this Content-Type
+    mock_get.return_value = make_response(content_type="text/html")
+
+    assert "Resolución" in scrape_example_page.fn("http://example.com", engine)
+
+
+@patch('tasks.scraping.session.get')
+def test_header_charset_overrides_document(mock_get):
+    latin1 = "<p>Resoluci\u00f3n</p>".encode("latin-1")
+    mock_get.return_value = make_response(latin1, content_type="text/html; charset=ISO-8859-1")
+
+    assert scrape_example_page.fn("http://example.com") == "Resolución"
+
 
 @patch('tasks.scraping.session.get')
 def test_scrape_example_page_http_error(mock_get):
-    mock_response = MagicMock()
-    # It's good practice to ensure your mock raises an error if the code is expected to handle it.
-    # However, scrape_example_page currently doesn't explicitly call raise_for_status().
-    # If it did, this test would be more robust.
-    # For now, we'll assume requests.get itself might raise or return a bad status.
-    # Let's simulate a requests.exceptions.RequestException for a more general network issue.
+    # A transport failure propagates from the session
     mock_get.side_effect = requests.exceptions.RequestException("Test Network Error")
 
     url = "http://example.com"
     with pytest.raises(requests.exceptions.RequestException, match="Test Network Error"):
         scrape_example_page.fn(url)
 
-    mock_get.assert_called_once_with(url, timeout=10)
+    mock_get.assert_called_once_with(url, timeout=10, stream=True)
+
+
+@patch('tasks.scraping.session.get')
+def test_scrape_example_page_raises_on_bad_status(mock_get):
+    mock_get.return_value = make_response(status_error=requests.exceptions.HTTPError("404"))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        scrape_example_page.fn("http://example.com/missing")
+
+
+@pytest.mark.parametrize("body", [PAGE, b"<p>Sin declaraci\xc3\xb3n</p>", b"<?xml version='1.0' encoding='utf-8'?><doc><t>A &amp; B</t></doc>"])
+def test_lxml_engine_matches_html_parser(body):
+    assert extract_text(body, "lxml") == extract_text(body, "html.parser")
+
+
+def test_lxml_engine_streams_chunks():
+    doc = b"<!DOCTYPE html>\n<html><body>" + "<p>Resoluci\u00f3n</p>\n".encode() * 5000 + b"</body></html>"
+    chunks = (doc[i : i + 1000] for i in range(0, len(doc), 1000))
+    # libxml2 drops the newline between the doctype and <html>
+    assert extract_text(chunks, "lxml") == extract_text(doc, "html.parser").lstrip()
+
+
+@patch('tasks.scraping.session.get')
+def test_scrape_pages_keeps_order(mock_get):
+    pages = {f"http://example.com/{i}": f"<p>page {i}</p>".encode() for i in range(5)}
+    mock_get.side_effect = lambda url, **kwargs: make_response(pages[url])
+
+    assert scrape_pages.fn(list(pages), max_workers=3) == [f"page {i}" for i in range(5)]
@@ -0,0 +1,71 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import faiss
+import numpy as np
+
+from tasks.dedup import LSHIndex
+from tasks.search import search_index
+from tasks.segments import SegmentStore
+
+
+def _write_index(tmp_path, vectors, metas):
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array(vectors, dtype="float32"))
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "meta.jsonl"
+    faiss.write_index(index, str(index_path))
+    meta_path.write_text("\n".join(json.dumps(m) for m in metas), encoding="utf-8")
+    return str(index_path), str(meta_path)
+
+
+@patch("tasks.search.load_encoder")
+def test_search_index_returns_nearest_first(mock_load_encoder, tmp_path):
+    mock_load_encoder.return_value = MagicMock(encode=MagicMock(return_value=[[1.0, 0.0]]))
+    index_path, meta_path = _write_index(
+        tmp_path,
+        [[0.0, 1.0], [1.0, 0.1], [0.9, 0.0]],
+        [{"id": "A", "seq": 0}, {"id": "B", "seq": 0}, {"id": "C", "seq": 2}],
+    )
+
+    hits = search_index.fn("consulta", k=2, index_path=index_path, meta_path=meta_path, db_path=None)
+
+    assert [(h["id"], h["seq"]) for h in hits] == [("B", 0), ("C", 2)]
+    assert hits[0]["distance"] <= hits[1]["distance"]
+
+
+@patch("tasks.search.load_encoder")
+def test_search_index_collapses_near_duplicates(mock_load_encoder, tmp_path):
+    mock_load_encoder.return_value = MagicMock(encode=MagicMock(return_value=[[1.0, 0.0]]))
+    index_path, meta_path = _write_index(
+        tmp_path,
+        [[1.0, 0.0], [1.0, 0.1], [0.0, 1.0]],
+        [{"id": "A", "seq": 0}, {"id": "B", "seq": 0}, {"id": "C", "seq": 0}],
+    )
+    db_path = str(tmp_path / "boe.db")
+    text = "el presente real decreto regula las ayudas a la vivienda para el año dos mil veinticinco"
+    with LSHIndex(db_path, "article") as lsh:
+        lsh.link("A", text, "A")
+        lsh.link("B", text, "B")
+
+    hits = search_index.fn("consulta", k=2, index_path=index_path, meta_path=meta_path, db_path=db_path)
+
+    assert [h["id"] for h in hits] == ["A", "C"]
+    assert hits[0]["duplicates"] == ["B"]
+
+
+@patch("tasks.search.load_encoder")
+def test_search_index_attaches_passages(mock_load_encoder, tmp_path):
+    mock_load_encoder.return_value = MagicMock(encode=MagicMock(return_value=[[1.0, 0.0]]))
+    index_path, meta_path = _write_index(
+        tmp_path, [[1.0, 0.0], [0.0, 1.0]], [{"id": "A", "seq": 1}, {"id": "B", "seq": 0}]
+    )
+    with SegmentStore(str(tmp_path / "segments.db")) as store:
+        store.put("A", ["primero", "segundo", "tercero"])
+
+    hits = search_index.fn(
+        "consulta", k=1, index_path=index_path, meta_path=meta_path, db_path=None, context=1
+    )
+
+    assert hits[0]["text"] == "segundo"
+    assert [p["text"] for p in hits[0]["context"]] == ["primero", "segundo", "tercero"]
@@ -0,0 +1,65 @@
+import json
+import threading
+from unittest.mock import MagicMock
+from urllib.request import urlopen
+
+import faiss
+import numpy as np
+import pytest
+
+from tasks.search_service import MicroBatcher, SearchHTTPServer, SearchService
+
+
+def test_micro_batcher_groups_concurrent_items():
+    batches = []
+    release = threading.Event()
+
+    def handler(items):
+        release.wait(5)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=50)
+    # The first item occupies the worker; the next six queue up behind it
+    futures = [batcher.submit(0)]
+    futures += [batcher.submit(i) for i in range(1, 7)]
+    release.set()
+
+    assert [f.result(5) for f in futures] == [0, 2, 4, 6, 8, 10, 12]
+    assert all(len(batch) <= 4 for batch in batches)
+    assert len(batches) < 7
+    batcher.close()
+
+
+def test_micro_batcher_fails_whole_batch_on_error():
+    batcher = MicroBatcher(MagicMock(side_effect=RuntimeError("boom")), max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.submit("x").result(5)
+    batcher.close()
+
+
+def test_search_service_over_http(tmp_path):
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype="float32"))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+    (tmp_path / "meta.jsonl").write_text(
+        "\n".join(json.dumps({"id": name, "seq": 0}) for name in "ABC"), encoding="utf-8"
+    )
+    vectors = {"este": [1.0, 0.0], "norte": [0.0, 1.0]}
+    model = MagicMock()
+    model.encode.side_effect = lambda queries, batch_size: [vectors[q] for q in queries]
+
+    service = SearchService(
+        model, str(tmp_path / "index.faiss"), str(tmp_path / "meta.jsonl"), max_wait_ms=1
+    )
+    with service, SearchHTTPServer(service, ("127.0.0.1", 0)) as server:
+        assert [h["id"] for h in service.search("norte", k=2)] == ["C", "A"]
+        with urlopen(f"{server.base_url}/search?q=este&k=1") as response:
+            payload = json.loads(response.read())
+        with urlopen(f"{server.base_url}/stats") as response:
+            stats = json.loads(response.read())
+
+    assert [h["id"] for h in payload["hits"]] == ["B"]
+    assert stats["requests"] == 2
+    assert stats["batches"] == 2
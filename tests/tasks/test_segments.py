@@ -0,0 +1,37 @@
+from tasks.segments import SegmentStore
+
+
+def test_passage_with_context(tmp_path):
+    with SegmentStore(str(tmp_path / "segments.db")) as store:
+        store.put("A", ["uno", "dos", "tres", "cuatro"])
+        store.put("B", ["otro"])
+
+        assert store.passage("A", 2) == [(2, "tres")]
+        assert store.passage("A", 0, context=1) == [(0, "uno"), (1, "dos")]
+        assert store.passage("A", 3, context=2) == [(1, "dos"), (2, "tres"), (3, "cuatro")]
+
+        hits = store.attach([{"id": "A", "seq": 1}, {"id": "B", "seq": 0}, {"id": "C"}], context=1)
+        assert hits[0]["text"] == "dos"
+        assert [p["seq"] for p in hits[0]["context"]] == [0, 1, 2]
+        assert hits[1]["text"] == "otro"
+        assert "text" not in hits[2]
+
+
+def test_put_replaces_shorter_article(tmp_path):
+    with SegmentStore(str(tmp_path / "segments.db")) as store:
+        assert store.put("A", ["uno", "dos", "tres"]) == 3
+        assert store.put("A", ["uno", "dos", "tres"]) == 0
+        assert store.put("A", ["nuevo"]) == 3
+
+        assert store.passage("A", 0, context=5) == [(0, "nuevo")]
+
+
+def test_lookup_is_a_primary_key_range_scan(tmp_path):
+    with SegmentStore(str(tmp_path / "segments.db")) as store:
+        plan = store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT seq, text FROM segments "
+            "WHERE id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+            ("A", 0, 2),
+        ).fetchall()
+
+    assert "USING PRIMARY KEY (id=? AND seq>? AND seq<?)" in plan[0][-1]
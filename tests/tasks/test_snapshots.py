@@ -0,0 +1,92 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import faiss
+import numpy as np
+
+from tasks.segments import SegmentStore, default_segments_path
+from tasks.snapshots import (
+    CURRENT_FILE,
+    SnapshotReader,
+    current_version,
+    load_snapshot,
+    publish_snapshot,
+    stage_snapshot,
+)
+
+
+def _publish(root, vectors, keep=3):
+    staging = stage_snapshot(str(root))
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array(vectors, dtype="float32"))
+    faiss.write_index(index, str(staging / "index.faiss"))
+    (staging / "index_meta.jsonl").write_text(
+        "\n".join(json.dumps({"id": str(i)}) for i in range(len(vectors))), encoding="utf-8"
+    )
+    return publish_snapshot(str(root), staging, keep=keep)
+
+
+def test_publish_swaps_current_and_prunes(tmp_path):
+    assert load_snapshot(str(tmp_path)) is None
+
+    versions = [_publish(tmp_path, [[0.0, 0.0]] * n, keep=2) for n in (1, 2, 3)]
+
+    assert versions == ["v000001", "v000002", "v000003"]
+    assert (tmp_path / CURRENT_FILE).read_text() == "v000003"
+    assert sorted(p.name for p in tmp_path.glob("v*")) == ["v000002", "v000003"]
+    snapshot = load_snapshot(str(tmp_path))
+    assert snapshot.version == "v000003"
+    assert snapshot.index.ntotal == len(snapshot.metas) == 3
+
+
+def test_reader_keeps_old_snapshot_until_refresh(tmp_path):
+    _publish(tmp_path, [[0.0, 0.0]])
+    reader = SnapshotReader(str(tmp_path))
+    held = reader.snapshot
+
+    _publish(tmp_path, [[0.0, 0.0], [1.0, 1.0]])
+
+    assert held.index.ntotal == 1
+    assert reader.refresh() is True
+    assert reader.version == "v000002"
+    assert reader.snapshot.index.ntotal == 2
+    assert held.index.ntotal == 1
+    assert reader.refresh() is False
+
+
+@patch("tasks.indexing.encoder_version", return_value="test")
+@patch("tasks.indexing.load_encoder")
+def test_create_or_update_index_publishes_snapshots(mock_load_encoder, _version, tmp_path):
+    mock_load_encoder.return_value = MagicMock(
+        get_sentence_embedding_dimension=MagicMock(return_value=2),
+        encode=MagicMock(side_effect=lambda chunk: [[0.5, 0.5]] * len(chunk)),
+    )
+    from tasks.indexing import create_or_update_index
+
+    root = str(tmp_path / "index")
+    create_or_update_index.fn([{"id": "A", "text": "uno"}], snapshot_dir=root)
+    assert current_version(root) == "v000001"
+
+    create_or_update_index.fn([{"id": "B", "text": "dos tres cuatro"}], snapshot_dir=root)
+    snapshot = load_snapshot(root)
+    assert snapshot.version == "v000002"
+    assert [m["id"] for m in snapshot.metas] == ["A", "B"]
+    assert snapshot.index.ntotal == 2
+
+    # Nothing new: no version is published and no staging is left behind
+    create_or_update_index.fn([{"id": "B", "text": "dos tres cuatro"}], snapshot_dir=root)
+    assert current_version(root) == "v000002"
+    assert not list((tmp_path / "index").glob(".staging-*"))
+    assert not (tmp_path / "index.faiss").exists()
+    with SegmentStore(default_segments_path("", root, "v000002")) as store:
+        assert store.passage("B", 0) == [(0, "dos tres cuatro")]
+
+    # A changed article gets a new version; older versions keep their passages
+    create_or_update_index.fn([{"id": "A", "text": "uno revisado"}], snapshot_dir=root)
+    assert current_version(root) == "v000003"
+    for version, text in [("v000001", "uno"), ("v000002", "uno"), ("v000003", "uno revisado")]:
+        path = default_segments_path("", root, version)
+        assert path == str(tmp_path / "index" / version / "segments.db")
+        with SegmentStore(path) as store:
+            assert store.passage("A", 0) == [(0, text)]
+    assert not (tmp_path / "index" / "segments.db").exists()
@@ -99,3 +99,84 @@ def test_append_metadata(temp_data_dir):
             lines = f.readlines()
             assert len(lines) == 1
             assert json.loads(lines[0]) == record1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_metadata_writer_buffers_and_rotates_by_date(tmp_path):
+    import gzip
+    from tasks.storage import MetadataWriter, iter_metadata_records, read_metadata_record
+
+    clock = FakeClock()
+    writer = MetadataWriter(str(tmp_path), max_records=3, flush_interval=60, clock=clock)
+    writer.write({"id": "A", "date": "2023-01-01"})
+    writer.write({"id": "B", "date": "2023-01-02"})
+    assert list(tmp_path.iterdir()) == []
+
+    writer.write({"id": "C", "date": "2023-01-01"})  # reaches max_records
+    writer.write({"id": "D", "date": "2023-01-01", "title": "ñ"})
+    writer.close()
+
+    day1 = tmp_path / "boe_metadata-2023-01-01.jsonl.gz"
+    assert (tmp_path / "boe_metadata-2023-01-02.jsonl.gz").exists()
+    # Blocks are concatenated gzip members, readable as one gzip stream
+    with gzip.open(day1, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == ["A", "C", "D"]
+
+    assert read_metadata_record("D", str(tmp_path)) == {"id": "D", "date": "2023-01-01", "title": "ñ"}
+    assert read_metadata_record("B", str(tmp_path), date="2023-01-02")["id"] == "B"
+    assert read_metadata_record("missing", str(tmp_path)) is None
+    assert sorted(r["id"] for r in iter_metadata_records(str(tmp_path))) == ["A", "B", "C", "D"]
+
+
+def test_metadata_writer_flushes_on_interval(tmp_path):
+    from tasks.storage import MetadataWriter
+
+    clock = FakeClock()
+    writer = MetadataWriter(str(tmp_path), compression="none", flush_interval=5, clock=clock)
+    writer.write({"id": "A", "date": "2023-01-01"})
+    assert not (tmp_path / "boe_metadata-2023-01-01.jsonl").exists()
+    clock.now = 6
+    writer.write({"id": "B", "date": "2023-01-01"})
+    lines = (tmp_path / "boe_metadata-2023-01-01.jsonl").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["A", "B"]
+
+
+def test_metadata_writer_flushes_in_background(tmp_path):
+    import time
+    from tasks.storage import MetadataWriter, read_metadata_record
+
+    writer = MetadataWriter(str(tmp_path), compression="none", flush_interval=0.05)
+    writer.write({"id": "A", "date": "2023-01-01"})
+    # No further write arrives; the timer thread flushes on its own
+    deadline = time.monotonic() + 5
+    while read_metadata_record("A", str(tmp_path)) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_metadata_record("A", str(tmp_path)) == {"id": "A", "date": "2023-01-01"}
+    writer.close()
+
+
+def test_metadata_lookup_uses_the_keyed_index(tmp_path):
+    import sqlite3
+    from tasks.storage import MetadataWriter, read_metadata_record
+
+    with MetadataWriter(str(tmp_path), flush_interval=60) as writer:
+        writer.write({"id": "A", "date": "2023-01-01", "v": 1})
+        writer.flush()
+        writer.write({"id": "A", "date": "2023-01-01", "v": 2})
+        writer.write({"id": "A", "date": "2023-01-03", "v": 3})
+
+    assert read_metadata_record("A", str(tmp_path))["v"] == 3
+    assert read_metadata_record("A", str(tmp_path), date="2023-01-01")["v"] == 2
+    plan = sqlite3.connect(tmp_path / "metadata_index.db").execute(
+        "EXPLAIN QUERY PLAN SELECT file, offset, line FROM metadata_records "
+        "WHERE id = ? ORDER BY day DESC LIMIT 1",
+        ("A",),
+    ).fetchall()
+    assert "USING PRIMARY KEY" in plan[0][-1]
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from tasks.work_queue import WorkQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_queue(tmp_path, **kwargs):
+    clock = FakeClock()
+    queue = WorkQueue(str(tmp_path / "boe.db"), clock=clock, **kwargs)
+    return queue, clock
+
+
+def test_claims_are_exclusive_and_ordered(tmp_path):
+    queue, _ = make_queue(tmp_path)
+    assert queue.enqueue("article", [("B", "2024-01-02"), ("A", "2024-01-02"), ("C", "2024-01-01")]) == 3
+    assert queue.enqueue("article", [("A", "2024-01-02")]) == 0
+
+    first = queue.claim("article", "w1", limit=2)
+    second = queue.claim("article", "w2", limit=2)
+
+    assert first == [("C", "2024-01-01"), ("A", "2024-01-02")]
+    assert second == [("B", "2024-01-02")]
+    assert queue.claim("article", "w3") == []
+
+
+def test_expired_lease_is_taken_over_and_heartbeat_keeps_it(tmp_path):
+    queue, clock = make_queue(tmp_path, lease_seconds=60)
+    queue.enqueue("day", [("2024-01-01", "2024-01-01"), ("2024-01-02", "2024-01-02")])
+    queue.claim("day", "w1", limit=2)
+
+    clock.now += 50
+    assert queue.heartbeat("day", "w1", ["2024-01-01"]) == 1
+    clock.now += 20
+    # Only the day without a heartbeat has expired
+    assert queue.claim("day", "w2", limit=2) == [("2024-01-02", "2024-01-02")]
+    assert queue.complete("day", "w1", ["2024-01-02"]) == 0
+    assert queue.complete("day", "w2", ["2024-01-02"]) == 1
+    assert queue.counts("day") == {"leased": 1, "done": 1}
+
+
+def test_failed_items_are_retried_then_parked(tmp_path):
+    queue, _ = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue("article", [("A", None)])
+
+    queue.claim("article", "w1")
+    queue.fail("article", "w1", ["A"], "boom")
+    assert queue.counts() == {"pending": 1}
+    queue.claim("article", "w2")
+    queue.fail("article", "w2", ["A"], "boom")
+
+    assert queue.counts() == {"failed": 1}
+    assert queue.claim("article", "w3") == []
+
+
+def test_expired_lease_on_last_attempt_is_parked(tmp_path):
+    queue, clock = make_queue(tmp_path, lease_seconds=60, max_attempts=1)
+    queue.enqueue("article", [("A", None)])
+    queue.claim("article", "w1")
+
+    # w1 dies without failing the item
+    clock.now += 61
+    assert queue.claim("article", "w2") == []
+    assert queue.counts() == {"failed": 1}
+
+
+def test_lease_completes_or_fails_its_batch(tmp_path):
+    queue, _ = make_queue(tmp_path)
+    queue.enqueue("article", [("A", None), ("B", None)])
+
+    with queue.lease("article", "w1", limit=1) as items:
+        assert items == [("A", None)]
+    with pytest.raises(RuntimeError):
+        with queue.lease("article", "w1", limit=1):
+            raise RuntimeError("fetch failed")
+
+    assert queue.counts() == {"done": 1, "pending": 1}
+
+
+def test_concurrent_workers_never_share_items(tmp_path):
+    queue = WorkQueue(str(tmp_path / "boe.db"))
+    queue.enqueue("article", [(f"BOE-A-{i:05d}", None) for i in range(200)])
+    claimed: list[str] = []
+
+    def work(name):
+        while True:
+            items = queue.claim("article", name, limit=7)
+            if not items:
+                return
+            claimed.extend(key for key, _ in items)
+            queue.complete("article", name, [key for key, _ in items])
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == [f"BOE-A-{i:05d}" for i in range(200)]
+    assert queue.counts() == {"done": 200}
@@ -0,0 +1,39 @@
+import sys
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+import main
+
+
+def test_help_does_not_import_flows():
+    sys.modules.pop("flows.scrape_boe_day_metadata", None)
+    with pytest.raises(SystemExit):
+        main.main(["--help"])
+    assert "flows.scrape_boe_day_metadata" not in sys.modules
+
+
+def test_default_command_scrapes_date():
+    args = main.build_parser().parse_args(["--date", "2024/12/31"])
+
+    assert args.handler is main.cmd_scrape
+    assert args.date == "2024/12/31"
+    assert not args.direct
+
+
+@patch("flows.direct.run_flow")
+def test_backfill_runs_each_day(mock_run_flow):
+    main.main(["--direct", "backfill", "2024/12/30", "2025/01/01", "--batch-size", "10"])
+
+    days = [c.args[1] for c in mock_run_flow.call_args_list]
+    assert days == ["2024/12/30", "2024/12/31", "2025/01/01"]
+    assert all(c.kwargs["direct"] for c in mock_run_flow.call_args_list)
+    assert mock_run_flow.call_args.kwargs["batch_size"] == 10
+
+
+def test_backfill_rejects_reversed_range():
+    with pytest.raises(SystemExit):
+        main.main(["backfill", "2025/01/02", "2025/01/01"])
+    args = main.build_parser().parse_args(["backfill", "2025/01/01", "2025/01/02"])
+    assert args.start == date(2025, 1, 1)